@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Adaptive mesh refinement around the solidification front
+
+Cases generated with amr_levels > 0 refine the blockMesh grid with
+dynamicRefineFvMesh wherever the front is: either the band of cells between
+solidus and liquidus ('band', keyed on T) or cells with a steep liquid-fraction
+gradient ('gradient', keyed on a magGradAlpha1 field kept up to date by
+function objects). This module holds those criteria and estimates how many cells
+refinement saves against a uniformly fine mesh, from the written T fields of a
+run or, when there are none, from the warm-start conduction model.
+
+dynamicRefineFvMesh refines with hexRef8, which splits a cell into 8 children
+and cannot refine a one-cell-thick mesh with empty patches. Refined cases are
+therefore generated as a slab one base cell thick between symmetry planes, and
+each level multiplies the cells of a refined base cell by 8, not 4.
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+import hea_foamio
+
+CRITERIA = ('band', 'gradient')
+# Field written by the gradient function objects
+GRADIENT_FIELD = 'magGradAlpha1'
+# Gradient criterion: refine where alpha1 changes by more than this per base cell
+GRADIENT_PER_CELL = 0.05
+# Cells are unrefined once T is this fraction of the freezing range below solidus
+UNREFINE_MARGIN = 0.05
+DYNAMIC_MESH_DICT = 'dynamicMeshDict'
+# Children of a cell per refinement level (hexRef8)
+CHILDREN_PER_LEVEL = 8
+# Time steps between refinements; the gradient field is created by function
+# objects at the end of the first step, so refinement may not start before
+REFINE_INTERVAL = {'band': 1, 'gradient': 2}
+
+
+def refinement_levels(properties, criterion, base_dx):
+    """Return (field, lowerRefineLevel, upperRefineLevel, unrefineLevel)"""
+    if criterion == 'band':
+        t_sol = float(properties['solidus_temp'])
+        t_liq = float(properties['liquidus_temp'])
+        return 'T', t_sol, t_liq, t_sol - UNREFINE_MARGIN * (t_liq - t_sol)
+    if criterion == 'gradient':
+        threshold = GRADIENT_PER_CELL / base_dx
+        return GRADIENT_FIELD, threshold, 1e30, 0.5 * threshold
+    raise ValueError(f"Unknown refinement criterion: {criterion}")
+
+
+def read_amr_settings(case_dir):
+    """Return the refinement settings of a case's dynamicMeshDict, or None"""
+    path = Path(case_dir) / 'constant' / DYNAMIC_MESH_DICT
+    if not path.exists():
+        return None
+    coeffs = hea_foamio.read_foam_dict(path)['dynamicRefineFvMeshCoeffs']
+    return {
+        'criterion': 'band' if coeffs['field'] == 'T' else 'gradient',
+        'lower': float(coeffs['lowerRefineLevel']),
+        'upper': float(coeffs['upperRefineLevel']),
+        'levels': int(coeffs['maxRefinement']),
+        'n_buffer_layers': int(coeffs['nBufferLayers']),
+    }
+
+
+_VERTICES_RE = re.compile(r'(vertices\s*\()(.*?)(\)\s*;)', re.DOTALL)
+_VERTEX_RE = re.compile(r'\(\s*(\S+)\s+(\S+)\s+(\S+)\s*\)')
+
+
+def fit_slab(case_dir):
+    """Match a refined case's slab and cell limit to its blockMeshDict cell counts
+
+    The slab depth and maxCells are written for the base mesh the case was
+    generated with; a case whose mesh is rescaled afterwards (a convergence
+    study level) would otherwise refine non-cubic base cells and stop at the
+    old cell limit, and the gradient criterion would keep the threshold of
+    the old base cell size. Returns False for a case without AMR.
+    """
+    settings = read_amr_settings(case_dir)
+    if settings is None:
+        return False
+    mesh_path = Path(case_dir) / 'system' / 'blockMeshDict'
+    lx, _, nx, ny = hea_foamio.read_block_mesh_grid(case_dir)
+    scale = float(hea_foamio.read_entry(mesh_path, 'scale', 1) or 1)
+    depth = lx / nx / scale
+
+    def set_depth(match):
+        x, y, z = match.groups()
+        return f"({x} {y} {depth:g})" if float(z) != 0 else match.group(0)
+
+    text = mesh_path.read_text(encoding='utf-8')
+    text = _VERTICES_RE.sub(lambda m: m.group(1) + _VERTEX_RE.sub(set_depth, m.group(2)) + m.group(3),
+                            text, count=1)
+    mesh_path.write_text(text, encoding='utf-8')
+    dict_path = Path(case_dir) / 'constant' / DYNAMIC_MESH_DICT
+    hea_foamio.set_entry(dict_path, 'maxCells', nx * ny * CHILDREN_PER_LEVEL ** settings['levels'])
+    if settings['criterion'] == 'gradient':
+        _, lower, _, unrefine = refinement_levels({}, 'gradient', lx / nx)
+        hea_foamio.set_entry(dict_path, 'lowerRefineLevel', f"{lower:g}")
+        hea_foamio.set_entry(dict_path, 'unrefineLevel', f"{unrefine:g}")
+    return True
+
+
+def _neighbourhood(field, reduce):
+    """Reduce each cell with its 8 neighbours (edges padded by replication)"""
+    import numpy as np
+
+    padded = np.pad(field, 1, mode='edge')
+    ny, nx = field.shape
+    result = field.copy()
+    for dj in (0, 1, 2):
+        for di in (0, 1, 2):
+            result = reduce(result, padded[dj:dj + ny, di:di + nx])
+    return result
+
+
+def flag_cells(T, settings, grid, t_range):
+    """Boolean (ny, nx) mask of base cells the refinement criterion selects
+
+    Mirrors dynamicRefineFvMesh, which tests interpolated point values: a cell
+    is flagged when the band lies between its value and a neighbour's. Flags
+    are then grown by nBufferLayers.
+    """
+    import numpy as np
+
+    lx, ly, nx, ny = grid
+    T = np.asarray(T, dtype=float).reshape(ny, nx)
+    if settings['criterion'] == 'band':
+        low = _neighbourhood(T, np.minimum)
+        high = _neighbourhood(T, np.maximum)
+        flags = (high >= settings['lower']) & (low <= settings['upper'])
+    else:
+        t_sol, t_liq = t_range
+        alpha = np.clip((T - t_sol) / (t_liq - t_sol), 0.0, 1.0)
+        gy, gx = np.gradient(alpha, ly / ny, lx / nx)
+        flags = np.hypot(gx, gy) >= settings['lower']
+    for _ in range(settings['n_buffer_layers']):
+        flags = _neighbourhood(flags, np.logical_or)
+    return flags
+
+
+def _snapshots(case_dir, properties, end_time, n_snapshots):
+    """Yield (time, T) from the written time directories, else from the conduction model"""
+    import hea_post
+    import hea_warmstart
+
+    grid = hea_foamio.read_block_mesh_grid(case_dir)
+    written = []
+    for value, time_dir in hea_post.time_directories(case_dir):
+        if (time_dir / 'T').exists():
+            _, T = hea_foamio.read_field(time_dir / 'T')
+            if not isinstance(T, str) and len(T) == grid[2] * grid[3]:
+                written.append((value, T))
+    if written:
+        yield from written
+        return
+    model = hea_warmstart.ConductionModel(case_dir, properties)
+    if end_time is None:
+        end_time = hea_foamio.read_number(Path(case_dir) / 'system' / 'controlDict', 'endTime')
+    interval = end_time / n_snapshots
+    for k in range(1, n_snapshots + 1):
+        model.advance(interval)
+        yield k * interval, model.T.ravel().copy()
+
+
+def estimate_savings(case_dir, levels=None, n_buffer_layers=None, criterion=None,
+                     end_time=None, n_snapshots=20, properties=None):
+    """Estimate AMR cell counts against a uniform mesh at the finest level
+
+    Settings default to the case's dynamicMeshDict (levels 2, 1 buffer layer,
+    'band' for a case without one). Each flagged base cell of the slab becomes
+    8**levels cells; transition cells of the 2:1 refinement are covered by the
+    buffer layers only, so the result is an estimate. uniform_cells is the
+    uniformly fine slab; uniform_2d_cells is the one-cell-thick 2D mesh of the
+    same in-plane resolution, which AMR must also beat to be worth running.
+    """
+    import hea_warmstart
+
+    case_dir = Path(case_dir)
+    grid = hea_foamio.read_block_mesh_grid(case_dir)
+    lx, ly, nx, ny = grid
+    if properties is None:
+        properties = hea_warmstart.read_case_properties(case_dir)
+    settings = read_amr_settings(case_dir) or {'criterion': 'band', 'levels': 2,
+                                               'n_buffer_layers': 1}
+    if criterion is not None and criterion != settings['criterion']:
+        settings = {**settings, 'criterion': criterion}
+        settings.pop('lower', None)
+    if levels is not None:
+        settings['levels'] = levels
+    if n_buffer_layers is not None:
+        settings['n_buffer_layers'] = n_buffer_layers
+    if 'lower' not in settings:
+        _, settings['lower'], settings['upper'], _ = refinement_levels(
+            properties, settings['criterion'], lx / nx)
+    t_range = (float(properties['solidus_temp']), float(properties['liquidus_temp']))
+
+    factor = CHILDREN_PER_LEVEL ** settings['levels']
+    base_cells = nx * ny
+    uniform_cells = base_cells * factor
+    uniform_2d_cells = base_cells * 4 ** settings['levels']
+    history = []
+    for value, T in _snapshots(case_dir, properties, end_time, n_snapshots):
+        flagged = int(flag_cells(T, settings, grid, t_range).sum())
+        history.append({'time': value, 'flagged_base_cells': flagged,
+                        'cells': base_cells - flagged + flagged * factor})
+    cells = [row['cells'] for row in history]
+    mean_cells = sum(cells) / len(cells) if cells else float(base_cells)
+    return {
+        'case': str(case_dir),
+        'criterion': settings['criterion'],
+        'levels': settings['levels'],
+        'n_buffer_layers': settings['n_buffer_layers'],
+        'base_cells': base_cells,
+        'uniform_cells': uniform_cells,
+        'uniform_2d_cells': uniform_2d_cells,
+        'mean_cells': mean_cells,
+        'peak_cells': max(cells) if cells else base_cells,
+        'savings': 1.0 - mean_cells / uniform_cells,
+        'savings_vs_2d': 1.0 - mean_cells / uniform_2d_cells,
+        'history': history,
+    }
+
+
+def describe_savings(savings):
+    """'45% fewer' or '20% more' cells"""
+    return f"{savings:.0%} fewer" if savings >= 0 else f"{-savings:.0%} more"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate AMR cell-count savings of a case")
+    parser.add_argument('case_dir', help="case directory (base mesh)")
+    parser.add_argument('--levels', type=int, default=None, help="refinement levels")
+    parser.add_argument('--buffer', type=int, default=None, help="buffer layers")
+    parser.add_argument('--criterion', choices=CRITERIA, default=None)
+    parser.add_argument('--end-time', type=float, default=None,
+                        help="model end time when the case has no written fields")
+    parser.add_argument('--snapshots', type=int, default=20, help="model snapshots")
+    parser.add_argument('--json', action='store_true', help="print the full result")
+    args = parser.parse_args(argv)
+    result = estimate_savings(args.case_dir, args.levels, args.buffer, args.criterion,
+                              args.end_time, args.snapshots)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['criterion']} criterion, {result['levels']} levels, "
+              f"{result['n_buffer_layers']} buffer layer(s)")
+        print(f"Uniform fine slab: {result['uniform_cells']} cells, "
+              f"uniform fine 2D mesh: {result['uniform_2d_cells']} cells")
+        print(f"AMR: mean {result['mean_cells']:.0f}, peak {result['peak_cells']} cells "
+              f"({describe_savings(result['savings'])} than the slab, "
+              f"{describe_savings(result['savings_vs_2d'])} than the 2D mesh on average)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
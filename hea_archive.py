@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compressed archives of finished HEA solidification cases
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+COMPRESSIONS = {'gz': 'w:gz', 'bz2': 'w:bz2', 'xz': 'w:xz', 'none': 'w'}
+SUFFIXES = {'gz': '.tar.gz', 'bz2': '.tar.bz2', 'xz': '.tar.xz', 'none': '.tar'}
+
+
+def _tree_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+
+def archive_case(case_dir, output=None, compression='xz', include_processors=False,
+                 remove=False):
+    """Write a compressed tarball of a case and return its statistics
+
+    Decomposed processor* directories are left out unless include_processors is
+    set, since reconstructPar has already merged them into the time directories.
+    """
+    case_dir = Path(case_dir)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    output = Path(output) if output else case_dir.with_name(case_dir.name + SUFFIXES[compression])
+
+    def keep(info):
+        top = Path(info.name).parts[1:2]
+        if not include_processors and top and top[0].startswith('processor'):
+            return None
+        return info
+
+    raw_bytes = sum(_tree_size(p) if p.is_dir() else p.stat().st_size
+                    for p in case_dir.iterdir()
+                    if include_processors or not p.name.startswith('processor'))
+    start = time.perf_counter()
+    with tarfile.open(output, COMPRESSIONS[compression]) as tar:
+        tar.add(case_dir, arcname=case_dir.name, filter=keep)
+    seconds = time.perf_counter() - start
+    archive_bytes = output.stat().st_size
+    if remove:
+        shutil.rmtree(case_dir)
+    return {
+        'case': str(case_dir),
+        'archive': str(output),
+        'compression': compression,
+        'raw_bytes': raw_bytes,
+        'archive_bytes': archive_bytes,
+        'ratio': raw_bytes / archive_bytes if archive_bytes else None,
+        'seconds': seconds,
+        'mb_per_s': raw_bytes / 1e6 / seconds if seconds > 0 else None,
+    }
+
+
+def extract_archive(archive, dest='.'):
+    """Extract a case archive into dest and return the case directory"""
+    with tarfile.open(archive, 'r:*') as tar:
+        top = tar.getnames()[0].split('/')[0]
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(dest, filter='data')
+        else:
+            tar.extractall(dest)
+    return Path(dest) / top
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive finished HEA cases")
+    parser.add_argument('cases', nargs='+', help="case directories")
+    parser.add_argument('--compression', choices=sorted(COMPRESSIONS), default='xz')
+    parser.add_argument('--processors', action='store_true', help="keep processor* dirs")
+    parser.add_argument('--remove', action='store_true', help="delete cases once archived")
+    args = parser.parse_args(argv)
+    for case_dir in args.cases:
+        print(json.dumps(archive_case(case_dir, compression=args.compression,
+                                      include_processors=args.processors,
+                                      remove=args.remove)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the HEA solidification tools
+
+Times case generation (single cases and a sweep), field writing/reading and
+solver-log parsing throughput, the NumPy conduction model used for warm starts,
+and archive compression, on synthetic data for a range of mesh sizes. Every run
+is appended to benchmark_results/history.jsonl; a run can be stored as the
+baseline and later runs are compared against it, exiting non-zero when a
+metric regresses by more than the tolerance.
+
+    python hea_benchmark.py --quick
+    python hea_benchmark.py --save-baseline
+    python hea_benchmark.py --sizes 50x100 1000x2000 --only fields solver
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RESULTS_DIR = 'benchmark_results'
+HISTORY_NAME = 'history.jsonl'
+BASELINE_NAME = 'baseline.json'
+DEFAULT_SIZES = [(50, 100), (200, 400), (1000, 2000)]
+QUICK_SIZES = [(50, 100), (200, 400)]
+BENCHMARKS = ['generate', 'sweep', 'fields', 'log', 'solver', 'archive']
+# Relative slowdown tolerated before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+SWEEP_CASES = 8
+LOG_STEPS = 20000
+
+
+def _best_of(fn, repeats):
+    """Run fn repeats times and return the shortest wall time"""
+    best = None
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _size_label(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def _parse_size(text):
+    nx, sep, ny = text.lower().partition('x')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected NXxNY, got: {text}")
+    return int(nx), int(ny)
+
+
+def higher_is_better(metric):
+    """Throughputs and ratios improve upwards; '*seconds' metrics downwards"""
+    return not metric.endswith('seconds')
+
+
+def _synthetic_temperature(size):
+    import numpy as np
+
+    nx, ny = size
+    y = (np.arange(ny) + 0.5) / ny
+    x = (np.arange(nx) + 0.5) / nx
+    # A smooth vertical gradient with some texture, so compression is not trivial
+    return (1650.0 + 150.0 * y[:, None] + 5.0 * np.sin(40.0 * x)[None, :]).ravel()
+
+
+def _make_case(workdir, size, name):
+    from setup_hea_solidification import HEASolidificationCase
+
+    case = HEASolidificationCase(workdir, case_name=name, mesh_cells=size, verbose=False)
+    case.setup_complete_case()
+    return case.case_dir
+
+
+def bench_generate(workdir, size, repeats):
+    """Generate one case with a nonuniform initial T field"""
+    from setup_hea_solidification import HEASolidificationCase
+
+    initial = _synthetic_temperature(size)
+
+    def run():
+        case = HEASolidificationCase(workdir, case_name='generate', mesh_cells=size,
+                                     initial_temperature=initial, verbose=False)
+        case.setup_complete_case()
+
+    seconds = _best_of(run, repeats)
+    return {'seconds': seconds, 'cases_per_s': 1.0 / seconds}
+
+
+def bench_sweep(workdir, size, repeats):
+    """Generate a sweep of SWEEP_CASES liquidus variations"""
+    import hea_sweep
+
+    variations = [{'liquidus_temp': 1700 + 5 * i, 'mesh_cells': size}
+                  for i in range(SWEEP_CASES)]
+
+    def run():
+        sweep_dir = Path(workdir) / 'sweep'
+        shutil.rmtree(sweep_dir, ignore_errors=True)
+        hea_sweep.generate_sweep(sweep_dir, variations)
+
+    seconds = _best_of(run, repeats)
+    return {'seconds': seconds, 'cases_per_s': SWEEP_CASES / seconds}
+
+
+def bench_fields(workdir, size, repeats):
+    """Write and read a scalar and a vector field in ASCII and binary"""
+    import numpy as np
+
+    import hea_foamio
+
+    T = _synthetic_temperature(size)
+    U = np.stack([np.sin(T), np.cos(T), np.zeros_like(T)], axis=1) * 1e-3
+    boundary = {'frontAndBack': {'type': 'empty'}}
+    results = {}
+    for fmt in ('ascii', 'binary'):
+        for name, field_class, values in (('T', 'volScalarField', T),
+                                          ('U', 'volVectorField', U)):
+            path = Path(workdir) / f"{name}.{fmt}"
+            write_s = _best_of(lambda: hea_foamio.write_field(
+                path, field_class, name, '[0 0 0 0 0 0 0]', values, boundary, fmt=fmt), repeats)
+            read_s = _best_of(lambda: hea_foamio.read_field(path), repeats)
+            mb = path.stat().st_size / 1e6
+            results[f"{fmt}_{name}_write_mb_per_s"] = mb / write_s
+            results[f"{fmt}_{name}_read_mb_per_s"] = mb / read_s
+            path.unlink()
+    return results
+
+
+def _write_synthetic_log(path, n_steps):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Starting time loop\n\n")
+        dt = 1e-3
+        for i in range(1, n_steps + 1):
+            f.write(f"Courant Number mean: {0.05 + 1e-6 * i:.6g} max: {0.4 + 1e-6 * i:.6g}\n")
+            f.write(f"deltaT = {dt:.6g}\nTime = {i * dt:.6g}\n\nPIMPLE: iteration 1\n")
+            for field in ('Ux', 'Uy', 'h'):
+                f.write(f"DILUPBiCGStab:  Solving for {field}, Initial residual = "
+                        f"{1e-4 / i:.6g}, Final residual = {1e-9 / i:.6g}, No Iterations 2\n")
+            f.write(f"GAMG:  Solving for p_rgh, Initial residual = {1e-3 / i:.6g}, "
+                    f"Final residual = {1e-8 / i:.6g}, No Iterations 7\n")
+            f.write("volFieldValue liquidFraction write:\n")
+            f.write(f"    volAverage() of solidification:alpha1 = {1.0 - i / n_steps:.6g}\n\n")
+            f.write(f"ExecutionTime = {0.01 * i:.2f} s  ClockTime = {i // 100} s\n\n")
+        f.write("End\n")
+
+
+def bench_log(workdir, size, repeats):
+    """Parse a synthetic solver log of LOG_STEPS time steps"""
+    import hea_foamio
+
+    path = Path(workdir) / 'log.simulation'
+    _write_synthetic_log(path, LOG_STEPS)
+    seconds = _best_of(lambda: hea_foamio.parse_solver_log(path), repeats)
+    return {'mb_per_s': path.stat().st_size / 1e6 / seconds,
+            'steps_per_s': LOG_STEPS / seconds}
+
+
+def bench_solver(workdir, size, repeats):
+    """Time steps of the conduction model; the step count shrinks with the mesh"""
+    import hea_warmstart
+
+    case_dir = _make_case(workdir, size, 'solver')
+    n_cells = size[0] * size[1]
+    n_steps = max(5, min(500, 2_000_000 // n_cells))
+
+    def run():
+        model = hea_warmstart.ConductionModel(case_dir)
+        model.advance(n_steps * model.dt_stable)
+
+    # Model construction reads 0/T; time it separately and subtract
+    setup_s = _best_of(lambda: hea_warmstart.ConductionModel(case_dir), repeats)
+    seconds = max(_best_of(run, repeats) - setup_s, 1e-9)
+    return {'steps_per_s': n_steps / seconds,
+            'mcell_updates_per_s': n_steps * n_cells / seconds / 1e6}
+
+
+def bench_archive(workdir, size, repeats):
+    """Compress a case with one written time directory of T and U"""
+    import numpy as np
+
+    import hea_archive
+    import hea_foamio
+
+    case_dir = _make_case(workdir, size, 'archive')
+    T = _synthetic_temperature(size)
+    boundary = {'frontAndBack': {'type': 'empty'}}
+    time_dir = Path(case_dir) / '1'
+    time_dir.mkdir()
+    hea_foamio.write_field(time_dir / 'T', 'volScalarField', 'T', '[0 0 0 1 0 0 0]',
+                           T, boundary, location='1')
+    hea_foamio.write_field(time_dir / 'U', 'volVectorField', 'U', '[0 1 -1 0 0 0 0]',
+                           np.zeros((len(T), 3)), boundary, location='1')
+    results = {}
+    for compression in ('gz', 'xz'):
+        output = Path(workdir) / f"archive.{compression}"
+        stats = {}
+
+        def run():
+            stats.update(hea_archive.archive_case(case_dir, output=output,
+                                                  compression=compression))
+
+        seconds = _best_of(run, repeats)
+        results[f"{compression}_ratio"] = stats['ratio']
+        results[f"{compression}_mb_per_s"] = stats['raw_bytes'] / 1e6 / seconds
+        output.unlink()
+    return results
+
+
+BENCH_FUNCTIONS = {
+    'generate': bench_generate,
+    'sweep': bench_sweep,
+    'fields': bench_fields,
+    'log': bench_log,
+    'solver': bench_solver,
+    'archive': bench_archive,
+}
+# These do not depend on the mesh size, so they run once at the first size
+SIZE_INDEPENDENT = {'log'}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).resolve().parent,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(sizes=None, only=None, repeats=3, verbose=True):
+    """Run the selected benchmarks and return a result record
+
+    Metric names are '<benchmark>.<NXxNY>.<metric>'.
+    """
+    import numpy as np
+
+    sizes = sizes or DEFAULT_SIZES
+    only = only or BENCHMARKS
+    metrics = {}
+    with tempfile.TemporaryDirectory(prefix='hea_bench_') as tmp:
+        for name in only:
+            for size in sizes[:1] if name in SIZE_INDEPENDENT else sizes:
+                workdir = Path(tmp) / f"{name}_{_size_label(size)}"
+                workdir.mkdir()
+                start = time.perf_counter()
+                result = BENCH_FUNCTIONS[name](workdir, size, repeats)
+                for metric, value in result.items():
+                    metrics[f"{name}.{_size_label(size)}.{metric}"] = value
+                shutil.rmtree(workdir, ignore_errors=True)
+                if verbose:
+                    print(f"  {name:<9} {_size_label(size):>10}  "
+                          f"({time.perf_counter() - start:.1f} s)  "
+                          + "  ".join(f"{k}={v:.4g}" for k, v in result.items()))
+    return {
+        'timestamp': time.time(),
+        'commit': _git_commit(),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'sizes': [_size_label(size) for size in sizes],
+        'repeats': repeats,
+        'metrics': metrics,
+    }
+
+
+def append_history(results_dir, record):
+    """Append one result record to the history file"""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    with open(results_dir / HISTORY_NAME, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def load_baseline(results_dir):
+    """Return the stored baseline record, or None"""
+    path = Path(results_dir) / BASELINE_NAME
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results_dir, record):
+    """Store a result record as the baseline"""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = results_dir / f"{BASELINE_NAME}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, results_dir / BASELINE_NAME)
+
+
+def compare(record, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return (metric, baseline, current, change) for metrics worse than tolerance
+
+    change is the relative change in the direction where positive is better.
+    """
+    regressions = []
+    for metric, current in sorted(record['metrics'].items()):
+        reference = baseline['metrics'].get(metric)
+        if not reference:
+            continue
+        change = (current - reference) / reference
+        if not higher_is_better(metric):
+            change = -change
+        if change < -tolerance:
+            regressions.append((metric, reference, current, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HEA solidification tools")
+    parser.add_argument('--sizes', nargs='+', type=_parse_size, default=None,
+                        metavar='NXxNY', help="mesh sizes (default: 50x100 200x400 1000x2000)")
+    parser.add_argument('--quick', action='store_true', help="only the two smaller meshes")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=None,
+                        help="benchmarks to run")
+    parser.add_argument('--repeats', type=int, default=3, help="best-of repeats per timing")
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help="history and baseline")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown tolerated before flagging a regression")
+    parser.add_argument('--json', action='store_true', help="print the result record")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    record = run_suite(sizes, args.only, args.repeats, verbose=not args.json)
+    append_history(args.results_dir, record)
+    if args.json:
+        print(json.dumps(record, indent=2))
+    if args.save_baseline:
+        save_baseline(args.results_dir, record)
+        if not args.json:
+            print(f"Baseline saved to {Path(args.results_dir) / BASELINE_NAME}")
+        return 0
+
+    baseline = load_baseline(args.results_dir)
+    if baseline is None:
+        return 0
+    regressions = compare(record, baseline, args.tolerance)
+    if not args.json:
+        print(f"Compared with baseline {baseline.get('commit')}: "
+              f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        for metric, reference, current, change in regressions:
+            print(f"  {metric:<45} {reference:12.4g} -> {current:12.4g}  ({change:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
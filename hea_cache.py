@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of simulation results
+
+Cases are keyed by a hash of their rendered inputs (0/, constant/ and system/
+dictionaries) with comments, banners and whitespace removed, and binary fields by
+their exact values, so physically identical cases share an entry regardless of
+case name or location. Results are
+copied into the cache and back out of it, never hard-linked, so a case that later
+rewrites a result file in place (post-processing, a rerun, foamFormatConvert)
+cannot change the cached entry or other cases restored from it. Cached files are
+made read-only, and the cache is kept under a size limit by evicting the least
+recently used entries.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import hea_foamio
+
+INPUT_DIRS = ('0', 'constant', 'system')
+# The mesh is generated from system/blockMeshDict and the decomposition does not
+# change the physics, so neither is part of the key
+SKIP_INPUTS = ('constant/polyMesh', 'system/decomposeParDict')
+META_NAME = 'meta.json'
+
+_BINARY_FORMAT_RE = re.compile(rb'^\s*format\s+binary\s*;', re.MULTILINE)
+
+
+def _canonical_text(text):
+    """Return dictionary text with comments removed and whitespace normalised"""
+    text = hea_foamio.strip_comments(text)
+    return ' '.join(text.split())
+
+
+def _canonical_bytes(path):
+    """Return the bytes of an input file that determine the case
+
+    ASCII dictionaries are canonicalised as text. The raw payload of a binary
+    field is not text: decoding would merge invalid bytes and could strip byte
+    runs that look like comments, so its parsed entries and exact values are
+    hashed instead.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = data[:data.find(b'}') + 1] if b'}' in data else data
+    if _BINARY_FORMAT_RE.search(header) is None:
+        return _canonical_text(data.decode('utf-8', errors='replace')).encode('utf-8')
+    try:
+        entries, internal = hea_foamio.read_field(path)
+    except (ValueError, IndexError):
+        # Not a field read_field understands; only the exact bytes are safe
+        return data
+    entries = json.dumps(entries, sort_keys=True).encode('utf-8')
+    if isinstance(internal, str) or internal is None:
+        return entries + b'\0' + str(internal).encode('utf-8')
+    return entries + b'\0' + internal.astype('<f8').tobytes()
+
+
+def _iter_input_files(case_dir):
+    for top in INPUT_DIRS:
+        root = case_dir / top
+        if not root.is_dir():
+            continue
+        for path in sorted(root.rglob('*')):
+            rel = path.relative_to(case_dir).as_posix()
+            if path.is_file() and not any(rel.startswith(skip) for skip in SKIP_INPUTS):
+                yield rel, path
+
+
+def case_key(case_dir):
+    """Return the canonical SHA-256 key of a case's inputs"""
+    case_dir = Path(case_dir)
+    digest = hashlib.sha256()
+    for rel, path in _iter_input_files(case_dir):
+        digest.update(rel.encode('utf-8') + b'\0' + _canonical_bytes(path) + b'\0')
+    return digest.hexdigest()
+
+
+def _is_time_dir(path):
+    try:
+        return path.is_dir() and float(path.name) > 0
+    except ValueError:
+        return False
+
+
+def result_entries(case_dir):
+    """Return the result paths of a finished case, relative to the case directory"""
+    case_dir = Path(case_dir)
+    entries = [p.name for p in case_dir.iterdir()
+               if _is_time_dir(p) or p.name == 'postProcessing'
+               or p.name.startswith('log.')]
+    if (case_dir / 'constant' / 'polyMesh' / 'owner').exists():
+        entries.append('constant/polyMesh')
+    return sorted(entries)
+
+
+def _copy_file(src, dst):
+    """Copy a file to a new inode, writable by its owner"""
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    shutil.copy2(src, dst)
+    os.chmod(dst, os.stat(dst).st_mode | stat.S_IWUSR)
+
+
+def _transfer(src, dst):
+    if src.is_dir():
+        shutil.copytree(src, dst, copy_function=_copy_file, dirs_exist_ok=True)
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        _copy_file(src, dst)
+
+
+def _make_read_only(root):
+    """Remove write permission from every file below root (directories stay writable)"""
+    for path in Path(root).rglob('*'):
+        if path.is_file():
+            os.chmod(path, stat.S_IMODE(path.stat().st_mode) & ~0o222)
+
+
+def _tree_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+
+class ResultCache:
+    """Size-bounded LRU cache of case results keyed by canonical input hash"""
+
+    def __init__(self, root, max_bytes=50 * 1024**3, verbose=True):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.verbose = verbose
+
+    def log(self, message):
+        """Print a progress message unless running quietly"""
+        if self.verbose:
+            print(message, flush=True)
+
+    def _entry(self, key):
+        return self.root / key
+
+    def lookup(self, case_dir):
+        """Return the cache key and entry directory of a case, or (key, None)"""
+        key = case_key(case_dir)
+        entry = self._entry(key)
+        return key, (entry if (entry / META_NAME).exists() else None)
+
+    def fetch(self, case_dir):
+        """Populate a case with cached results; return True on a cache hit"""
+        case_dir = Path(case_dir)
+        key, entry = self.lookup(case_dir)
+        if entry is None:
+            return False
+        with open(entry / META_NAME, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        for rel in meta['entries']:
+            _transfer(entry / rel, case_dir / rel)
+        # The mtime of the meta file is the LRU clock
+        os.utime(entry / META_NAME)
+        self.log(f"Cache hit {key[:12]}: {case_dir}")
+        return True
+
+    def store(self, case_dir):
+        """Add the results of a finished case to the cache and return its key"""
+        case_dir = Path(case_dir)
+        key = case_key(case_dir)
+        entry = self._entry(key)
+        if (entry / META_NAME).exists():
+            os.utime(entry / META_NAME)
+            return key
+        entries = result_entries(case_dir)
+        if not entries:
+            return None
+
+        # Build in a private directory and rename, so readers never see partial entries
+        staging = self.root / f".staging-{uuid.uuid4().hex}"
+        for rel in entries:
+            _transfer(case_dir / rel, staging / rel)
+        _make_read_only(staging)
+        meta = {'key': key, 'source': str(case_dir), 'stored': time.time(),
+                'entries': entries, 'bytes': _tree_size(staging)}
+        # The meta file stays writable: its mtime is the LRU clock
+        with open(staging / META_NAME, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+            return key
+        self.log(f"Cached {key[:12]}: {case_dir}")
+        self.evict()
+        return key
+
+    def entries(self):
+        """Return (last_used, bytes, path) for every cache entry"""
+        result = []
+        for entry in self.root.iterdir():
+            meta_path = entry / META_NAME
+            if entry.name.startswith('.') or not meta_path.exists():
+                continue
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                size = json.load(f).get('bytes', 0)
+            result.append((meta_path.stat().st_mtime, size, entry))
+        return result
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the cache fits its size limit"""
+        limit = self.max_bytes if max_bytes is None else int(max_bytes)
+        entries = sorted(self.entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            self.log(f"Evicted {removed} cache entr{'y' if removed == 1 else 'ies'}")
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed HEA result cache")
+    parser.add_argument('action', choices=['key', 'fetch', 'store', 'evict'])
+    parser.add_argument('cases', nargs='*', help="case directories")
+    parser.add_argument('--cache', default='hea_cache', help="cache directory")
+    parser.add_argument('--max-gb', type=float, default=50.0, help="cache size limit in GB")
+    args = parser.parse_args(argv)
+
+    if args.action == 'key':
+        for case_dir in args.cases:
+            print(f"{case_key(case_dir)}  {case_dir}")
+        return 0
+
+    cache = ResultCache(args.cache, max_bytes=args.max_gb * 1024**3)
+    if args.action == 'evict':
+        cache.evict()
+        return 0
+    misses = 0
+    for case_dir in args.cases:
+        if args.action == 'fetch':
+            misses += not cache.fetch(case_dir)
+        else:
+            cache.store(case_dir)
+    # 'fetch' exits non-zero on a miss so run scripts can branch on it
+    return 1 if misses else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
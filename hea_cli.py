@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the HEA solidification tools
+
+    python hea_cli.py generate --base-path runs --name HEA_1 --set liquidus_temp=1700
+    python hea_cli.py sweep sweep/ --grid liquidus_temp=1700,1723,1750
+    python hea_cli.py sweep sweep/ --grid composition=CoCrFeMnNi,Al0.3CoCrFeMnNi
+    python hea_cli.py validate --sweep sweep/
+    python hea_cli.py run --sweep sweep/ --cores 8
+    python hea_cli.py monitor sweep/*
+    python hea_cli.py monitor --live --sweep sweep/ --port 8765
+    python hea_cli.py post sweep/*
+    python hea_cli.py profile sweep/*
+    python hea_cli.py archive sweep/* --compression xz
+
+--json prints one machine-readable JSON document on stdout and --quiet drops the
+progress messages. Only argparse/json are imported at startup; each subcommand
+imports what it needs, so hooks can call 'generate' many times cheaply.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _parse_value(text):
+    """Return text as int, float or str, whichever fits first"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _parse_assignments(items):
+    """Turn ['key=value', ...] into a dict with typed values"""
+    result = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected key=value, got: {item}")
+        result[key.strip()] = _parse_value(value.strip())
+    return result
+
+
+def cmd_generate(args):
+    from setup_hea_solidification import HEASolidificationCase
+
+    initial_temperature = None
+    if args.initial_t:
+        import numpy as np
+        initial_temperature = np.load(args.initial_t)
+    case = HEASolidificationCase(args.base_path, case_name=args.name, n_procs=args.n_procs,
+                                 properties=_parse_assignments(args.set),
+                                 warm_start_time=args.warm_start,
+                                 initial_temperature=initial_temperature,
+                                 field_format=args.format, verbose=not args.quiet,
+                                 profile=args.profile, mesh_cells=args.mesh,
+                                 composition=args.composition, thermo_model=args.thermo,
+                                 amr_levels=args.amr, amr_criterion=args.amr_criterion)
+    case.setup_complete_case()
+    return {'case_dir': str(case.case_dir), 'properties': case.properties,
+            'n_procs': case.n_procs}
+
+
+def cmd_sweep(args):
+    import hea_sweep
+
+    variations = []
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            variations.extend(json.load(f))
+    if args.grid:
+        grid = {}
+        for item in args.grid:
+            key, _, values = item.partition('=')
+            grid[key.strip()] = [_parse_value(v.strip()) for v in values.split(',')]
+        variations.extend(hea_sweep.grid_variations(grid))
+    if not variations:
+        raise SystemExit("Nothing to generate: give --grid and/or --spec")
+    manifest = hea_sweep.generate_sweep(args.sweep_dir, variations, verbose=not args.quiet,
+                                        profile=args.profile)
+    return {'sweep_dir': args.sweep_dir, 'n_cases': len(manifest['cases']),
+            'cases': [entry['name'] for entry in manifest['cases']]}
+
+
+def _make_cache(args):
+    if not args.cache:
+        return None
+    import hea_cache
+    return hea_cache.ResultCache(args.cache, max_bytes=args.cache_gb * 1024**3,
+                                 verbose=not args.quiet)
+
+
+def cmd_run(args):
+    if args.distributed:
+        import hea_distributed
+        if not args.sweep:
+            raise SystemExit("--distributed needs --sweep")
+        worker = hea_distributed.SweepWorker(args.sweep, command=args.command,
+                                             max_attempts=args.retries + 1,
+                                             cache=_make_cache(args), verbose=not args.quiet)
+        return {'worker': worker.worker_id, 'ran': worker.run()}
+
+    import hea_scheduler
+    cases = list(args.cases)
+    if args.sweep:
+        import hea_sweep
+        cases.extend(hea_sweep.case_paths(args.sweep))
+    scheduler = hea_scheduler.LocalScheduler(args.state, max_cores=args.cores,
+                                             max_retries=args.retries, command=args.command,
+                                             cache=_make_cache(args), validate=args.validate,
+                                             verbose=not args.quiet)
+    scheduler.add_cases(cases)
+    counts = scheduler.run()
+    return {'counts': counts, 'ok': counts[hea_scheduler.FAILED] == 0}
+
+
+def cmd_validate(args):
+    import hea_validate
+
+    cases = list(args.cases)
+    if args.sweep:
+        import hea_sweep
+        cases.extend(hea_sweep.case_paths(args.sweep))
+    results = hea_validate.validate_cases(cases, args.workers)
+    failed = [r for r in results if r['errors'] or (args.strict and r['warnings'])]
+    if not args.json and not args.quiet:
+        for result in results:
+            for message in result['errors']:
+                print(f"{result['case']}: ERROR {message}")
+            for message in result['warnings']:
+                print(f"{result['case']}: WARNING {message}")
+        print(f"{len(results) - len(failed)}/{len(results)} case(s) passed")
+    return {'ok': not failed, 'results': results}
+
+
+def cmd_monitor(args):
+    import hea_monitor
+
+    if args.live:
+        import asyncio
+        service = hea_monitor.MonitorService(args.cases, sweep_dir=args.sweep,
+                                             interval=args.interval, verbose=not args.quiet)
+        try:
+            asyncio.run(hea_monitor.run_live(service, args.host, args.port,
+                                             until_done=args.until_done,
+                                             terminal=not args.quiet))
+        except KeyboardInterrupt:
+            pass
+        return service.snapshot()['summary']
+    cases = list(args.cases)
+    if args.sweep:
+        import hea_sweep
+        cases.extend(hea_sweep.case_paths(args.sweep))
+    statuses = [hea_monitor.case_status(case_dir) for case_dir in cases]
+    if not args.json and not args.quiet:
+        print(hea_monitor.format_table(statuses))
+    return statuses
+
+
+def cmd_post(args):
+    import hea_post
+
+    summaries = []
+    for case_dir in args.cases:
+        if args.profile:
+            import hea_profiling
+            profiler = hea_profiling.Profiler(case_dir=case_dir)
+            with profiler.stage('post:summarize_case'):
+                summary = hea_post.summarize_case(case_dir)
+            profiler.save()
+        else:
+            summary = hea_post.summarize_case(case_dir)
+        summaries.append(summary)
+        if not args.json and not args.quiet:
+            print(f"{case_dir}: solidification time {summary.get('solidification_time')}")
+    return summaries
+
+
+def cmd_amr(args):
+    import hea_amr
+
+    results = []
+    for case_dir in args.cases:
+        result = hea_amr.estimate_savings(case_dir, args.levels, args.buffer, args.criterion)
+        results.append(result)
+        if not args.json and not args.quiet:
+            print(f"{case_dir}: {result['mean_cells']:.0f} cells on average vs "
+                  f"{result['uniform_cells']} uniform "
+                  f"({hea_amr.describe_savings(result['savings'])}), "
+                  f"{result['uniform_2d_cells']} uniform 2D "
+                  f"({hea_amr.describe_savings(result['savings_vs_2d'])})")
+    return results
+
+
+def cmd_properties(args):
+    import hea_properties
+
+    rows = hea_properties.default_database().properties(args.compositions)
+    if not args.json and not args.quiet:
+        print(hea_properties.format_table(args.compositions, rows))
+    return dict(zip(args.compositions, rows))
+
+
+def cmd_archive(args):
+    import hea_archive
+
+    results = []
+    for case_dir in args.cases:
+        result = hea_archive.archive_case(case_dir, compression=args.compression,
+                                          include_processors=args.processors,
+                                          remove=args.remove)
+        results.append(result)
+        if not args.json and not args.quiet:
+            print(f"Archived: {result['archive']} (ratio {result['ratio']:.1f})")
+    return results
+
+
+def cmd_profile(args):
+    import hea_profiling
+
+    for case_dir in args.cases:
+        hea_profiling.profile_solver(case_dir)
+    rows = hea_profiling.aggregate(args.cases, args.csv)
+    if not args.json and not args.quiet:
+        for row in rows:
+            print(f"{row['stage']:<40} n={row['count']:<5} total={row['total_s']:10.3f} s "
+                  f"mean={row['mean_s']:8.4f} s")
+    return rows
+
+
+def build_parser():
+    """Return the argument parser with every subcommand"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help="print a JSON result on stdout")
+    common.add_argument('--quiet', action='store_true', help="suppress progress messages")
+    profiled = argparse.ArgumentParser(add_help=False)
+    profiled.add_argument('--profile', action='store_true',
+                          help="record stage timings in hea_profile.json")
+
+    parser = argparse.ArgumentParser(prog='hea_cli.py', description="HEA solidification tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('generate', parents=[common, profiled], help="generate one case")
+    p.add_argument('--base-path', default='.', help="directory to create the case in")
+    p.add_argument('--name', default='HEA_Solidification', help="case directory name")
+    p.add_argument('--n-procs', type=int, default=1, help="MPI ranks")
+    p.add_argument('--mesh', type=int, nargs=2, default=(50, 100), metavar=('NX', 'NY'),
+                   help="cells across the mold width and height")
+    p.add_argument('--composition', default=None, metavar='FORMULA',
+                   help="estimate properties for an alloy, e.g. Al0.5CoCrFeMnNi")
+    p.add_argument('--thermo', choices=['const', 'tabulated'], default='const',
+                   help="temperature dependence of Cp and conductivity")
+    p.add_argument('--amr', type=int, default=0, metavar='LEVELS',
+                   help="refine the mesh this many levels around the solidification front")
+    p.add_argument('--amr-criterion', choices=['band', 'gradient'], default='band',
+                   help="refine the solidus-liquidus band or where alpha1 is steep")
+    p.add_argument('--set', action='append', metavar='KEY=VALUE',
+                   help="override a material property, e.g. liquidus_temp=1700")
+    p.add_argument('--warm-start', type=float, default=None, metavar='TIME',
+                   help="start from a conduction-model T field at this time")
+    p.add_argument('--initial-t', default=None, metavar='NPY',
+                   help=".npy file with one initial temperature per cell")
+    p.add_argument('--format', choices=['ascii', 'binary'], default='ascii',
+                   help="format of nonuniform fields")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser('sweep', parents=[common, profiled], help="generate a parameter sweep")
+    p.add_argument('sweep_dir', help="sweep directory")
+    p.add_argument('--grid', action='append', metavar='KEY=V1,V2,...',
+                   help="parameter values; several --grid options form a cartesian product")
+    p.add_argument('--spec', default=None, help="JSON file with a list of variations")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser('run', parents=[common], help="run cases locally or as a sweep worker")
+    p.add_argument('cases', nargs='*', help="case directories")
+    p.add_argument('--sweep', default=None, help="run every case of a sweep")
+    p.add_argument('--cores', type=int, default=None, help="core budget (default: all)")
+    p.add_argument('--retries', type=int, default=1, help="retries per failed case")
+    p.add_argument('--command', default=None, help="command run in each case")
+    p.add_argument('--state', default='hea_queue.json', help="queue state file")
+    p.add_argument('--cache', default=None, help="result cache directory")
+    p.add_argument('--cache-gb', type=float, default=50.0, help="result cache size limit")
+    p.add_argument('--distributed', action='store_true',
+                   help="claim cases from a shared sweep directory instead")
+    p.add_argument('--validate', action='store_true',
+                   help="fail cases with pre-flight validation errors instead of running them")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('validate', parents=[common], help="check cases before running them")
+    p.add_argument('cases', nargs='*', help="case directories")
+    p.add_argument('--sweep', default=None, help="validate every case of a sweep")
+    p.add_argument('--workers', type=int, default=None, help="worker processes")
+    p.add_argument('--strict', action='store_true', help="fail on warnings too")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser('monitor', parents=[common], help="show progress of cases")
+    p.add_argument('cases', nargs='*', help="case directories")
+    p.add_argument('--sweep', default=None, help="monitor every case of a sweep")
+    p.add_argument('--live', action='store_true',
+                   help="keep watching, with a terminal view and an HTTP endpoint")
+    p.add_argument('--interval', type=float, default=2.0, help="seconds between refreshes")
+    p.add_argument('--host', default='127.0.0.1', help="HTTP address (live mode)")
+    p.add_argument('--port', type=int, default=8765, help="HTTP port, 0 to disable")
+    p.add_argument('--until-done', action='store_true',
+                   help="exit once every case has finished or failed")
+    p.set_defaults(func=cmd_monitor)
+
+    p = sub.add_parser('post', parents=[common, profiled], help="summarise finished cases")
+    p.add_argument('cases', nargs='+', help="case directories")
+    p.set_defaults(func=cmd_post)
+
+    p = sub.add_parser('profile', parents=[common], help="aggregate stage profiles of cases")
+    p.add_argument('cases', nargs='+', help="case directories")
+    p.add_argument('--csv', default=None, help="write the aggregate to this CSV")
+    p.set_defaults(func=cmd_profile)
+
+    p = sub.add_parser('amr', parents=[common], help="estimate AMR cell-count savings")
+    p.add_argument('cases', nargs='+', help="case directories (base mesh)")
+    p.add_argument('--levels', type=int, default=None, help="refinement levels")
+    p.add_argument('--buffer', type=int, default=None, help="buffer layers")
+    p.add_argument('--criterion', choices=['band', 'gradient'], default=None)
+    p.set_defaults(func=cmd_amr)
+
+    p = sub.add_parser('properties', parents=[common],
+                       help="estimate material properties from composition")
+    p.add_argument('compositions', nargs='+', help="formulas, e.g. Al0.5CoCrFeMnNi")
+    p.set_defaults(func=cmd_properties)
+
+    p = sub.add_parser('archive', parents=[common], help="compress finished cases")
+    p.add_argument('cases', nargs='+', help="case directories")
+    p.add_argument('--compression', choices=['gz', 'bz2', 'xz', 'none'], default='xz')
+    p.add_argument('--processors', action='store_true', help="keep processor* dirs")
+    p.add_argument('--remove', action='store_true', help="delete cases once archived")
+    p.set_defaults(func=cmd_archive)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Keep stdout parseable when a JSON result is requested
+    args.quiet = args.quiet or args.json
+    try:
+        result = args.func(args)
+    except Exception as e:
+        if args.json:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        else:
+            print(f"\nERROR: {e}", file=sys.stderr)
+            if not args.quiet:
+                import traceback
+                traceback.print_exc()
+        return 1
+    if args.json:
+        print(json.dumps(result, default=str))
+    return 0 if not (isinstance(result, dict) and result.get('ok') is False) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Quantitative comparison of a fast model against reference OpenFOAM results
+
+Compares the T and liquid-fraction fields of a candidate (a coarser mesh, a
+half domain with a symmetry plane, a Python reference solver writing time
+directories, or the POD model of hea_rom) with a reference case, time by
+time, on the reference mesh:
+
+- RMS and maximum temperature error, and the RMS error relative to the
+  reference temperature spread;
+- RMS liquid-fraction error and the error of the mean liquid fraction;
+- solidification front position error on the vertical centreline;
+- the solidification time error.
+
+Candidate fields are mapped onto the reference mesh by a precomputed sparse
+bilinear operator (four source cells and weights per target cell) that is
+built once per pair of grids and reused for every time and every case of a
+sweep. Candidate times are interpolated linearly to the reference times.
+
+    python hea_compare.py ref_case coarse_case
+    python hea_compare.py --sweep ref_sweep --candidate coarse_sweep --output comparison.json
+    python hea_compare.py --sweep ref_sweep --rom rom.npz
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import hea_foamio
+import hea_post
+
+
+class InterpolationOperator:
+    """Sparse bilinear map between the cell centres of two structured grids
+
+    index and weights have shape (target cells, 4). Cells are ordered x
+    fastest, as blockMesh numbers them. Target points outside the source
+    domain take the nearest source values; with mirror, a source covering the
+    left part of the target domain is reflected about its right boundary (a
+    half domain with a symmetry plane).
+    """
+
+    def __init__(self, index, weights, source_cells, outside=0.0):
+        self.index = index
+        self.weights = weights
+        self.source_cells = source_cells
+        # Fraction of target cells extrapolated rather than interpolated
+        self.outside = outside
+
+    @classmethod
+    def between(cls, source_grid, target_grid, mirror=False):
+        import numpy as np
+
+        slx, sly, snx, sny = source_grid
+        tlx, tly, tnx, tny = target_grid
+        x = (np.arange(tnx) + 0.5) * tlx / tnx
+        y = (np.arange(tny) + 0.5) * tly / tny
+        if mirror:
+            x = np.where(x > slx, 2.0 * slx - x, x)
+        ix, wx, out_x = _axis_weights(x, slx, snx)
+        iy, wy, out_y = _axis_weights(y, sly, sny)
+        # Tensor product of the 1D stencils, target cells x fastest
+        i0, i1 = np.tile(ix, tny), np.tile(np.minimum(ix + 1, snx - 1), tny)
+        j0, j1 = np.repeat(iy, tnx), np.repeat(np.minimum(iy + 1, sny - 1), tnx)
+        fx, fy = np.tile(wx, tny), np.repeat(wy, tnx)
+        index = np.stack([j0 * snx + i0, j0 * snx + i1, j1 * snx + i0, j1 * snx + i1], axis=1)
+        weights = np.stack([(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy], axis=1)
+        outside = float((np.tile(out_x, tny) | np.repeat(out_y, tnx)).mean())
+        return cls(index, weights, snx * sny, outside)
+
+    def __call__(self, values):
+        """Map source values of shape (source cells,) or (source cells, k) to the target"""
+        import numpy as np
+
+        values = np.asarray(values)
+        if len(values) != self.source_cells:
+            raise ValueError(f"Expected {self.source_cells} source values, got {len(values)}")
+        if values.ndim == 1:
+            return (values[self.index] * self.weights).sum(axis=1)
+        return np.einsum('tk,tkm->tm', self.weights, values[self.index])
+
+
+def _axis_weights(x, length, n):
+    """Lower cell index, fraction towards the next cell and outside flag along one axis"""
+    import numpy as np
+
+    s = x * n / length - 0.5
+    outside = (x < 0.0) | (x > length)
+    s = np.clip(s, 0.0, n - 1)
+    i = np.minimum(np.floor(s).astype(int), max(n - 2, 0))
+    return i, s - i, outside
+
+
+@functools.lru_cache(maxsize=None)
+def operator_between(source_grid, target_grid, mirror=False):
+    """Cached InterpolationOperator for a pair of grids"""
+    return InterpolationOperator.between(source_grid, target_grid, mirror)
+
+
+class CaseFields:
+    """T and liquid fraction of a case at any time between its written times
+
+    Time directories are read on demand and the last two kept, so walking the
+    times in order reads each file once.
+    """
+
+    def __init__(self, case_dir):
+        import numpy as np
+
+        self.np = np
+        self.case_dir = Path(case_dir)
+        self.grid = hea_foamio.read_block_mesh_grid(self.case_dir)
+        self.melting_range = hea_post.melting_range(self.case_dir)
+        self._dirs = [(t, d) for t, d in hea_post.time_directories(self.case_dir)
+                      if (d / 'T').exists()]
+        self.times = np.array([t for t, _ in self._dirs])
+        self._cache = {}
+
+    def _snapshot(self, i):
+        if i not in self._cache:
+            np = self.np
+            n_cells = self.grid[2] * self.grid[3]
+            time_dir = self._dirs[i][1]
+            _, T = hea_foamio.read_field(time_dir / 'T')
+            if isinstance(T, str):
+                T = np.full(n_cells, float(T.split()[-1]))
+            elif len(T) != n_cells:
+                raise ValueError(f"{time_dir / 'T'} has {len(T)} cells, not the blockMesh "
+                                 f"{self.grid[2]}x{self.grid[3]}")
+            alpha = hea_post.liquid_fraction_field(time_dir, *self.melting_range, T)
+            if len(self._cache) >= 2:
+                self._cache.pop(min(self._cache))
+            self._cache[i] = (T, alpha)
+        return self._cache[i]
+
+    def fields(self, t):
+        """Return (T, alpha) at time t, linear in time between written directories"""
+        np = self.np
+        i = int(np.searchsorted(self.times, t))
+        if i < len(self.times) and self.times[i] == t:
+            return self._snapshot(i)
+        i = min(max(i, 1), len(self.times) - 1)
+        t0, t1 = self.times[i - 1], self.times[i]
+        w = (t - t0) / (t1 - t0)
+        (T0, a0), (T1, a1) = self._snapshot(i - 1), self._snapshot(i)
+        return (1 - w) * T0 + w * T1, (1 - w) * a0 + w * a1
+
+
+class ROMFields:
+    """Fields of a hea_rom model at one parameter set, with the CaseFields interface"""
+
+    def __init__(self, model, query):
+        self.model = model
+        self.query = query
+        self.grid = model.grid
+        self.times = model.times
+
+    def fields(self, t):
+        result = self.model.reconstruct(self.query, t)
+        return result['T'], result['solidification:alpha1']
+
+
+@functools.lru_cache(maxsize=4)
+def _load_rom(path):
+    import hea_rom
+
+    return hea_rom.ReducedOrderModel.load(path)
+
+
+def compare(reference, candidate, operator=None, mirror=False):
+    """Error metrics of candidate against reference at every reference time both cover
+
+    reference and candidate are CaseFields or ROMFields. Returns a dict with
+    one row per time under 'series' and their reduction under 'summary'.
+    """
+    import numpy as np
+
+    if operator is None:
+        operator = operator_between(tuple(candidate.grid), tuple(reference.grid), mirror)
+    lo, hi = candidate.times[0], candidate.times[-1]
+    times = [t for t in reference.times if lo - 1e-9 <= t <= hi + 1e-9]
+    series = []
+    solid = {'reference': None, 'candidate': None}
+    for t in times:
+        T_ref, a_ref = reference.fields(t)
+        T_cand, a_cand = candidate.fields(t)
+        T_cand, a_cand = operator(T_cand), operator(a_cand)
+        error = T_cand - T_ref
+        spread = float(T_ref.max() - T_ref.min())
+        T_rms = float(np.sqrt(np.mean(error**2)))
+        row = {
+            'time': float(t),
+            'T_rms': T_rms,
+            'T_max': float(np.abs(error).max()),
+            'T_relative': T_rms / spread if spread > 0 else 0.0,
+            'alpha_rms': float(np.sqrt(np.mean((a_cand - a_ref)**2))),
+            'liquid_fraction_error': float(a_cand.mean() - a_ref.mean()),
+            'front_error': (hea_post.front_height(a_cand, reference.grid)
+                            - hea_post.front_height(a_ref, reference.grid)),
+        }
+        for key, alpha in (('reference', a_ref), ('candidate', a_cand)):
+            if solid[key] is None and alpha.mean() < hea_post.SOLID_THRESHOLD:
+                solid[key] = float(t)
+        series.append(row)
+    summary = {'n_times': len(series), 'outside_fraction': operator.outside}
+    if series:
+        for name in ('T_rms', 'T_relative', 'alpha_rms'):
+            values = [row[name] for row in series]
+            summary[f'{name}_mean'] = float(np.mean(values))
+            summary[f'{name}_max'] = float(np.max(values))
+        summary['T_max'] = max(row['T_max'] for row in series)
+        fronts = [abs(row['front_error']) for row in series]
+        summary['front_error_mean'] = float(np.mean(fronts))
+        summary['front_error_max'] = float(np.max(fronts))
+        summary['solidification_time_error'] = (
+            solid['candidate'] - solid['reference']
+            if None not in solid.values() else None)
+    return {'series': series, 'summary': summary}
+
+
+def _compare_task(task):
+    """Worker entry point: (reference dir, candidate spec, mirror) -> result dict"""
+    reference_dir, candidate, mirror = task
+    start = time.perf_counter()
+    reference = CaseFields(reference_dir)
+    if isinstance(candidate, dict):
+        candidate_fields = ROMFields(_load_rom(candidate['rom']), candidate['params'])
+        label = f"{candidate['rom']} {candidate['params']}"
+    else:
+        candidate_fields = CaseFields(candidate)
+        label = str(candidate)
+    result = compare(reference, candidate_fields, mirror=mirror)
+    result.update({'reference': str(reference_dir), 'candidate': label,
+                   'seconds': time.perf_counter() - start})
+    return result
+
+
+def pair_sweeps(reference_sweep, candidate_sweep=None, rom=None):
+    """Pair the cases of a reference sweep with their candidates
+
+    Sweep candidates are matched by case name, or by identical parameters
+    when the names differ; a ROM candidate takes each reference case's
+    parameters. Returns a list of (reference dir, candidate) and the names of
+    reference cases without a candidate.
+    """
+    import hea_sweep
+
+    def key(entry):
+        return (json.dumps(entry.get('params', {}), sort_keys=True),
+                json.dumps(entry.get('composition'), sort_keys=True))
+
+    pairs, unmatched = [], []
+    by_name, by_params = {}, {}
+    if candidate_sweep is not None:
+        for entry in hea_sweep.load_manifest(candidate_sweep)['cases']:
+            path = Path(candidate_sweep) / entry['case_dir']
+            by_name[entry['name']] = path
+            by_params.setdefault(key(entry), path)
+    for entry in hea_sweep.load_manifest(reference_sweep)['cases']:
+        reference_dir = Path(reference_sweep) / entry['case_dir']
+        if not hea_post.time_directories(reference_dir):
+            unmatched.append(entry['name'])
+            continue
+        if rom is not None:
+            # The numeric overrides, as hea_rom.sweep_cases trains on
+            query = {key: value for key, value in entry.get('params', {}).items()
+                     if isinstance(value, (int, float))}
+            if entry.get('composition'):
+                query['composition'] = entry['composition']
+            pairs.append((reference_dir, {'rom': str(rom), 'params': query}))
+            continue
+        candidate = by_name.get(entry['name']) or by_params.get(key(entry))
+        if candidate is None or not hea_post.time_directories(candidate):
+            unmatched.append(entry['name'])
+        else:
+            pairs.append((reference_dir, candidate))
+    return pairs, unmatched
+
+
+def compare_many(pairs, mirror=False, workers=None):
+    """Compare many (reference, candidate) pairs, in worker processes when there are enough
+
+    Each worker builds the operator of a grid pair once and reuses it for all
+    of its cases with the same grids.
+    """
+    tasks = [(str(ref), cand if isinstance(cand, dict) else str(cand), mirror)
+             for ref, cand in pairs]
+    workers = min(int(workers or os.cpu_count() or 1), len(tasks))
+    # Starting a process costs more than comparing a handful of cases
+    if workers <= 1 or len(tasks) < 4 * workers:
+        return [_compare_task(task) for task in tasks]
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_compare_task, tasks, chunksize=chunksize))
+
+
+def format_table(results):
+    lines = [f"{'reference':<32} {'times':>5} {'T rms':>8} {'T max':>8} {'alpha rms':>9} "
+             f"{'front':>9} {'t_solid':>8}"]
+    for result in results:
+        s = result['summary']
+        if not s['n_times']:
+            lines.append(f"{result['reference'][-32:]:<32} {0:>5}  (no common times)")
+            continue
+        dt = s['solidification_time_error']
+        lines.append(f"{result['reference'][-32:]:<32} {s['n_times']:>5} {s['T_rms_mean']:>8.3g} "
+                     f"{s['T_max']:>8.3g} {s['alpha_rms_mean']:>9.3g} "
+                     f"{s['front_error_max'] * 1e3:>7.3g}mm "
+                     f"{'-' if dt is None else f'{dt:+.3g}':>8}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare fast-model fields with reference HEA cases")
+    parser.add_argument('cases', nargs='*', metavar='REFERENCE CANDIDATE',
+                        help="a reference case and a candidate case")
+    parser.add_argument('--sweep', default=None, help="reference sweep")
+    parser.add_argument('--candidate', default=None, help="candidate sweep")
+    parser.add_argument('--rom', default=None, help="hea_rom model as the candidate")
+    parser.add_argument('--mirror', action='store_true',
+                        help="candidates are half domains, mirrored about their right boundary")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes")
+    parser.add_argument('--output', default=None,
+                        help="write the per-time errors of every pair as JSON")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        if (args.candidate is None) == (args.rom is None):
+            parser.error("--sweep needs exactly one of --candidate and --rom")
+        pairs, unmatched = pair_sweeps(args.sweep, args.candidate, args.rom)
+        for name in unmatched:
+            print(f"WARNING: no results to compare for {name}", file=sys.stderr)
+    elif len(args.cases) == 2:
+        pairs = [(args.cases[0], args.cases[1])]
+    else:
+        parser.error("give a reference and a candidate case, or --sweep")
+    if not pairs:
+        print("Nothing to compare", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results = compare_many(pairs, args.mirror, args.workers)
+    elapsed = time.perf_counter() - start
+    print(format_table(results))
+    print(f"{len(results)} comparison(s) in {elapsed:.2f} s")
+    if any(r['summary']['outside_fraction'] > 0 for r in results):
+        print("WARNING: the candidate domain does not cover the reference domain; "
+              "uncovered cells were extrapolated", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Automated mesh-convergence study with early stopping
+
+Copies a generated template case onto a sequence of meshes refined by a constant
+ratio from its blockMeshDict resolution and runs them coarsest first through the
+local scheduler. After each run the quantities of interest (solidification
+time, front height at a fixed time, peak velocity) of the three finest meshes so
+far are compared with the grid convergence index (GCI) of Celik et al. (2008),
+including Richardson extrapolation. The study stops as soon as the GCI of every
+quantity is within the tolerance and reports the cheapest mesh whose estimated
+error meets it. Progress is kept in convergence.json so a study can be resumed.
+
+    python hea_convergence.py HEA_Solidification mesh_study --ratio 1.5 --tolerance 0.02
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import hea_amr
+import hea_foamio
+
+STATE_NAME = 'convergence.json'
+QUEUE_NAME = 'convergence_queue.json'
+QUANTITIES = ('solidification_time', 'front_height', 'peak_velocity')
+# Safety factors of the GCI for three-grid and two-grid estimates
+SAFETY_FACTOR = 1.25
+SAFETY_FACTOR_TWO_GRIDS = 3.0
+# Order assumed when only two meshes are available
+FORMAL_ORDER = 2.0
+# Run outputs not copied from the template
+TEMPLATE_SKIP = ('processor', 'log.', 'postProcessing', 'hea_')
+_RUN_SCRIPT_CD_RE = re.compile(r'^cd\s+"?/[^\n]*$', re.MULTILINE)
+
+
+def observed_order(f1, f2, f3, r21, r32, iterations=50):
+    """Apparent order p of three solutions (fine to coarse), or None if undefined"""
+    e21, e32 = f2 - f1, f3 - f2
+    if e21 == 0 or e32 == 0:
+        return None
+    ratio = e32 / e21
+    s = 1.0 if ratio > 0 else -1.0
+    p = abs(math.log(abs(ratio))) / math.log(r21)
+    # Fixed-point iteration for unequal refinement ratios
+    for _ in range(iterations):
+        a, b = r21**p - s, r32**p - s
+        if a <= 0 or b <= 0:
+            return None
+        p_new = abs(math.log(abs(ratio)) + math.log(a / b)) / math.log(r21)
+        if abs(p_new - p) < 1e-10:
+            return p_new
+        p = p_new
+    return p
+
+
+def grid_convergence(values, ratios):
+    """GCI of the finest of two or three solutions
+
+    values are ordered coarse to fine; ratios[i] is the refinement ratio (h_coarse
+    / h_fine) between values[i] and values[i + 1]. Returns the observed order,
+    the Richardson-extrapolated value, the approximate relative error of the finest
+    solution and its GCI (a relative error band).
+    """
+    f1, f2 = values[-1], values[-2]
+    r21 = ratios[-1]
+    p, safety = None, SAFETY_FACTOR
+    oscillatory = False
+    if len(values) >= 3:
+        f3, r32 = values[-3], ratios[-2]
+        p = observed_order(f1, f2, f3, r21, r32)
+        oscillatory = (f3 - f2) * (f2 - f1) < 0
+    if p is None or p <= 0:
+        p, safety = FORMAL_ORDER, SAFETY_FACTOR_TWO_GRIDS
+    if f1 == f2:
+        return {'order': p, 'extrapolated': f1, 'relative_error': 0.0, 'gci': 0.0,
+                'oscillatory': oscillatory, 'safety': safety}
+    extrapolated = (r21**p * f1 - f2) / (r21**p - 1.0)
+    relative_error = abs((f1 - f2) / f1) if f1 else math.inf
+    return {
+        'order': p,
+        'extrapolated': extrapolated,
+        'relative_error': relative_error,
+        'gci': safety * relative_error / (r21**p - 1.0),
+        'oscillatory': oscillatory,
+        'safety': safety,
+    }
+
+
+def level_mesh(base, ratio, level):
+    """Cells (nx, ny) of a refinement level; level 0 is the template mesh"""
+    return tuple(max(1, round(n * ratio**level)) for n in base)
+
+
+def _copy_template(template, case_dir, mesh):
+    """Copy the inputs of a template case and set its mesh resolution"""
+    def ignore(directory, names):
+        skipped = {n for n in names if n.startswith(TEMPLATE_SKIP)}
+        if Path(directory) == template:
+            skipped |= {n for n in names if _is_time_dir(n) and float(n) > 0}
+        if Path(directory).name == 'polyMesh':
+            skipped |= set(names)
+        return skipped
+
+    shutil.copytree(template, case_dir, ignore=ignore, dirs_exist_ok=True)
+    hea_foamio.set_block_mesh_cells(case_dir, *mesh)
+    hea_amr.fit_slab(case_dir)
+    _relocate_run_script(case_dir)
+
+
+def _relocate_run_script(case_dir):
+    """Make run.sh change into its own directory instead of the template's
+
+    Templates generated before run.sh used its own location hold an absolute
+    'cd' to the template, which would run every level in the template.
+    """
+    path = Path(case_dir) / 'run.sh'
+    if not path.exists():
+        return
+    text = path.read_text(encoding='utf-8')
+    relocated = _RUN_SCRIPT_CD_RE.sub('cd "$(dirname "$0")"', text)
+    if relocated != text:
+        path.write_text(relocated, encoding='utf-8', newline='\n')
+
+
+def _is_time_dir(name):
+    try:
+        float(name)
+    except ValueError:
+        return False
+    return True
+
+
+def _check_template(template):
+    """Reject templates whose fields are tied to their own mesh"""
+    if (template / 'warmstart.json').exists():
+        raise ValueError(f"{template} is warm-started; use a cold-start template")
+    for path in (template / '0').iterdir():
+        if path.is_file():
+            _, internal = hea_foamio.read_field(path)
+            if not isinstance(internal, str):
+                raise ValueError(f"{path} is nonuniform and cannot be reused on other meshes")
+
+
+def _has_result(record):
+    return record.get('status') == 'done' and bool(record.get('quantities'))
+
+
+def _front_height_at(series, when):
+    """Front height interpolated in time from a hea_post time series"""
+    times = [row['time'] for row in series]
+    if not times or when < times[0] or when > times[-1]:
+        return None
+    for row_a, row_b in zip(series, series[1:]):
+        if row_a['time'] <= when <= row_b['time']:
+            span = row_b['time'] - row_a['time']
+            w = (when - row_a['time']) / span if span else 0.0
+            return row_a['front_height'] + w * (row_b['front_height'] - row_a['front_height'])
+    return series[-1]['front_height']
+
+
+class ConvergenceStudy:
+    """Refine a template case level by level until the quantities converge"""
+
+    def __init__(self, template, study_dir, ratio=2.0, max_levels=4, start_level=0,
+                 tolerance=0.02, quantities=QUANTITIES, front_time=None, min_levels=3,
+                 command=None, max_cores=None, cache=None, verbose=True):
+        self.template = Path(template).resolve()
+        self.study_dir = Path(study_dir)
+        self.ratio = float(ratio)
+        self.max_levels = int(max_levels)
+        self.start_level = int(start_level)
+        self.tolerance = float(tolerance)
+        self.quantities = tuple(quantities)
+        self.front_time = front_time
+        self.min_levels = int(min_levels)
+        self.command = command
+        self.max_cores = max_cores
+        self.cache = cache
+        self.verbose = verbose
+        self.state = self._load_state()
+
+    def log(self, message):
+        if self.verbose:
+            print(message, flush=True)
+
+    def _load_state(self):
+        path = self.study_dir / STATE_NAME
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.front_time = self.front_time or state.get('front_time')
+            return state
+        return {'template': str(self.template), 'ratio': self.ratio,
+                'tolerance': self.tolerance, 'quantities': list(self.quantities),
+                'levels': []}
+
+    def save_state(self):
+        self.state['front_time'] = self.front_time
+        path = self.study_dir / STATE_NAME
+        tmp_path = path.with_name(f"{STATE_NAME}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def levels(self):
+        """Return (level, (nx, ny)) of every planned level, coarsest first"""
+        lx, ly, nx, ny = hea_foamio.read_block_mesh_grid(self.template)
+        return [(k, level_mesh((nx, ny), self.ratio, k))
+                for k in range(self.start_level, self.start_level + self.max_levels)]
+
+    def _run_level(self, level, mesh):
+        import hea_scheduler
+
+        name = f"mesh_{mesh[0]}x{mesh[1]}"
+        case_dir = self.study_dir / name
+        if not case_dir.exists():
+            _copy_template(self.template, case_dir, mesh)
+        scheduler = hea_scheduler.LocalScheduler(self.study_dir / QUEUE_NAME,
+                                                 max_cores=self.max_cores, command=self.command,
+                                                 cache=self.cache, verbose=self.verbose)
+        job = scheduler.add_case(case_dir)
+        if job.status == hea_scheduler.FAILED:
+            # A failed attempt of an earlier run of the study; try it afresh
+            job.status, job.attempts, job.returncode = hea_scheduler.PENDING, 0, None
+        scheduler.save_state()
+        scheduler.run()
+        record = {'level': level, 'name': name, 'mesh': list(mesh), 'cells': mesh[0] * mesh[1],
+                  'status': job.status, 'cached': job.cached,
+                  'seconds': (job.finished - job.started) if job.started and job.finished
+                  else None}
+        if job.status == hea_scheduler.DONE:
+            record['quantities'] = self._quantities(case_dir)
+        return record
+
+    def _quantities(self, case_dir):
+        import hea_post
+
+        summary = hea_post.summarize_case(case_dir)
+        series = hea_post.read_time_series(case_dir)
+        if self.front_time is None and series:
+            # Fixed for the whole study: halfway through the coarsest run
+            self.front_time = 0.5 * series[-1]['time']
+        return {
+            'solidification_time': summary.get('solidification_time'),
+            'front_height': _front_height_at(series, self.front_time) if series else None,
+            'peak_velocity': summary.get('peak_velocity'),
+        }
+
+    def assess(self):
+        """Compare the finished levels; return the convergence assessment"""
+        done = sorted((rec for rec in self.state['levels'] if _has_result(rec)),
+                      key=lambda rec: rec['cells'])
+        result = {'n_levels': len(done), 'quantities': {}, 'converged': False,
+                  'recommended': None}
+        if len(done) < 2:
+            return result
+        ratios = [math.sqrt(b['cells'] / a['cells']) for a, b in zip(done, done[1:])]
+        converged = len(done) >= self.min_levels
+        for name in self.quantities:
+            values = [rec['quantities'].get(name) for rec in done]
+            if any(v is None for v in values[-3:]):
+                result['quantities'][name] = {'missing': True}
+                converged = False
+                continue
+            start = max(0, len(done) - 3)
+            gci = grid_convergence(values[start:], ratios[start:])
+            # Estimated error of every level against the extrapolated value
+            reference = abs(gci['extrapolated'])
+            gci['level_errors'] = [gci['safety'] * abs(v - gci['extrapolated']) / reference
+                                   if reference and v is not None else None for v in values]
+            result['quantities'][name] = gci
+            converged = converged and gci['gci'] <= self.tolerance
+        result['converged'] = converged
+        if converged:
+            for i, rec in enumerate(done):
+                errors = [q['level_errors'][i] for q in result['quantities'].values()]
+                if all(e is not None and e <= self.tolerance for e in errors):
+                    result['recommended'] = {'name': rec['name'], 'mesh': rec['mesh'],
+                                             'cells': rec['cells']}
+                    break
+            if result['recommended'] is None:
+                rec = done[-1]
+                result['recommended'] = {'name': rec['name'], 'mesh': rec['mesh'],
+                                         'cells': rec['cells']}
+        return result
+
+    def run(self):
+        """Run levels coarsest first until converged; return the assessment"""
+        self.study_dir.mkdir(parents=True, exist_ok=True)
+        _check_template(self.template)
+        # Levels that failed or produced no quantities are run again
+        finished = {rec['name'] for rec in self.state['levels'] if _has_result(rec)}
+        assessment = self.assess()
+        for level, mesh in self.levels():
+            if assessment['converged']:
+                break
+            name = f"mesh_{mesh[0]}x{mesh[1]}"
+            if name in finished:
+                continue
+            self.log(f"Level {level}: {mesh[0]} x {mesh[1]} cells")
+            start = time.perf_counter()
+            record = self._run_level(level, mesh)
+            self.state['levels'] = sorted([rec for rec in self.state['levels']
+                                           if rec['name'] != name] + [record],
+                                          key=lambda rec: rec['cells'])
+            assessment = self.assess()
+            self.state['assessment'] = assessment
+            self.save_state()
+            self.log(f"Level {level} {record['status']} in {time.perf_counter() - start:.1f} s: "
+                     f"{record.get('quantities')}")
+            if record['status'] != 'done':
+                self.log("Stopping: level failed")
+                break
+        self.state['assessment'] = assessment
+        self.save_state()
+        return assessment
+
+
+def format_report(state):
+    """Table of levels and their quantities, GCI and the recommended mesh"""
+    assessment = state.get('assessment') or {}
+    names = state['quantities']
+    lines = [f"{'mesh':<16}{'cells':>10}" + "".join(f"{n:>22}" for n in names)]
+    for rec in state['levels']:
+        values = rec.get('quantities') or {}
+        lines.append(f"{rec['name']:<16}{rec['cells']:>10}" + "".join(
+            f"{values.get(n):>22.6g}" if values.get(n) is not None else f"{'-':>22}"
+            for n in names))
+    for name, q in assessment.get('quantities', {}).items():
+        if q.get('missing'):
+            lines.append(f"{name}: not available on every mesh")
+        else:
+            lines.append(f"{name}: order {q['order']:.2f}, extrapolated {q['extrapolated']:.6g}, "
+                         f"GCI {q['gci']:.2%}" + (" (oscillatory)" if q['oscillatory'] else ""))
+    if assessment.get('converged'):
+        rec = assessment['recommended']
+        lines.append(f"Converged within {state['tolerance']:.1%}; cheapest adequate mesh: "
+                     f"{rec['name']} ({rec['cells']} cells)")
+    else:
+        lines.append(f"Not converged within {state['tolerance']:.1%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesh-convergence study of an HEA case")
+    parser.add_argument('template', help="generated case to refine")
+    parser.add_argument('study_dir', help="directory for the refined cases")
+    parser.add_argument('--ratio', type=float, default=2.0, help="refinement ratio per level")
+    parser.add_argument('--levels', type=int, default=4, help="maximum number of levels")
+    parser.add_argument('--start-level', type=int, default=0,
+                        help="first level; negative values start coarser than the template")
+    parser.add_argument('--tolerance', type=float, default=0.02, help="target relative GCI")
+    parser.add_argument('--quantities', nargs='+', choices=QUANTITIES, default=list(QUANTITIES))
+    parser.add_argument('--front-time', type=float, default=None,
+                        help="time of the front-height comparison (default: mid-run)")
+    parser.add_argument('--command', default=None, help="command run in each case")
+    parser.add_argument('--cores', type=int, default=None, help="core budget")
+    parser.add_argument('--quiet', action='store_true', help="only print the report")
+    args = parser.parse_args(argv)
+
+    study = ConvergenceStudy(args.template, args.study_dir, ratio=args.ratio,
+                             max_levels=args.levels, start_level=args.start_level,
+                             tolerance=args.tolerance, quantities=args.quantities,
+                             front_time=args.front_time, command=args.command,
+                             max_cores=args.cores, verbose=not args.quiet)
+    assessment = study.run()
+    print(format_report(study.state))
+    return 0 if assessment['converged'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
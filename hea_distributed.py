@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Multi-node sweep execution by claiming cases on a shared filesystem
+
+Any number of worker processes, on any node that mounts the sweep directory, pull
+cases from the sweep manifest. A case is claimed by creating claims/<case>.claim with
+O_EXCL, so exactly one worker wins. The owner touches its claim file as a heartbeat;
+a claim whose mtime stops changing for longer than the stale timeout belongs to a
+dead worker and is taken over by atomically renaming it away before re-claiming.
+Finished and failed cases are recorded in the manifest and by marker files. The
+output of each run is appended to logs/<case>.log in the sweep directory, outside
+the case, because run.sh deletes the case's log.* files.
+"""
+
+import argparse
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import hea_scheduler
+import hea_sweep
+
+CLAIM_DIR = 'claims'
+LOG_DIR = 'logs'
+
+
+class SweepWorker:
+    """Claim and run cases from a shared sweep directory until none remain"""
+
+    DEFAULT_COMMAND = 'bash run.sh'
+
+    def __init__(self, sweep_dir, command=None, heartbeat_interval=10.0, stale_after=60.0,
+                 max_attempts=1, poll_interval=5.0, worker_id=None, cache=None, verbose=True):
+        self.sweep_dir = Path(sweep_dir)
+        self.claim_dir = self.sweep_dir / CLAIM_DIR
+        self.claim_dir.mkdir(parents=True, exist_ok=True)
+        self.log_dir = self.sweep_dir / LOG_DIR
+        self.log_dir.mkdir(exist_ok=True)
+        self.command = command or self.DEFAULT_COMMAND
+        self.heartbeat_interval = float(heartbeat_interval)
+        self.stale_after = float(stale_after)
+        self.max_attempts = int(max_attempts)
+        self.poll_interval = float(poll_interval)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # Optional hea_cache.ResultCache consulted before each run
+        self.cache = cache
+        self.verbose = verbose
+        # Last observed (mtime, owner, local time) of other workers' claims;
+        # comparing mtimes against our own clock would be fooled by clock skew
+        self._observed = {}
+
+    def log(self, message):
+        """Print a progress message unless running quietly"""
+        if self.verbose:
+            print(f"[{self.worker_id}] {message}", flush=True)
+
+    # ------------------------------------------------------------------ markers
+
+    def _claim_path(self, name):
+        return self.claim_dir / f"{name}.claim"
+
+    def _marker(self, name, kind):
+        return self.claim_dir / f"{name}.{kind}"
+
+    def _attempts(self, name):
+        path = self._marker(name, 'failed')
+        try:
+            return int(path.read_text(encoding='utf-8').split()[0])
+        except (FileNotFoundError, ValueError, IndexError):
+            return 0
+
+    def _is_finished(self, name):
+        return (self._marker(name, 'done').exists()
+                or self._attempts(name) >= self.max_attempts)
+
+    # ------------------------------------------------------------------ claims
+
+    def _try_create_claim(self, name):
+        try:
+            fd = os.open(self._claim_path(name), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            f.write(f"{self.worker_id}\n")
+        return True
+
+    def _claim_owner(self, path):
+        try:
+            return path.read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            return None
+
+    def _owns_claim(self, name):
+        return self._claim_owner(self._claim_path(name)) == self.worker_id
+
+    def _claim_is_stale(self, name):
+        path = self._claim_path(name)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        owner = self._claim_owner(path)
+        now = time.monotonic()
+        seen = self._observed.get(name)
+        if seen is None or seen[:2] != (mtime, owner):
+            self._observed[name] = (mtime, owner, now)
+            return False
+        return now - seen[2] > self.stale_after
+
+    def _reclaim(self, name):
+        """Take over the claim of a dead worker; only one contender can win"""
+        dead_owner = self._observed.pop(name)[1]
+        graveyard = self._claim_path(name).with_name(f"{name}.claim.dead.{self.worker_id}")
+        try:
+            os.rename(self._claim_path(name), graveyard)
+        except FileNotFoundError:
+            return False
+        if self._claim_owner(graveyard) != dead_owner:
+            # Another contender reclaimed first and we moved its fresh claim; put it back
+            with contextlib.suppress(FileExistsError):
+                os.link(graveyard, self._claim_path(name))
+            os.unlink(graveyard)
+            return False
+        os.unlink(graveyard)
+        self.log(f"Reclaimed case from dead worker {dead_owner}: {name}")
+        return self._try_create_claim(name)
+
+    def claim_next(self):
+        """Claim the next unfinished case; return its manifest entry or None"""
+        entries = hea_sweep.load_manifest(self.sweep_dir)['cases']
+        for entry in entries:
+            name = entry['name']
+            if self._is_finished(name):
+                continue
+            claimed = self._try_create_claim(name) or (
+                self._claim_is_stale(name) and self._reclaim(name))
+            if not claimed:
+                continue
+            if self._is_finished(name):
+                # Finished by its previous owner between our check and the claim
+                self._release(name)
+                continue
+            return entry
+        return None
+
+    def remaining(self):
+        """Return True while any case is unfinished (claimed or not)"""
+        entries = hea_sweep.load_manifest(self.sweep_dir)['cases']
+        return any(not self._is_finished(entry['name']) for entry in entries)
+
+    # ------------------------------------------------------------------ run
+
+    def _release(self, name):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._claim_path(name))
+
+    def _heartbeat(self, name, process, stop):
+        while not stop.wait(self.heartbeat_interval):
+            # A contender may briefly have our claim renamed away; recreate it if so
+            if not self._owns_claim(name) and not self._try_create_claim(name) \
+                    and not self._owns_claim(name):
+                # Another worker decided we were dead; do not run the case twice
+                self.log(f"Lost claim on {name}, stopping it")
+                process.terminate()
+                return
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(self._claim_path(name))
+
+    def run_case(self, entry):
+        """Run one claimed case, recording the outcome; return the exit code"""
+        name = entry['name']
+        case_dir = self.sweep_dir / entry['case_dir']
+        ranks = entry.get('n_procs', 1)
+        command = hea_scheduler.build_argv(self.command, case_dir, ranks)
+        env = dict(os.environ, HEA_NPROCS=str(ranks), HEA_WORKER_ID=self.worker_id)
+
+        if self.cache is not None and self.cache.fetch(case_dir):
+            self._marker(name, 'done').write_text(f"{self.worker_id} cached\n", encoding='utf-8')
+            hea_sweep.update_case(self.sweep_dir, name, status='done', returncode=0, cached=True,
+                                  worker=self.worker_id, finished=time.time())
+            self._release(name)
+            self.log(f"Reused cached results: {name}")
+            return 0
+
+        hea_sweep.update_case(self.sweep_dir, name, status='running', worker=self.worker_id,
+                              host=socket.gethostname(), started=time.time())
+        self.log(f"Running: {name}")
+        with open(self.log_dir / f"{name}.log", 'a', encoding='utf-8') as log_file:
+            process = subprocess.Popen(command, cwd=case_dir, stdout=log_file,
+                                       stderr=subprocess.STDOUT, env=env)
+            stop = threading.Event()
+            beat = threading.Thread(target=self._heartbeat, args=(name, process, stop),
+                                    daemon=True)
+            beat.start()
+            returncode = process.wait()
+            stop.set()
+            beat.join()
+
+        if not self._owns_claim(name):
+            return returncode
+        if returncode == 0:
+            self._marker(name, 'done').write_text(f"{self.worker_id}\n", encoding='utf-8')
+            status = 'done'
+            self.log(f"Finished: {name}")
+            if self.cache is not None:
+                self.cache.store(case_dir)
+        else:
+            attempts = self._attempts(name) + 1
+            self._marker(name, 'failed').write_text(f"{attempts} {self.worker_id}\n",
+                                                    encoding='utf-8')
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            self.log(f"Failed (exit {returncode}): {name}")
+        hea_sweep.update_case(self.sweep_dir, name, status=status, returncode=returncode,
+                              finished=time.time())
+        self._release(name)
+        return returncode
+
+    def run(self):
+        """Process cases until every case in the sweep is finished"""
+        completed = 0
+        while True:
+            entry = self.claim_next()
+            if entry is not None:
+                self.run_case(entry)
+                completed += 1
+                continue
+            if not self.remaining():
+                break
+            # Everything left is claimed by live workers; wait in case one dies
+            time.sleep(self.poll_interval)
+        self.log(f"No cases left, ran {completed}")
+        return completed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a shared-filesystem sweep worker")
+    parser.add_argument('sweep_dir', help="sweep directory containing sweep_manifest.json")
+    parser.add_argument('--command', default=None,
+                        help="command run in each case, may use {case_dir} and {ranks}")
+    parser.add_argument('--heartbeat', type=float, default=10.0, help="heartbeat interval (s)")
+    parser.add_argument('--stale-after', type=float, default=60.0,
+                        help="seconds without heartbeat before a claim is taken over")
+    parser.add_argument('--attempts', type=int, default=1, help="attempts per case")
+    parser.add_argument('--poll', type=float, default=5.0, help="idle poll interval (s)")
+    parser.add_argument('--cache', default=None, help="shared result cache directory")
+    parser.add_argument('--cache-gb', type=float, default=50.0, help="result cache size limit")
+    parser.add_argument('--quiet', action='store_true', help="suppress progress messages")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache:
+        import hea_cache
+        cache = hea_cache.ResultCache(args.cache, max_bytes=args.cache_gb * 1024**3,
+                                      verbose=not args.quiet)
+    worker = SweepWorker(args.sweep_dir, command=args.command, heartbeat_interval=args.heartbeat,
+                         stale_after=args.stale_after, max_attempts=args.attempts,
+                         poll_interval=args.poll, cache=cache, verbose=not args.quiet)
+    worker.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
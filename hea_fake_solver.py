@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Stand-in for buoyantPimpleFoam used to exercise the sweep tooling without OpenFOAM
+
+Sleeps for a given wall time while writing a log.simulation in the same format as
+the real solver, then exits with the requested code.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenFOAM solver for testing")
+    parser.add_argument('--duration', type=float, default=1.0, help="wall time in seconds")
+    parser.add_argument('--steps', type=int, default=10, help="number of time steps to log")
+    parser.add_argument('--end-time', type=float, default=100.0, help="simulated end time")
+    parser.add_argument('--exit-code', type=int, default=0, help="exit code to return")
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help="probability of failing with exit code 1")
+    parser.add_argument('--log', default='log.simulation', help="log file to write")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    steps = max(1, args.steps)
+    dt = args.end_time / steps
+    pause = args.duration / steps
+
+    with open(Path(args.log), 'w', encoding='utf-8') as f:
+        f.write("/*---------------------------------------------------------------------------*\\\n")
+        f.write("Application : buoyantPimpleFoam (fake)\n")
+        f.write("\\*---------------------------------------------------------------------------*/\n\n")
+        f.write("Starting time loop\n\n")
+        for i in range(1, steps + 1):
+            time.sleep(pause)
+            courant = 0.1 + 0.3 * rng.random()
+            alpha = max(0.0, 1.0 - i / steps)
+            f.write(f"Courant Number mean: {courant / 4:.6g} max: {courant:.6g}\n")
+            f.write(f"deltaT = {dt:.6g}\n")
+            f.write(f"Time = {i * dt:.6g}\n\n")
+            f.write("PIMPLE: iteration 1\n")
+            f.write("volFieldValue liquidFraction write:\n")
+            f.write(f"    volAverage() of solidification:alpha1 = {alpha:.6g}\n\n")
+            f.write(f"ExecutionTime = {i * pause:.2f} s  ClockTime = {round(i * pause)} s\n\n")
+            f.flush()
+        f.write("End\n")
+
+    if args.exit_code:
+        return args.exit_code
+    if rng.random() < args.fail_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
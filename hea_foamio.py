@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Lightweight readers for the OpenFOAM dictionaries written by setup_hea_solidification.py
+"""
+
+import re
+from pathlib import Path
+
+_COMMENT_RE = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+_HEX_RE = re.compile(r'hex\s*\(([\d\s]+)\)\s*\((\d+)\s+(\d+)\s+(\d+)\)')
+
+
+def strip_comments(text):
+    """Remove C/C++ style comments from dictionary text"""
+    return _COMMENT_RE.sub('', text)
+
+
+def read_dict_text(path):
+    """Read a dictionary file and return its text without comments"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return strip_comments(f.read())
+
+
+def read_entry(path, key, default=None):
+    """Return the raw value of a top-level 'key value;' entry, or default"""
+    path = Path(path)
+    if not path.is_file():
+        return default
+    match = re.search(rf'^\s*{re.escape(key)}\s+([^;{{}}]+);',
+                      read_dict_text(path), re.MULTILINE)
+    if match is None:
+        return default
+    return match.group(1).strip()
+
+
+def read_number(path, key, default=None):
+    """Return a top-level numeric entry as float, or default"""
+    value = read_entry(path, key)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def read_block_mesh_cells(case_dir):
+    """Return the total cell count of all hex blocks in system/blockMeshDict"""
+    path = Path(case_dir) / 'system' / 'blockMeshDict'
+    if not path.is_file():
+        return None
+    total = 0
+    for match in _HEX_RE.finditer(read_dict_text(path)):
+        nx, ny, nz = (int(g) for g in match.groups()[1:])
+        total += nx * ny * nz
+    return total or None
+
+
+def read_n_procs(case_dir):
+    """Return numberOfSubdomains from system/decomposeParDict (1 if absent)"""
+    path = Path(case_dir) / 'system' / 'decomposeParDict'
+    n = read_number(path, 'numberOfSubdomains', 1)
+    return max(1, int(n))
+
+
+_TOKEN_RE = re.compile(r'"[^"]*"|[{}();]|[^\s{}();"]+')
+
+
+def _tokenize(text):
+    """Split dictionary text into tokens, keeping keys such as div(phi,U) whole"""
+    tokens = []
+    pos = 0
+    n = len(text)
+    while True:
+        match = _TOKEN_RE.search(text, pos)
+        if match is None:
+            return tokens
+        token = match.group(0)
+        pos = match.end()
+        if token[0] not in '{}();"' and pos < n and text[pos] == '(':
+            # A word directly followed by '(' is a function-style key: consume the
+            # balanced parentheses as part of the token
+            depth = 0
+            start = pos
+            while pos < n:
+                if text[pos] == '(':
+                    depth += 1
+                elif text[pos] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        pos += 1
+                        break
+                elif text[pos] in ' \t\n;':
+                    break
+                pos += 1
+            if depth == 0:
+                token += text[start:pos]
+            else:
+                pos = start
+        tokens.append(token)
+
+
+def _parse_tokens(tokens, pos):
+    """Parse 'key value;' and 'key { ... }' entries until a closing brace"""
+    result = {}
+    while pos < len(tokens):
+        token = tokens[pos]
+        if token == '}':
+            return result, pos + 1
+        key = token.strip('"')
+        pos += 1
+        if pos < len(tokens) and tokens[pos] == '{':
+            result[key], pos = _parse_tokens(tokens, pos + 1)
+            continue
+        value = []
+        depth = 0
+        while pos < len(tokens) and (tokens[pos] != ';' or depth > 0):
+            if tokens[pos] == '(':
+                depth += 1
+            elif tokens[pos] == ')':
+                depth -= 1
+            value.append(tokens[pos])
+            pos += 1
+        result[key] = ' '.join(value)
+        pos += 1
+    return result, pos
+
+
+def parse_foam_dict(text):
+    """Parse dictionary text into nested dicts whose leaf values are raw strings
+
+    Sub-dictionaries become dicts; everything else (numbers, words, lists) is kept
+    as the whitespace-joined token string, e.g. 'uniform ( 0 0 0 )'.
+    """
+    return _parse_tokens(_tokenize(strip_comments(text)), 0)[0]
+
+
+def read_foam_dict(path):
+    """Parse a dictionary file into nested dicts"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_foam_dict(f.read())
+
+
+def set_entry(path, key, value):
+    """Replace the value of a top-level 'key value;' entry in place"""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    text, count = re.subn(rf'^(\s*{re.escape(key)}\s+)[^;]*;', lambda m: f"{m.group(1)}{value};",
+                          text, count=1, flags=re.MULTILINE)
+    if count == 0:
+        raise KeyError(f"{key} not found in {path}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def set_block_mesh_cells(case_dir, nx, ny):
+    """Set the cell counts of the single-block 2D mesh in system/blockMeshDict"""
+    path = Path(case_dir) / 'system' / 'blockMeshDict'
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    text, count = re.subn(r'(hex\s*\([\d\s]+\)\s*\()\d+\s+\d+(\s+\d+\))',
+                          lambda m: f"{m.group(1)}{nx} {ny}{m.group(2)}", text, count=1)
+    if count == 0:
+        raise KeyError(f"No hex block in {path}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def read_block_mesh_grid(case_dir):
+    """Return (lx, ly, nx, ny) of the single-block 2D mesh in system/blockMeshDict"""
+    text = read_dict_text(Path(case_dir) / 'system' / 'blockMeshDict')
+    vertex_block = re.search(r'vertices\s*\((.*?)\)\s*;', text, re.DOTALL).group(1)
+    points = [tuple(float(v) for v in p.split())
+              for p in re.findall(r'\(([^()]*)\)', vertex_block)]
+    scale = float(read_entry(Path(case_dir) / 'system' / 'blockMeshDict', 'scale', 1) or 1)
+    match = _HEX_RE.search(text)
+    nx, ny = int(match.group(2)), int(match.group(3))
+    lx = (max(p[0] for p in points) - min(p[0] for p in points)) * scale
+    ly = (max(p[1] for p in points) - min(p[1] for p in points)) * scale
+    return lx, ly, nx, ny
+
+
+FOAM_BANNER = """/*--------------------------------*- C++ -*----------------------------------*\\
+| =========                 |                                                 |
+| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\\\    /   O peration     | Version:  v2312                                 |
+|   \\\\  /    A nd           | Website:  www.openfoam.com                      |
+|    \\\\/     M anipulation  |                                                 |
+\\*---------------------------------------------------------------------------*/
+"""
+
+FOAM_SEPARATOR = "// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //\n"
+FOAM_FOOTER = "// ************************************************************************* //\n"
+
+
+def foam_header(field_class, object_name, fmt='ascii', location=None):
+    """Return the banner and FoamFile header used by every generated file"""
+    location_line = f'    location    "{location}";\n' if location is not None else ''
+    # Binary files must declare the byte order and word sizes of the raw data
+    arch_line = '    arch        "LSB;label=32;scalar=64";\n' if fmt == 'binary' else ''
+    return (f"{FOAM_BANNER}FoamFile\n{{\n"
+            f"    version     2.0;\n"
+            f"    format      {fmt};\n"
+            f"{arch_line}"
+            f"    class       {field_class};\n"
+            f"{location_line}"
+            f"    object      {object_name};\n"
+            f"}}\n{FOAM_SEPARATOR}\n")
+
+
+# Values per chunk when streaming a nonuniform list to disk
+WRITE_CHUNK = 1 << 16
+
+
+def _format_value(value):
+    """Format a uniform scalar or vector value"""
+    if isinstance(value, (tuple, list)):
+        return '(' + ' '.join(f"{v:.8g}" for v in value) + ')'
+    return f"{value:.8g}" if isinstance(value, float) else str(value)
+
+
+def _write_list(f, values, fmt, chunk_size):
+    """Stream a scalar (N,) or vector (N, 3) array as an OpenFOAM list body"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    f.write(f"\n{n}\n(".encode('ascii'))
+    if fmt == 'binary':
+        # Raw little-endian doubles between the parentheses, vectors interleaved
+        for start in range(0, n, chunk_size):
+            chunk = np.ascontiguousarray(values[start:start + chunk_size], dtype='<f8')
+            f.write(chunk.tobytes())
+        f.write(b")\n;\n")
+        return
+    f.write(b"\n")
+    width = 1 if values.ndim == 1 else values.shape[1]
+    line = '%.8g\n' if width == 1 else '(' + ' '.join(['%.8g'] * width) + ')\n'
+    for start in range(0, n, chunk_size):
+        chunk = values[start:start + chunk_size]
+        # One %-format over the whole chunk avoids a Python call per value
+        f.write((line * len(chunk) % tuple(chunk.ravel().tolist())).encode('ascii'))
+    f.write(b")\n;\n")
+
+
+def _render_entries(entries, indent):
+    lines = []
+    for key, value in entries.items():
+        if isinstance(value, dict):
+            lines.append(f"{indent}{key}\n{indent}{{\n")
+            lines.append(_render_entries(value, indent + '    '))
+            lines.append(f"{indent}}}\n")
+        else:
+            lines.append(f"{indent}{key:<16}{value};\n")
+    return ''.join(lines)
+
+
+def write_field(path, field_class, object_name, dimensions, internal, boundary,
+                fmt='ascii', location=None, chunk_size=WRITE_CHUNK):
+    """Write a vol field, streaming a nonuniform internalField to disk
+
+    internal is a uniform scalar/vector value or a NumPy array of shape (N,) for
+    scalar or (N, 3) for vector fields, written as nonuniform List<scalar> or
+    List<vector> in 'ascii' or 'binary' format without building the file in
+    memory. boundary maps patch names to dicts of entries (as returned by
+    read_foam_dict), rendered as 'key value;' lines.
+    """
+    if fmt not in ('ascii', 'binary'):
+        raise ValueError(f"Unsupported format: {fmt}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    uniform = isinstance(internal, (int, float, tuple, list))
+    with open(path, 'wb') as f:
+        f.write(foam_header(field_class, object_name, fmt, location).encode('utf-8'))
+        f.write(f"dimensions      {dimensions};\n\n".encode('ascii'))
+        if uniform:
+            f.write(f"internalField   uniform {_format_value(internal)};\n".encode('ascii'))
+        else:
+            kind = 'vector' if getattr(internal, 'ndim', 1) == 2 else 'scalar'
+            f.write(f"internalField   nonuniform List<{kind}> ".encode('ascii'))
+            _write_list(f, internal, fmt, chunk_size)
+        f.write(b"\nboundaryField\n{\n")
+        for patch, entries in boundary.items():
+            f.write(f"    {patch}\n    {{\n{_render_entries(entries, ' ' * 8)}    }}\n\n"
+                    .encode('utf-8'))
+        f.write(f"}}\n\n{FOAM_FOOTER}".encode('ascii'))
+
+
+def rewrite_internal_field(template_path, output_path, internal, fmt='ascii', location=None):
+    """Write a copy of a field file with a new internalField
+
+    Class, dimensions and boundaryField are taken from the template (ASCII or
+    binary, uniform or not), so a generated 0/ file can be turned into a
+    nonuniform initial or restart field.
+    """
+    header, _ = read_field(template_path)
+    write_field(output_path, header['FoamFile']['class'], header['FoamFile']['object'],
+                header['dimensions'], internal, header.get('boundaryField', {}),
+                fmt=fmt, location=location)
+
+
+_NONUNIFORM_RE = re.compile(rb'^internalField\s+nonuniform\s+List<(\w+)>\s*(\d+)\s*\(', re.MULTILINE)
+_LIST_END_RE = re.compile(rb'\)\s*;')
+
+
+def read_field(path):
+    """Read a field file written in ASCII or binary format
+
+    Returns (entries, internal) where entries is the parsed dictionary without
+    the internalField and internal is either the uniform value string (e.g.
+    'uniform 1773') or a NumPy array of shape (N,) or (N, 3).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    match = _NONUNIFORM_RE.search(data)
+    if match is None:
+        entries = parse_foam_dict(data.decode('utf-8', errors='replace'))
+        return entries, entries.pop('internalField', None)
+
+    import numpy as np
+
+    kind, n = match.group(1).decode('ascii'), int(match.group(2))
+    width = 3 if kind == 'vector' else 1
+    start = match.end()
+    binary = re.search(rb'^\s*format\s+binary\s*;', data[:start], re.MULTILINE) is not None
+    if binary:
+        values = np.frombuffer(data, dtype='<f8', count=n * width, offset=start).copy()
+        end = data.index(b';', start + 8 * n * width) + 1
+    else:
+        close = _LIST_END_RE.search(data, start)
+        block = data[start:close.start()]
+        if width > 1:
+            block = block.translate(None, b'()')
+        values = np.array(block.split(), dtype=np.float64)
+        end = close.end()
+    if width > 1:
+        values = values.reshape(n, width)
+    entries = parse_foam_dict((data[:match.start()] + data[end:]).decode('utf-8', errors='replace'))
+    return entries, values
+
+
+def read_field_entries(path):
+    """Parse a field file without loading its internal values
+
+    Returns (entries, internal) like read_field, except that a nonuniform
+    internalField is described as (kind, n), e.g. ('scalar', 5000).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    match = _NONUNIFORM_RE.search(data)
+    if match is None:
+        entries = parse_foam_dict(data.decode('utf-8', errors='replace'))
+        return entries, entries.pop('internalField', None)
+    kind, n = match.group(1).decode('ascii'), int(match.group(2))
+    start = match.end()
+    if re.search(rb'^\s*format\s+binary\s*;', data[:start], re.MULTILINE) is not None:
+        width = 3 if kind == 'vector' else 1
+        end = data.index(b';', start + 8 * n * width) + 1
+    else:
+        end = _LIST_END_RE.search(data, start).end()
+    entries = parse_foam_dict((data[:match.start()] + data[end:]).decode('utf-8', errors='replace'))
+    return entries, (kind, n)
+
+
+def boundary_types(path):
+    """Return {patch: type} of the boundaryField of a field file"""
+    entries, _ = read_field_entries(path)
+    return {patch: entry.get('type') for patch, entry in entries.get('boundaryField', {}).items()
+            if isinstance(entry, dict)}
+
+
+_LOG_PATTERNS = {
+    'courant': re.compile(r'^Courant Number mean:\s*(\S+)\s+max:\s*(\S+)'),
+    'delta_t': re.compile(r'^deltaT = (\S+)'),
+    'time': re.compile(r'^Time = (\S+)'),
+    'execution': re.compile(r'^ExecutionTime = (\S+) s\s+ClockTime = (\S+) s'),
+    'alpha': re.compile(r'volAverage\(\) of solidification:alpha1 = (\S+)'),
+}
+
+
+class SolverLogParser:
+    """Incremental parser of buoyantPimpleFoam log lines into time-step records
+
+    feed() takes one line at a time and returns the record a 'Time =' line
+    starts (None otherwise); later lines of the step (execution time, liquid
+    fraction) are added to that record in place, as current.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.current = None
+
+    def feed(self, line):
+        line = line.strip()
+        match = _LOG_PATTERNS['courant'].match(line)
+        if match:
+            self.pending['courant_mean'] = float(match.group(1))
+            self.pending['courant_max'] = float(match.group(2))
+            return None
+        match = _LOG_PATTERNS['delta_t'].match(line)
+        if match:
+            self.pending['delta_t'] = float(match.group(1))
+            return None
+        match = _LOG_PATTERNS['time'].match(line)
+        if match:
+            try:
+                self.current = dict(self.pending, time=float(match.group(1)))
+            except ValueError:
+                return None
+            self.pending = {}
+            return self.current
+        if self.current is None:
+            return None
+        match = _LOG_PATTERNS['execution'].match(line)
+        if match:
+            self.current['execution_time'] = float(match.group(1))
+            self.current['clock_time'] = float(match.group(2))
+            return None
+        match = _LOG_PATTERNS['alpha'].search(line)
+        if match:
+            self.current['liquid_fraction'] = float(match.group(1))
+        return None
+
+
+def parse_solver_log(path):
+    """Parse a buoyantPimpleFoam log into one dict per time step
+
+    Each record has 'time', and where present 'delta_t', 'courant_mean',
+    'courant_max', 'execution_time', 'clock_time' and 'liquid_fraction'.
+    """
+    records = []
+    parser = SolverLogParser()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            record = parser.feed(line)
+            if record is not None:
+                records.append(record)
+    return records
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Progress of running HEA solidification cases from their solver logs
+
+case_status() reads one log in full. For a running sweep, MonitorService
+watches any number of cases from one asyncio loop: each CaseWatcher keeps its
+read offset and a running summary of the log, so a refresh only parses the
+bytes appended since the last one, and unchanged logs (same size and mtime)
+cost one stat. The latest statuses are cached and served as JSON over a local
+HTTP endpoint and as a terminal table.
+
+    python hea_monitor.py sweep/*                    # one-off table
+    python hea_monitor.py --live --sweep sweep --port 8765
+    curl http://127.0.0.1:8765/status
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import hea_foamio
+
+LOG_NAME = 'log.simulation'
+# Bytes read per refresh of one log; the rest is read on the next refresh
+READ_CHUNK = 4 * 1024 * 1024
+WAITING = 'waiting'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+class CaseWatcher:
+    """Incrementally tail the solver log of one case and summarise it
+
+    poll() runs in a worker thread while status() is served from the event
+    loop, so both hold a lock: a status is never built from half-parsed state,
+    nor cached after a poll has invalidated it.
+    """
+
+    def __init__(self, case_dir, log_name=LOG_NAME):
+        self.case_dir = Path(case_dir)
+        self.log_path = self.case_dir / log_name
+        self.control_path = self.case_dir / 'system' / 'controlDict'
+        self._control_mtime = None
+        self.end_time = None
+        self._log_id = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self._partial = b''
+        self.parser = hea_foamio.SolverLogParser()
+        self.steps = 0
+        self.first_timed = None
+        self.last_timed = None
+        self.liquid_fraction = None
+        self.state = WAITING
+        self.updated = None
+        self._status = None
+
+    def _read_end_time(self):
+        try:
+            mtime = self.control_path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._control_mtime:
+            self._control_mtime = mtime
+            self.end_time = hea_foamio.read_number(self.control_path, 'endTime')
+            self._status = None
+
+    def _step_done(self, record):
+        """Fold a completed time step into the summary"""
+        if 'execution_time' in record:
+            if self.first_timed is None:
+                self.first_timed = (record['time'], record['execution_time'])
+            self.last_timed = (record['time'], record['execution_time'])
+        if 'liquid_fraction' in record:
+            self.liquid_fraction = record['liquid_fraction']
+
+    def _feed(self, line):
+        previous = self.parser.current
+        if self.parser.feed(line) is not None:
+            self.steps += 1
+            if previous is not None:
+                self._step_done(previous)
+        elif line.startswith('End'):
+            self.state = FINISHED
+        elif 'FOAM FATAL' in line or 'FOAM aborting' in line:
+            self.state = FAILED
+
+    def poll(self, max_bytes=READ_CHUNK):
+        """Parse what was appended to the log; return True if the status changed
+
+        At most max_bytes are read (None reads to the end of the log).
+        """
+        with self._lock:
+            return self._poll(max_bytes)
+
+    def _poll(self, max_bytes):
+        self._read_end_time()
+        try:
+            stat = self.log_path.stat()
+        except OSError:
+            changed = self.state != WAITING or self._status is None
+            if self.state != WAITING:
+                self._reset()
+            return changed
+        log_id = (stat.st_dev, stat.st_ino)
+        if log_id != self._log_id or stat.st_size < self.offset:
+            # A new run replaced or truncated the log
+            self._log_id = log_id
+            self._reset()
+        if stat.st_size == self.offset:
+            return self._status is None
+        if self.state == WAITING:
+            self.state = RUNNING
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(-1 if max_bytes is None else max_bytes)
+        self.offset += len(data)
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._feed(line.decode('utf-8', errors='replace'))
+        self.updated = stat.st_mtime
+        self._status = None
+        return True
+
+    def status(self):
+        """Return the cached status dict, rebuilding it after a change"""
+        with self._lock:
+            if self._status is None:
+                self._status = self._build_status()
+            return self._status
+
+    def _build_status(self):
+        current = self.parser.current
+        status = {'case': str(self.case_dir), 'state': self.state,
+                  'time': current['time'] if current else None,
+                  'end_time': self.end_time}
+        if current is not None:
+            first, last = self.first_timed, self.last_timed
+            if 'execution_time' in current:
+                first = first or (current['time'], current['execution_time'])
+                last = (current['time'], current['execution_time'])
+            status.update({
+                'delta_t': current.get('delta_t'),
+                'courant_max': current.get('courant_max'),
+                'liquid_fraction': current.get('liquid_fraction', self.liquid_fraction),
+                'execution_time': last[1] if last else None,
+                'eta': _eta(first, last, self.end_time),
+                'steps': self.steps,
+                'progress': (current['time'] / self.end_time
+                             if self.end_time else None),
+                'updated': self.updated,
+            })
+        return status
+
+
+def _eta(first, last, end_time):
+    """Remaining wall time from (time, execution_time) of the first and last timed steps"""
+    if end_time is None or first is None or last is None:
+        return None
+    simulated = last[0] - first[0]
+    if simulated <= 0:
+        return None
+    rate = (last[1] - first[1]) / simulated
+    return max(0.0, (end_time - last[0]) * rate)
+
+
+def case_status(case_dir):
+    """Return the latest time step state of a case and an ETA in seconds"""
+    watcher = CaseWatcher(case_dir)
+    watcher.poll(max_bytes=None)
+    return watcher.status()
+
+
+def estimate_eta(records, end_time):
+    """Remaining wall time from the solver time spent per simulated second so far"""
+    timed = [r for r in records if 'execution_time' in r]
+    if len(timed) < 2:
+        return None
+    return _eta((timed[0]['time'], timed[0]['execution_time']),
+                (timed[-1]['time'], timed[-1]['execution_time']), end_time)
+
+
+def _fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+
+def format_table(statuses):
+    """Return a fixed-width text table of case statuses"""
+    lines = [f"{'case':<28} {'time':>10} {'deltaT':>10} {'Co max':>8} "
+             f"{'liquid':>8} {'ETA (s)':>10}"]
+    for s in statuses:
+        lines.append(f"{Path(s['case']).name[:28]:<28} {_fmt(s['time'], '10.4g')} "
+                     f"{_fmt(s.get('delta_t'), '10.3g')} {_fmt(s.get('courant_max'), '8.3f')} "
+                     f"{_fmt(s.get('liquid_fraction'), '8.3f')} {_fmt(s.get('eta'), '10.0f')}")
+    return '\n'.join(lines)
+
+
+def summarize(statuses):
+    """Counts per state and the longest remaining ETA of a set of statuses"""
+    counts = {WAITING: 0, RUNNING: 0, FINISHED: 0, FAILED: 0}
+    for s in statuses:
+        counts[s.get('state', WAITING)] += 1
+    etas = [s['eta'] for s in statuses if s.get('state') == RUNNING and s.get('eta') is not None]
+    return {'cases': len(statuses), 'counts': counts, 'eta': max(etas) if etas else None}
+
+
+class MonitorService:
+    """Watch many cases from one event loop and serve their cached statuses
+
+    Cases are given directly and/or through a sweep directory whose manifest is
+    re-read when it changes, so cases added to a running sweep appear. Log
+    reads run in the default thread pool, at most max_reads at a time, so the
+    loop keeps answering HTTP requests while hundreds of logs are refreshed.
+    """
+
+    def __init__(self, cases=(), sweep_dir=None, interval=2.0, max_reads=32, verbose=True):
+        self.watchers = {}
+        self.sweep_dir = Path(sweep_dir) if sweep_dir else None
+        self._manifest_mtime = None
+        self.interval = float(interval)
+        self.max_reads = int(max_reads)
+        self.verbose = verbose
+        self.refreshed = None
+        self.refresh_seconds = None
+        for case_dir in cases:
+            self.add_case(case_dir)
+
+    def add_case(self, case_dir):
+        key = str(Path(case_dir).resolve())
+        if key not in self.watchers:
+            self.watchers[key] = CaseWatcher(case_dir)
+
+    def _discover(self):
+        if self.sweep_dir is None:
+            return
+        import hea_sweep
+        try:
+            mtime = (self.sweep_dir / hea_sweep.MANIFEST_NAME).stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            for case_dir in hea_sweep.case_paths(self.sweep_dir):
+                self.add_case(case_dir)
+
+    def statuses(self):
+        return [watcher.status() for watcher in self.watchers.values()]
+
+    def snapshot(self):
+        """JSON-serialisable state of every case and the sweep totals"""
+        statuses = self.statuses()
+        return {'refreshed': self.refreshed, 'refresh_seconds': self.refresh_seconds,
+                'summary': summarize(statuses), 'cases': statuses}
+
+    async def refresh(self):
+        """Poll every watcher once; return the number of changed cases"""
+        start = time.perf_counter()
+        self._discover()
+        semaphore = asyncio.Semaphore(self.max_reads)
+
+        async def poll(watcher):
+            async with semaphore:
+                return await asyncio.to_thread(watcher.poll)
+
+        changed = await asyncio.gather(*(poll(w) for w in list(self.watchers.values())))
+        self.refreshed = time.time()
+        self.refresh_seconds = time.perf_counter() - start
+        return sum(changed)
+
+    async def watch(self, until_done=False, on_refresh=None):
+        """Refresh every interval; with until_done, stop once no case is waiting or running"""
+        while True:
+            await self.refresh()
+            if on_refresh is not None:
+                on_refresh(self)
+            counts = summarize(self.statuses())['counts']
+            if until_done and self.watchers and counts[WAITING] + counts[RUNNING] == 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    # ------------------------------------------------------------------ HTTP
+
+    def _route(self, path):
+        """Return (status, content type, body) for a GET request path"""
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        if path in ('/', '/status'):
+            return 200, 'application/json', json.dumps(self.snapshot())
+        if path == '/summary':
+            return 200, 'application/json', json.dumps(summarize(self.statuses()))
+        if path == '/table':
+            return 200, 'text/plain; charset=utf-8', format_table(self.statuses()) + '\n'
+        if path.startswith('/case/'):
+            name = path[len('/case/'):]
+            for watcher in self.watchers.values():
+                if watcher.case_dir.name == name:
+                    return 200, 'application/json', json.dumps(watcher.status())
+        return 404, 'application/json', json.dumps({'error': f"not found: {path}"})
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=10.0)
+            # Drain the headers; the body of a GET is ignored
+            while (await asyncio.wait_for(reader.readline(), timeout=10.0)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] not in ('GET', 'HEAD'):
+                code, kind, body = 405, 'application/json', json.dumps({'error': "GET only"})
+            else:
+                code, kind, body = self._route(parts[1])
+            payload = body.encode('utf-8')
+            reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}[code]
+            writer.write(f"HTTP/1.1 {code} {reason}\r\nContent-Type: {kind}\r\n"
+                         f"Content-Length: {len(payload)}\r\nCache-Control: no-store\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1'))
+            if parts[:1] != ['HEAD']:
+                writer.write(payload)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Start the HTTP endpoint; returns the asyncio server"""
+        return await asyncio.start_server(self._handle, host, port)
+
+
+def _terminal_view(clear):
+    """Return an on_refresh callback redrawing the table on stdout"""
+    def draw(service):
+        statuses = service.statuses()
+        summary = summarize(statuses)
+        counts = summary['counts']
+        text = (f"{time.strftime('%H:%M:%S')}  {summary['cases']} case(s): "
+                f"{counts[RUNNING]} running, {counts[WAITING]} waiting, "
+                f"{counts[FINISHED]} finished, {counts[FAILED]} failed"
+                f"   ETA {_fmt(summary['eta'], '.0f')} s"
+                f"   (refresh {service.refresh_seconds * 1e3:.0f} ms)\n"
+                + format_table(statuses))
+        # Home the cursor and clear the screen before each redraw on a terminal
+        print(("\033[H\033[2J" if clear else "") + text, flush=True)
+    return draw
+
+
+async def run_live(service, host, port, until_done=False, terminal=True):
+    server = await service.serve(host, port) if port else None
+    if server is not None and service.verbose:
+        print(f"Serving http://{host}:{port}/status", flush=True)
+    on_refresh = _terminal_view(sys.stdout.isatty()) if terminal else None
+    try:
+        await service.watch(until_done=until_done, on_refresh=on_refresh)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show progress of running HEA cases")
+    parser.add_argument('cases', nargs='*', help="case directories")
+    parser.add_argument('--sweep', default=None, help="watch every case of a sweep")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    parser.add_argument('--live', action='store_true',
+                        help="keep watching, with a terminal view and an HTTP endpoint")
+    parser.add_argument('--interval', type=float, default=2.0, help="seconds between refreshes")
+    parser.add_argument('--host', default='127.0.0.1', help="HTTP address (live mode)")
+    parser.add_argument('--port', type=int, default=8765, help="HTTP port, 0 to disable")
+    parser.add_argument('--no-terminal', action='store_true', help="serve HTTP only")
+    parser.add_argument('--until-done', action='store_true',
+                        help="exit once every case has finished or failed")
+    args = parser.parse_args(argv)
+
+    cases = list(args.cases)
+    if not args.live:
+        if args.sweep:
+            import hea_sweep
+            cases.extend(hea_sweep.case_paths(args.sweep))
+        statuses = [case_status(case_dir) for case_dir in cases]
+        print(json.dumps(statuses) if args.json else format_table(statuses))
+        return 0
+    service = MonitorService(cases, sweep_dir=args.sweep, interval=args.interval)
+    try:
+        asyncio.run(run_live(service, args.host, args.port, until_done=args.until_done,
+                             terminal=not args.no_terminal))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Post-processing of finished HEA solidification cases
+
+Reads the written time directories of a case on its structured blockMesh grid and
+reduces them to a time series of scalar quantities (temperature range, liquid
+fraction, peak velocity, solidification front height) plus a summary with the
+total solidification time and the last region to solidify, where shrinkage
+porosity is most likely.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+import hea_foamio
+
+SUMMARY_NAME = 'hea_summary.json'
+SERIES_NAME = 'hea_timeseries.csv'
+# Liquid fraction below which the casting counts as fully solid
+SOLID_THRESHOLD = 1e-3
+# Cells solidifying in this last fraction of the solidification time form the hot spot
+HOT_SPOT_WINDOW = 0.1
+
+
+def time_directories(case_dir, include_zero=False):
+    """Return (time, path) of the written time directories, in time order"""
+    result = []
+    for path in Path(case_dir).iterdir():
+        if not path.is_dir():
+            continue
+        try:
+            value = float(path.name)
+        except ValueError:
+            continue
+        if value > 0 or include_zero:
+            result.append((value, path))
+    return sorted(result)
+
+
+def melting_range(case_dir):
+    """Return (Tsol, Tliq) from constant/fvOptions"""
+    coeffs = hea_foamio.read_foam_dict(Path(case_dir) / 'constant' / 'fvOptions')
+    coeffs = coeffs['solidification']['solidificationMeltingSourceCoeffs']
+    return float(coeffs['Tsol']), float(coeffs['Tliq'])
+
+
+def liquid_fraction_field(time_dir, t_sol, t_liq, T=None):
+    """Return the liquid fraction of a time directory
+
+    Uses solidification:alpha1 when it was written, otherwise the linear
+    solidus-liquidus relation of the melting source applied to T.
+    """
+    import numpy as np
+
+    path = Path(time_dir) / 'solidification:alpha1'
+    if path.exists():
+        _, alpha = hea_foamio.read_field(path)
+        if not isinstance(alpha, str):
+            return alpha
+    if T is None:
+        _, T = hea_foamio.read_field(Path(time_dir) / 'T')
+    return np.clip((np.asarray(T) - t_sol) / (t_liq - t_sol), 0.0, 1.0)
+
+
+def front_height(alpha, grid, level=0.5):
+    """Height of the alpha=level iso-line on the vertical centreline, from the bottom"""
+    import numpy as np
+
+    lx, ly, nx, ny = grid
+    column = np.asarray(alpha).reshape(ny, nx)[:, nx // 2]
+    y = (np.arange(ny) + 0.5) * ly / ny
+    solid = np.nonzero(column < level)[0]
+    if len(solid) == 0:
+        return 0.0
+    j = solid[-1]
+    if j == ny - 1:
+        return ly
+    # Interpolate between the top solid cell and the liquid cell above it
+    a0, a1 = column[j], column[j + 1]
+    return float(y[j] + (level - a0) / (a1 - a0) * (y[j + 1] - y[j]))
+
+
+def time_series(case_dir):
+    """Return one dict of scalar quantities per written time directory"""
+    return _scan(case_dir)[0]
+
+
+def read_time_series(case_dir):
+    """Return the time series summarize_case saved in the case, without rescanning it"""
+    path = Path(case_dir) / SERIES_NAME
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [{key: float(value) for key, value in row.items() if value != ''}
+                for row in csv.DictReader(f)]
+
+
+def _scan(case_dir):
+    """Return the time series and the per-cell time at which each cell became solid
+
+    Cells still liquid at the last written time have an infinite solid time.
+    """
+    import numpy as np
+
+    case_dir = Path(case_dir)
+    grid = hea_foamio.read_block_mesh_grid(case_dir)
+    t_sol, t_liq = melting_range(case_dir)
+    n_cells = grid[2] * grid[3]
+    solid_time = np.full(n_cells, np.inf)
+    series = []
+    for value, time_dir in time_directories(case_dir):
+        if not (time_dir / 'T').exists():
+            continue
+        _, T = hea_foamio.read_field(time_dir / 'T')
+        if isinstance(T, str):
+            T = np.full(n_cells, float(T.split()[-1]))
+        elif len(T) != n_cells:
+            raise ValueError(f"{time_dir / 'T'} has {len(T)} cells, not the blockMesh "
+                             f"{grid[2]}x{grid[3]}; refined (AMR) cases are not supported")
+        alpha = liquid_fraction_field(time_dir, t_sol, t_liq, T)
+        solid_time[(alpha < SOLID_THRESHOLD) & np.isinf(solid_time)] = value
+        row = {
+            'time': value,
+            'T_min': float(T.min()),
+            'T_max': float(T.max()),
+            'T_mean': float(T.mean()),
+            'liquid_fraction': float(np.mean(alpha)),
+            'front_height': front_height(alpha, grid),
+        }
+        if (time_dir / 'U').exists():
+            _, U = hea_foamio.read_field(time_dir / 'U')
+            row['U_max'] = 0.0 if isinstance(U, str) else float(np.sqrt((U**2).sum(axis=1)).max())
+        series.append(row)
+    return series, solid_time, grid
+
+
+def hot_spot(solid_time, grid, final_time):
+    """Area fraction and centroid height of the last region to solidify
+
+    The region holds the cells that solidified within the last HOT_SPOT_WINDOW
+    of the solidification time, plus any cells still liquid at final_time
+    (in which case final_time is the reference).
+    """
+    import numpy as np
+
+    lx, ly, nx, ny = grid
+    liquid = np.isinf(solid_time)
+    reference = final_time if liquid.any() else float(solid_time.max())
+    region = liquid | (solid_time >= (1.0 - HOT_SPOT_WINDOW) * reference)
+    y = np.repeat((np.arange(ny) + 0.5) * ly / ny, nx)
+    return float(region.mean()), float(y[region].mean())
+
+
+def summarize_case(case_dir, write=True):
+    """Reduce a finished case to a summary dict, optionally saved in the case"""
+    case_dir = Path(case_dir)
+    series, solid_time, grid = _scan(case_dir)
+    summary = {'case': str(case_dir), 'n_times': len(series)}
+    if series:
+        last = series[-1]
+        summary.update({
+            'final_time': last['time'],
+            'final_T_mean': last['T_mean'],
+            'final_liquid_fraction': last['liquid_fraction'],
+            'peak_velocity': max(row.get('U_max', 0.0) for row in series),
+        })
+        solid = [row['time'] for row in series if row['liquid_fraction'] < SOLID_THRESHOLD]
+        summary['solidification_time'] = solid[0] if solid else None
+        summary['hot_spot_fraction'], summary['hot_spot_height'] = hot_spot(
+            solid_time, grid, last['time'])
+    if write and series:
+        with open(case_dir / SUMMARY_NAME, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        with open(case_dir / SERIES_NAME, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(series[0]))
+            writer.writeheader()
+            writer.writerows(series)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise finished HEA cases")
+    parser.add_argument('cases', nargs='+', help="case directories")
+    args = parser.parse_args(argv)
+    for case_dir in args.cases:
+        print(json.dumps(summarize_case(case_dir)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Stage-level profiling of the generate / mesh / solve / post pipeline
+
+Every stage records its wall time, the bytes it added to the case directory
+(the growth of each file, new files in full, so a file rewritten at the same
+size counts nothing) and a resident set size. An external command runs in its own child process, so its
+peak_rss_kb is the peak of that stage alone. The high-water mark of the current
+process cannot be reset, so a stage run in-process records process_max_rss_kb:
+the largest RSS the process has reached by the end of the stage, including
+earlier stages. Records are merged into hea_profile.json in the case directory;
+the solver log is split into per-time-step ExecutionTime, and profiles of many
+cases can be aggregated into one CSV.
+
+A disabled Profiler hands out a shared no-op context manager, so instrumented
+code costs one attribute check per stage when profiling is off.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import hea_foamio
+
+PROFILE_NAME = 'hea_profile.json'
+STEPS_NAME = 'hea_solver_steps.csv'
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def _rss_kb(usage):
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def _process_max_rss_kb():
+    """Return the high-water RSS of this process since it started"""
+    if resource is None:
+        return None
+    return _rss_kb(resource.getrusage(resource.RUSAGE_SELF))
+
+
+def _snapshot(path):
+    """Return {file path: (size, mtime_ns)} of every file under path"""
+    files = {}
+    if path is None or not path.exists():
+        return files
+    for root, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(root, name)
+            with contextlib.suppress(OSError):
+                st = os.stat(full)
+                files[full] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def _bytes_added(before, after):
+    """Sum of the growth of each changed file, with new files counted in full"""
+    total = 0
+    for path, state in after.items():
+        old = before.get(path)
+        if old != state:
+            total += max(0, state[0] - (old[0] if old else 0))
+    return total
+
+
+def _call_measured(command, cwd):
+    """Run a command; return its exit code and peak RSS (kB) as a child of its own"""
+    if not hasattr(os, 'wait4'):  # Windows
+        return subprocess.call(command, cwd=cwd), None
+    process = subprocess.Popen(command, cwd=cwd)
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    # The child is reaped; stop Popen from waiting for it again (negative: killed by signal)
+    process.returncode = (-os.WTERMSIG(status) if os.WIFSIGNALED(status)
+                          else os.WEXITSTATUS(status))
+    return process.returncode, _rss_kb(usage)
+
+
+class Profiler:
+    """Collect per-stage records; a no-op when disabled"""
+
+    def __init__(self, enabled=True, case_dir=None):
+        self.enabled = enabled
+        self.case_dir = Path(case_dir) if case_dir is not None else None
+        self.records = []
+
+    def stage(self, name):
+        """Context manager timing one in-process stage; yields its record (or None)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        before = _snapshot(self.case_dir)
+        record = {'stage': name, 'start': time.time()}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - start
+            record['bytes_added'] = _bytes_added(before, _snapshot(self.case_dir))
+            if 'peak_rss_kb' not in record:
+                record['process_max_rss_kb'] = _process_max_rss_kb()
+            self.records.append(record)
+
+    def save(self, case_dir=None):
+        """Append the collected records to hea_profile.json of the case"""
+        if not self.enabled or not self.records:
+            return None
+        case_dir = Path(case_dir or self.case_dir)
+        path = case_dir / PROFILE_NAME
+        data = load_profile(case_dir)
+        data['stages'].extend(self.records)
+        self.records = []
+        _write_profile(case_dir, data)
+        return path
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def load_profile(case_dir):
+    """Load hea_profile.json of a case (an empty profile if none exists)"""
+    path = Path(case_dir) / PROFILE_NAME
+    if not path.exists():
+        return {'case': str(case_dir), 'stages': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_profile(case_dir, data):
+    path = Path(case_dir) / PROFILE_NAME
+    tmp_path = path.with_name(PROFILE_NAME + f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def exec_stage(case_dir, stage, command):
+    """Run an external command as a profiled stage and return its exit code"""
+    profiler = Profiler(case_dir=case_dir)
+    with profiler.stage(stage) as record:
+        returncode, record['peak_rss_kb'] = _call_measured(command, case_dir)
+        record['returncode'] = returncode
+    profiler.save()
+    if stage == 'solver':
+        profile_solver(case_dir)
+    return returncode
+
+
+def solver_steps(log_path):
+    """Return per-time-step rows: time, deltaT and ExecutionTime spent on the step"""
+    rows = []
+    previous = 0.0
+    for record in hea_foamio.parse_solver_log(log_path):
+        if 'execution_time' not in record:
+            continue
+        rows.append({
+            'time': record['time'],
+            'delta_t': record.get('delta_t'),
+            'step_s': record['execution_time'] - previous,
+            'execution_time': record['execution_time'],
+        })
+        previous = record['execution_time']
+    return rows
+
+
+def solver_summary(rows, n_bins=10):
+    """Summarise solver steps, including solver seconds per simulated second by time window"""
+    if not rows:
+        return {}
+    t0, t1 = rows[0]['time'], rows[-1]['time']
+    steps = [row['step_s'] for row in rows]
+    summary = {
+        'n_steps': len(rows),
+        'simulated_s': t1,
+        'execution_s': rows[-1]['execution_time'],
+        'mean_step_s': sum(steps) / len(steps),
+        'max_step_s': max(steps),
+    }
+    span = (t1 - t0) / n_bins if t1 > t0 else None
+    if span:
+        bins = [{'t_start': t0 + i * span, 't_end': t0 + (i + 1) * span, 'steps': 0,
+                 'execution_s': 0.0} for i in range(n_bins)]
+        for row in rows:
+            b = bins[min(n_bins - 1, int((row['time'] - t0) / span))]
+            b['steps'] += 1
+            b['execution_s'] += row['step_s']
+        for b in bins:
+            b['execution_per_simulated_s'] = b['execution_s'] / span
+        summary['windows'] = bins
+    return summary
+
+
+def profile_solver(case_dir, log_name='log.simulation'):
+    """Write the per-step CSV of a solver log and store its summary in the profile"""
+    case_dir = Path(case_dir)
+    log_path = case_dir / log_name
+    if not log_path.exists():
+        return None
+    rows = solver_steps(log_path)
+    if rows:
+        with open(case_dir / STEPS_NAME, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    summary = solver_summary(rows)
+    data = load_profile(case_dir)
+    data['solver'] = summary
+    _write_profile(case_dir, data)
+    return summary
+
+
+def aggregate(case_dirs, csv_path=None):
+    """Aggregate stage records of many cases into per-stage statistics"""
+    stats = {}
+    for case_dir in case_dirs:
+        for record in load_profile(case_dir)['stages']:
+            s = stats.setdefault(record['stage'], {'stage': record['stage'], 'count': 0,
+                                                   'total_s': 0.0, 'max_s': 0.0,
+                                                   'bytes_added': 0, 'peak_rss_kb': 0,
+                                                   'process_max_rss_kb': 0})
+            s['count'] += 1
+            s['total_s'] += record['wall_s']
+            s['max_s'] = max(s['max_s'], record['wall_s'])
+            # Profiles of older versions recorded bytes_written
+            s['bytes_added'] += record.get('bytes_added', record.get('bytes_written')) or 0
+            for key in ('peak_rss_kb', 'process_max_rss_kb'):
+                s[key] = max(s[key], record.get(key) or 0)
+    rows = sorted(stats.values(), key=lambda s: -s['total_s'])
+    for s in rows:
+        s['mean_s'] = s['total_s'] / s['count']
+    if csv_path and rows:
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile HEA pipeline stages")
+    sub = parser.add_subparsers(dest='action', required=True)
+    p = sub.add_parser('exec', help="run a command as a profiled stage")
+    p.add_argument('--stage', required=True, help="stage name")
+    p.add_argument('--case', default='.', help="case directory")
+    p.add_argument('cmd', nargs=argparse.REMAINDER, help="-- command and arguments")
+    p = sub.add_parser('report', help="aggregate stage profiles of cases")
+    p.add_argument('cases', nargs='+', help="case directories")
+    p.add_argument('--csv', default=None, help="write the aggregate to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.action == 'exec':
+        command = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+        return exec_stage(args.case, args.stage, command)
+    for case_dir in args.cases:
+        profile_solver(case_dir)
+    for row in aggregate(args.cases, args.csv):
+        rss = (f"peak RSS={row['peak_rss_kb']} kB" if row['peak_rss_kb']
+               else f"process max RSS={row['process_max_rss_kb']} kB (cumulative)")
+        print(f"{row['stage']:<32} n={row['count']:<5} total={row['total_s']:10.3f} s "
+              f"mean={row['mean_s']:8.4f} s  {rss}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Composition-dependent material properties of HEA variants
+
+Compositions are rows of atom fractions over the database's element list, so
+thousands of non-equiatomic variants are evaluated in one batch of NumPy
+operations. Each property comes from a rule-of-mixtures model over the pure
+element data below unless a user-supplied model replaces it. Results are
+memoized per (normalized) composition and returned in the key names of
+HEASolidificationCase.properties, so they feed case generation and sweeps
+directly.
+
+    python hea_properties.py CoCrFeMnNi Al0.5CoCrFeMnNi Co20Cr20Fe30Mn10Ni20
+
+The models are screening estimates. Rule-of-mixtures liquidus overestimates the
+measured CoCrFeMnNi value (about 1800 K against 1723 K); pass measured or
+CALPHAD-based models through `models` where accuracy matters.
+"""
+
+import argparse
+import json
+import re
+import sys
+
+# Pure-element data: molar mass (g/mol), density (kg/m3), melting point (K),
+# heat of fusion (kJ/mol), thermal conductivity (W/(m·K)) and molar heat
+# capacity of the solid near room temperature and of the liquid (J/(mol·K))
+ELEMENT_DATA = {
+    'Al': {'molar_mass': 26.982, 'density': 2700, 'melting_point': 933.47, 'heat_of_fusion': 10.71,
+           'conductivity': 237.0, 'cp_solid': 24.20, 'cp_liquid': 31.75},
+    'Co': {'molar_mass': 58.933, 'density': 8900, 'melting_point': 1768.0, 'heat_of_fusion': 16.06,
+           'conductivity': 100.0, 'cp_solid': 24.81, 'cp_liquid': 40.50},
+    'Cr': {'molar_mass': 51.996, 'density': 7190, 'melting_point': 2180.0, 'heat_of_fusion': 21.00,
+           'conductivity': 93.9, 'cp_solid': 23.35, 'cp_liquid': 39.33},
+    'Cu': {'molar_mass': 63.546, 'density': 8960, 'melting_point': 1357.77, 'heat_of_fusion': 13.26,
+           'conductivity': 401.0, 'cp_solid': 24.44, 'cp_liquid': 32.84},
+    'Fe': {'molar_mass': 55.845, 'density': 7874, 'melting_point': 1811.0, 'heat_of_fusion': 13.81,
+           'conductivity': 80.4, 'cp_solid': 25.10, 'cp_liquid': 46.02},
+    'Mn': {'molar_mass': 54.938, 'density': 7210, 'melting_point': 1519.0, 'heat_of_fusion': 12.91,
+           'conductivity': 7.81, 'cp_solid': 26.32, 'cp_liquid': 46.02},
+    'Mo': {'molar_mass': 95.95, 'density': 10280, 'melting_point': 2896.0, 'heat_of_fusion': 37.48,
+           'conductivity': 138.0, 'cp_solid': 24.06, 'cp_liquid': 42.00},
+    'Nb': {'molar_mass': 92.906, 'density': 8570, 'melting_point': 2750.0, 'heat_of_fusion': 30.00,
+           'conductivity': 53.7, 'cp_solid': 24.60, 'cp_liquid': 33.47},
+    'Ni': {'molar_mass': 58.693, 'density': 8908, 'melting_point': 1728.0, 'heat_of_fusion': 17.48,
+           'conductivity': 90.9, 'cp_solid': 26.07, 'cp_liquid': 43.10},
+    'Ti': {'molar_mass': 47.867, 'density': 4506, 'melting_point': 1941.0, 'heat_of_fusion': 14.15,
+           'conductivity': 21.9, 'cp_solid': 25.06, 'cp_liquid': 46.29},
+    'V': {'molar_mass': 50.942, 'density': 6000, 'melting_point': 2183.0, 'heat_of_fusion': 21.50,
+          'conductivity': 30.7, 'cp_solid': 24.89, 'cp_liquid': 46.23},
+}
+
+DEFAULT_ELEMENTS = tuple(sorted(ELEMENT_DATA))
+CANTOR = {'Co': 0.2, 'Cr': 0.2, 'Fe': 0.2, 'Mn': 0.2, 'Ni': 0.2}
+
+# Freezing range as a multiple of the composition-weighted spread of the element
+# melting points; 0.4 reproduces the 90 K range of CoCrFeMnNi
+FREEZING_RANGE_FACTOR = 0.4
+# Smallest freezing range (K) of the built-in solidus model. Pure elements and
+# congruently melting compositions have none, but the melting source and the
+# enthalpy tables divide by Tliq - Tsol, so they get this numerical mushy zone
+MIN_FREEZING_RANGE = 5.0
+# Severe lattice distortion makes the solid conduct worse than the melt
+# (12.5 vs 28 W/(m·K) for CoCrFeMnNi)
+SOLID_CONDUCTIVITY_RATIO = 0.45
+# Decimals kept in the memoization key of a normalized composition
+KEY_DECIMALS = 9
+
+PROPERTY_NAMES = ('molar_mass', 'density', 'liquidus_temp', 'solidus_temp', 'melting_temp',
+                  'latent_heat', 'specific_heat_solid', 'specific_heat_liquid',
+                  'thermal_conductivity_liquid', 'thermal_conductivity_solid')
+
+_FORMULA_TOKEN = re.compile(r'([A-Z][a-z]?)(\d+(?:\.\d*)?|\.\d+)?')
+
+
+def parse_formula(formula):
+    """Return {element: atom fraction} of a formula such as 'Al0.5CoCrFeNi'
+
+    Missing amounts count as 1; amounts may be fractions or percentages.
+    """
+    amounts = {}
+    position = 0
+    for match in _FORMULA_TOKEN.finditer(formula.replace(' ', '')):
+        if match.start() != position:
+            break
+        element, amount = match.groups()
+        amounts[element] = amounts.get(element, 0.0) + (float(amount) if amount else 1.0)
+        position = match.end()
+    if position != len(formula.replace(' ', '')) or not amounts:
+        raise ValueError(f"Cannot parse composition: {formula}")
+    total = sum(amounts.values())
+    return {element: amount / total for element, amount in amounts.items()}
+
+
+class PropertyDatabase:
+    """Batch property estimates for compositions over a fixed element list
+
+    models maps a property name to a callable(X, db) returning one value per row
+    of the (n, n_elements) atom-fraction array X; it replaces the built-in model
+    of that property. Models later in PROPERTY_NAMES may read earlier results
+    from db.current, e.g. db.current['molar_mass'].
+    """
+
+    def __init__(self, elements=DEFAULT_ELEMENTS, models=None, element_data=None):
+        import numpy as np
+
+        self.np = np
+        self.elements = tuple(elements)
+        data = dict(ELEMENT_DATA)
+        data.update(element_data or {})
+        unknown = [e for e in self.elements if e not in data]
+        if unknown:
+            raise KeyError(f"No element data for: {', '.join(unknown)}")
+        self.data = {key: np.array([data[e][key] for e in self.elements], dtype=float)
+                     for key in ELEMENT_DATA['Ni']}
+        self.index = {element: i for i, element in enumerate(self.elements)}
+        self.models = dict(models or {})
+        self.current = {}
+        self._memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def composition_array(self, compositions):
+        """Return normalized (n, n_elements) atom fractions
+
+        Accepts an array, or a list of formulas and/or {element: amount} dicts.
+        """
+        np = self.np
+        if isinstance(compositions, np.ndarray):
+            X = np.atleast_2d(np.asarray(compositions, dtype=float))
+        else:
+            X = np.zeros((len(compositions), len(self.elements)))
+            for row, composition in enumerate(compositions):
+                if isinstance(composition, str):
+                    composition = parse_formula(composition)
+                for element, amount in composition.items():
+                    if element not in self.index:
+                        raise KeyError(f"Element not in database: {element}")
+                    X[row, self.index[element]] = amount
+        if X.shape[1] != len(self.elements):
+            raise ValueError(f"Expected {len(self.elements)} fractions per row, got {X.shape[1]}")
+        totals = X.sum(axis=1, keepdims=True)
+        if (X < 0).any() or (totals <= 0).any():
+            raise ValueError("Compositions must be non-negative with a positive total")
+        return X / totals
+
+    def _model(self, name, X):
+        if name in self.models:
+            return self.np.asarray(self.models[name](X, self), dtype=float)
+        np, d, c = self.np, self.data, self.current
+        # kg/mol, for the per-mass quantities below
+        kg_per_mol = c['molar_mass'] * 1e-3 if 'molar_mass' in c else None
+        if name == 'molar_mass':
+            return X @ d['molar_mass']
+        if name == 'density':
+            # Ideal mixing of molar volumes
+            return c['molar_mass'] / (X @ (d['molar_mass'] / d['density']))
+        if name == 'liquidus_temp':
+            return X @ d['melting_point']
+        if name == 'solidus_temp':
+            mean = X @ d['melting_point']
+            spread = np.sqrt(np.clip(X @ d['melting_point']**2 - mean**2, 0.0, None))
+            return c['liquidus_temp'] - np.maximum(FREEZING_RANGE_FACTOR * spread,
+                                                   MIN_FREEZING_RANGE)
+        if name == 'melting_temp':
+            return 0.5 * (c['liquidus_temp'] + c['solidus_temp'])
+        if name == 'latent_heat':
+            return (X @ d['heat_of_fusion']) * 1e3 / kg_per_mol
+        if name == 'specific_heat_solid':
+            return (X @ d['cp_solid']) / kg_per_mol
+        if name == 'specific_heat_liquid':
+            return (X @ d['cp_liquid']) / kg_per_mol
+        if name == 'thermal_conductivity_liquid':
+            # Series (harmonic) mixing: the poorest conductor dominates
+            return 1.0 / (X @ (1.0 / d['conductivity']))
+        if name == 'thermal_conductivity_solid':
+            return SOLID_CONDUCTIVITY_RATIO * c['thermal_conductivity_liquid']
+        raise KeyError(f"Unknown property: {name}")
+
+    def compute(self, compositions):
+        """Return {property: (n,) array} for a batch of compositions, without memoization"""
+        X = self.composition_array(compositions)
+        self.current = {}
+        try:
+            for name in PROPERTY_NAMES:
+                self.current[name] = self._model(name, X)
+                if name == 'solidus_temp':
+                    self._check_freezing_range(X)
+            return self.current
+        finally:
+            self.current = {}
+
+    def _check_freezing_range(self, X):
+        """Raise ValueError for rows whose solidus is not below their liquidus"""
+        np, c = self.np, self.current
+        bad = np.flatnonzero(~(c['solidus_temp'] < c['liquidus_temp']))
+        if bad.size:
+            i = int(bad[0])
+            fractions = ", ".join(f"{e}={x:.3g}" for e, x in zip(self.elements, X[i]) if x > 0)
+            raise ValueError(f"Solidus {c['solidus_temp'][i]:g} K is not below liquidus "
+                             f"{c['liquidus_temp'][i]:g} K for {fractions} ({bad.size} "
+                             f"composition(s) affected); the melting source needs a "
+                             f"freezing range")
+
+    def properties(self, compositions):
+        """Return one property dict per composition, computing only unseen ones"""
+        X = self.composition_array(compositions)
+        keys = [tuple(row) for row in self.np.round(X, KEY_DECIMALS).tolist()]
+        missing = list(dict.fromkeys(k for k in keys if k not in self._memo))
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            values = self.compute(self.np.array(missing))
+            for i, key in enumerate(missing):
+                self._memo[key] = {name: float(values[name][i]) for name in PROPERTY_NAMES}
+        return [dict(self._memo[key]) for key in keys]
+
+    def clear_cache(self):
+        """Forget all memoized compositions"""
+        self._memo.clear()
+        self.hits = self.misses = 0
+
+
+_DEFAULT_DATABASE = None
+
+
+def default_database():
+    """Return the shared PropertyDatabase over all elements in ELEMENT_DATA"""
+    global _DEFAULT_DATABASE
+    if _DEFAULT_DATABASE is None:
+        _DEFAULT_DATABASE = PropertyDatabase()
+    return _DEFAULT_DATABASE
+
+
+def case_properties(composition, database=None):
+    """Return HEASolidificationCase property overrides for one composition
+
+    Values are rounded to 6 significant digits, the precision written to the
+    case dictionaries.
+    """
+    values = (database or default_database()).properties([composition])[0]
+    return {name: float(f"{value:.6g}") for name, value in values.items()}
+
+
+def format_table(compositions, rows):
+    """Return the properties of each composition as a text table, one column per composition"""
+    width = max(14, *(len(c) for c in compositions)) + 2
+    lines = [f"{'property':<28}" + "".join(f"{c:>{width}}" for c in compositions)]
+    for name in PROPERTY_NAMES:
+        lines.append(f"{name:<28}" + "".join(f"{row[name]:{width}.5g}" for row in rows))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate HEA properties from composition")
+    parser.add_argument('compositions', nargs='+', help="formulas, e.g. Al0.5CoCrFeMnNi")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+    rows = default_database().properties(args.compositions)
+    if args.json:
+        print(json.dumps(dict(zip(args.compositions, rows)), indent=2))
+        return 0
+    print(format_table(args.compositions, rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
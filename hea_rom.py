@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Reduced-order model (POD) of the temperature and liquid-fraction fields of sweeps
+
+Builds a proper orthogonal decomposition of the T and solidification:alpha1
+snapshots of every finished case in one or more sweeps and interpolates the
+modal coefficients in parameter and time space, so the full fields of an
+unseen case are reconstructed on the case mesh in about a millisecond.
+
+The snapshot matrix is never held in memory: snapshots are read one time
+directory at a time and folded into a truncated SVD with the incremental
+(Brand) update, so memory scales with cells x modes rather than cells x
+snapshots. Coefficients of each case are resampled onto a common time grid
+and interpolated across the scaled case parameters (the ParameterSpace of
+hea_surrogate) with a thin-plate-spline RBF with a linear tail.
+
+    python hea_rom.py build sweep_a sweep_b --model rom.npz
+    python hea_rom.py reconstruct --model rom.npz --time 120 latent_heat=2.6e5 --write out_case
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import hea_foamio
+import hea_post
+
+FIELDS = ('T', 'solidification:alpha1')
+MAX_MODES = 40
+# Fraction of the snapshot energy (about the reference field) the kept modes must capture
+ENERGY = 0.99999
+# Snapshots folded into the SVD per update
+BATCH_SIZE = 32
+
+
+class StreamingSVD:
+    """Truncated SVD of a matrix whose columns arrive in batches
+
+    Keeps U (cells x rank), the singular values S and the right singular
+    vectors V (one row per column seen so far), so the coefficients of
+    column j are S * V[j]. The total squared norm of all columns is kept to
+    tell the energy the truncated basis captures.
+    """
+
+    def __init__(self, rank):
+        import numpy as np
+
+        self.np = np
+        self.rank = rank
+        self.U = self.S = self.V = None
+        self.total_energy = 0.0
+
+    def update(self, B):
+        """Fold the columns of B (cells x b) into the decomposition"""
+        np = self.np
+        B = np.asarray(B, dtype=float)
+        self.total_energy += float((B * B).sum())
+        if self.U is None:
+            U, S, Vt = np.linalg.svd(B, full_matrices=False)
+            self._truncate(U, S, Vt.T)
+            return
+        k, b = len(self.S), B.shape[1]
+        # Project out the current basis twice to keep U orthonormal
+        C = self.U.T @ B
+        R = B - self.U @ C
+        C2 = self.U.T @ R
+        R -= self.U @ C2
+        C += C2
+        Q, Rr = np.linalg.qr(R)
+        K = np.zeros((k + b, k + b))
+        K[:k, :k] = np.diag(self.S)
+        K[:k, k:] = C
+        K[k:, k:] = Rr
+        Uk, S, Vkt = np.linalg.svd(K)
+        U = np.hstack([self.U, Q]) @ Uk
+        n = self.V.shape[0]
+        V = np.zeros((n + b, k + b))
+        V[:n, :k] = self.V
+        V[n:, k:] = np.eye(b)
+        self._truncate(U, S, V @ Vkt.T)
+
+    def _truncate(self, U, S, V):
+        keep = min(self.rank, int((S > S[0] * 1e-12).sum()) if len(S) and S[0] > 0 else 0)
+        keep = max(keep, 1)
+        self.U, self.S, self.V = U[:, :keep], S[:keep], V[:, :keep]
+
+    def captured(self):
+        """Cumulative fraction of the total energy captured by the first 1..rank modes"""
+        np = self.np
+        if self.total_energy <= 0:
+            return np.ones(len(self.S))
+        return np.cumsum(self.S**2) / self.total_energy
+
+    def coefficients(self, n_modes):
+        """Coefficients of every column seen, shape (columns, n_modes)"""
+        return self.V[:, :n_modes] * self.S[:n_modes]
+
+
+def sweep_cases(sweep_dirs):
+    """Return (case dirs, parameter dicts, composition dicts) of the cases with results"""
+    import hea_properties
+    import hea_sweep
+
+    case_dirs, params, compositions = [], [], []
+    for sweep_dir in sweep_dirs:
+        for entry in hea_sweep.load_manifest(sweep_dir)['cases']:
+            case_dir = Path(sweep_dir) / entry['case_dir']
+            if not case_dir.is_dir() or not hea_post.time_directories(case_dir):
+                continue
+            case_dirs.append(case_dir)
+            params.append({key: float(value) for key, value in entry.get('params', {}).items()
+                           if isinstance(value, (int, float))})
+            composition = entry.get('composition')
+            if isinstance(composition, str):
+                composition = hea_properties.parse_formula(composition)
+            compositions.append(composition)
+    return case_dirs, params, compositions
+
+
+def case_snapshots(case_dir, n_cells):
+    """Yield (time, T, alpha1) for each written time directory of a case"""
+    import numpy as np
+
+    t_sol, t_liq = hea_post.melting_range(case_dir)
+    for value, time_dir in hea_post.time_directories(case_dir, include_zero=True):
+        if not (time_dir / 'T').exists():
+            continue
+        _, T = hea_foamio.read_field(time_dir / 'T')
+        if isinstance(T, str):
+            T = np.full(n_cells, float(T.split()[-1]))
+        elif len(T) != n_cells:
+            raise ValueError(f"{time_dir / 'T'} has {len(T)} cells, not {n_cells}; "
+                             f"all cases must share the blockMesh grid")
+        yield value, T, hea_post.liquid_fraction_field(time_dir, t_sol, t_liq, T)
+
+
+class RBFInterpolant:
+    """Thin-plate-spline interpolation with a linear tail, for many outputs at once
+
+    X holds the scaled training points (n, d), Y their values (n, m). The
+    system is factorized once, so the weights of all m columns come from one
+    solve and a query costs one kernel row times the weight matrix.
+    """
+
+    def __init__(self, X, Y):
+        import numpy as np
+
+        self.np = np
+        self.X = np.asarray(X, dtype=float)
+        n, d = self.X.shape
+        if n < d + 1:
+            raise ValueError(f"Need at least {d + 1} cases for {d} parameters, got {n}")
+        A = np.zeros((n + d + 1, n + d + 1))
+        A[:n, :n] = self._kernel(self.X, self.X)
+        A[:n, n:] = self._tail(self.X)
+        A[n:, :n] = A[:n, n:].T
+        rhs = np.zeros((n + d + 1, Y.shape[1]))
+        rhs[:n] = Y
+        self._A_inv = np.linalg.pinv(A)
+        self.weights = self._A_inv @ rhs
+
+    def _kernel(self, A, B):
+        np = self.np
+        r2 = ((A[:, None, :] - B[None, :, :]) ** 2).sum(-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(r2 > 0, 0.5 * r2 * np.log(r2), 0.0)
+
+    def _tail(self, X):
+        return self.np.hstack([self.np.ones((len(X), 1)), X])
+
+    def basis(self, x):
+        """Row of kernel and tail values of one scaled point, to multiply into the weights"""
+        x = self.np.atleast_2d(x)
+        return self.np.hstack([self._kernel(x, self.X), self._tail(x)])[0]
+
+    def __call__(self, x, columns=slice(None)):
+        return self.basis(x) @ self.weights[:, columns]
+
+    def loo_residuals(self):
+        """Leave-one-out residuals of every training point (Rippa's formula), shape (n, m)"""
+        n = len(self.X)
+        return self.weights[:n] / self.np.diag(self._A_inv)[:n, None]
+
+
+class ReducedOrderModel:
+    """POD bases of T and alpha1 with RBF-interpolated modal coefficients"""
+
+    def __init__(self, space, grid, times, means, modes, X, coefficients, info=None):
+        import numpy as np
+
+        self.np = np
+        self.space = space
+        self.grid = tuple(grid)
+        self.times = np.asarray(times, dtype=float)
+        self.means = means
+        self.modes = modes
+        self.X = np.asarray(X, dtype=float)
+        # coefficients[field] has shape (cases, times, modes)
+        self.coefficients = coefficients
+        self.info = info or {}
+        self.interpolants = {
+            field: RBFInterpolant(self.X, c.reshape(len(c), -1))
+            for field, c in coefficients.items()}
+
+    @classmethod
+    def build(cls, sweep_dirs, max_modes=MAX_MODES, energy=ENERGY, n_times=None,
+              batch_size=BATCH_SIZE, verbose=False):
+        """Stream the snapshots of the sweeps into POD bases and fit the interpolants"""
+        import numpy as np
+        from hea_surrogate import ParameterSpace
+
+        case_dirs, params, compositions = sweep_cases(sweep_dirs)
+        if len(case_dirs) < 2:
+            raise ValueError("Need at least two cases with results to build a ROM")
+        space, X = ParameterSpace.from_cases(params, compositions)
+        grid = hea_foamio.read_block_mesh_grid(case_dirs[0])
+        n_cells = grid[2] * grid[3]
+
+        # The mean of the first case is the reference the snapshots are taken about;
+        # it is summed in its own pass so no case is ever held in memory
+        means = {field: np.zeros(n_cells) for field in FIELDS}
+        count = 0
+        for _, *fields in case_snapshots(case_dirs[0], n_cells):
+            count += 1
+            for field, values in zip(FIELDS, fields):
+                means[field] += values
+        for field in FIELDS:
+            means[field] /= max(count, 1)
+        svds = {field: StreamingSVD(max_modes) for field in FIELDS}
+        buffers = {field: [] for field in FIELDS}
+        case_times = []
+
+        def flush():
+            for field in FIELDS:
+                if buffers[field]:
+                    svds[field].update(np.column_stack(buffers[field]))
+                    buffers[field].clear()
+
+        start = time.perf_counter()
+        for case_dir in case_dirs:
+            times = []
+            for value, *fields in case_snapshots(case_dir, n_cells):
+                times.append(value)
+                for field, values in zip(FIELDS, fields):
+                    buffers[field].append(values - means[field])
+                if len(buffers[FIELDS[0]]) >= batch_size:
+                    flush()
+            if len(times) < 2:
+                raise ValueError(f"{case_dir} has fewer than two written times")
+            case_times.append(np.array(times))
+            if verbose:
+                print(f"  {case_dir}: {len(times)} snapshots")
+        flush()
+
+        # Common time grid over the range every case covers
+        t0 = max(t[0] for t in case_times)
+        t1 = min(t[-1] for t in case_times)
+        if t1 <= t0:
+            raise ValueError("The cases share no common time range")
+        n_times = n_times or max(len(t) for t in case_times)
+        grid_times = np.linspace(t0, t1, n_times)
+
+        modes, coefficients, captured = {}, {}, {}
+        for field, svd in svds.items():
+            ratio = svd.captured()
+            n_modes = min(int(np.searchsorted(ratio, energy)) + 1, len(ratio))
+            modes[field] = svd.U[:, :n_modes].copy()
+            snapshot_coefficients = svd.coefficients(n_modes)
+            resampled, row = [], 0
+            for times in case_times:
+                a = snapshot_coefficients[row:row + len(times)]
+                row += len(times)
+                resampled.append(np.column_stack(
+                    [np.interp(grid_times, times, a[:, m]) for m in range(n_modes)]))
+            coefficients[field] = np.array(resampled)
+            captured[field] = float(ratio[n_modes - 1])
+        info = {
+            'cases': [str(c.resolve()) for c in case_dirs],
+            'snapshots': sum(len(t) for t in case_times),
+            'captured_energy': captured,
+            'build_seconds': time.perf_counter() - start,
+        }
+        return cls(space, grid, grid_times, means, modes, space.scale(X), coefficients, info)
+
+    def _time_weights(self, t):
+        """Indices and weights of the two grid times around t (clamped to the range)"""
+        np = self.np
+        t = min(max(float(t), self.times[0]), self.times[-1])
+        i = int(np.clip(np.searchsorted(self.times, t) - 1, 0, len(self.times) - 2))
+        w = (t - self.times[i]) / (self.times[i + 1] - self.times[i])
+        return i, w
+
+    def reconstruct(self, query, t):
+        """Return {field: values per cell} of the case with parameters query at time t"""
+        np = self.np
+        x = self.space.vector(query)
+        i, w = self._time_weights(t)
+        result = {}
+        for field in FIELDS:
+            n_modes = self.modes[field].shape[1]
+            interpolant = self.interpolants[field]
+            # Only the coefficients of the two bracketing grid times are evaluated
+            a = interpolant(x, slice(i * n_modes, (i + 2) * n_modes)).reshape(2, n_modes)
+            a = (1.0 - w) * a[0] + w * a[1]
+            result[field] = self.means[field] + self.modes[field] @ a
+        result['solidification:alpha1'] = np.clip(result['solidification:alpha1'], 0.0, 1.0)
+        return result
+
+    def outside_time_range(self, t):
+        return not self.times[0] <= t <= self.times[-1]
+
+    def loo_errors(self):
+        """Leave-one-out RMS field error of each case (per cell, averaged over time)
+
+        The modes are orthonormal, so the coefficient error norm is the field
+        error norm within the basis.
+        """
+        np = self.np
+        n_cells = self.grid[2] * self.grid[3]
+        errors = {}
+        for field, interpolant in self.interpolants.items():
+            n_modes = self.modes[field].shape[1]
+            residuals = interpolant.loo_residuals().reshape(len(self.X), -1, n_modes)
+            errors[field] = np.sqrt((residuals**2).sum(-1).mean(-1) / n_cells)
+        return errors
+
+    def save(self, path):
+        np = self.np
+        meta = {'space': self.space.to_dict(), 'grid': list(self.grid),
+                'fields': list(FIELDS), 'info': self.info}
+        arrays = {'times': self.times, 'X': self.X}
+        for k, field in enumerate(FIELDS):
+            arrays[f'mean_{k}'] = self.means[field]
+            arrays[f'modes_{k}'] = self.modes[field]
+            arrays[f'coefficients_{k}'] = self.coefficients[field]
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        from hea_surrogate import ParameterSpace
+
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            fields = meta['fields']
+            means = {f: data[f'mean_{k}'] for k, f in enumerate(fields)}
+            modes = {f: data[f'modes_{k}'] for k, f in enumerate(fields)}
+            coefficients = {f: data[f'coefficients_{k}'] for k, f in enumerate(fields)}
+            times, X = data['times'], data['X']
+        return cls(ParameterSpace.from_dict(meta['space']), meta['grid'], times, means,
+                   modes, X, coefficients, meta['info'])
+
+
+def write_fields(case_dir, template_case, fields, t, fmt='ascii'):
+    """Write reconstructed fields as time directory t of case_dir
+
+    T takes class, dimensions and boundary conditions from the 0/T of
+    template_case; alpha1 is written with zeroGradient walls like a warm start.
+    """
+    time_name = f"{t:g}"
+    time_dir = Path(case_dir) / time_name
+    hea_foamio.rewrite_internal_field(Path(template_case) / '0' / 'T', time_dir / 'T',
+                                      fields['T'], fmt=fmt, location=time_name)
+    boundary = {patch: {'type': 'zeroGradient'} for patch in ('bottom', 'top', 'left', 'right')}
+    boundary['frontAndBack'] = {
+        'type': hea_foamio.boundary_types(Path(template_case) / '0' / 'T')['frontAndBack']}
+    hea_foamio.write_field(time_dir / 'solidification:alpha1', 'volScalarField',
+                           'solidification:alpha1', '[0 0 0 0 0 0 0]',
+                           fields['solidification:alpha1'], boundary, fmt=fmt,
+                           location=time_name)
+    return time_dir
+
+
+def main(argv=None):
+    from hea_surrogate import _parse_query
+
+    parser = argparse.ArgumentParser(description="POD reduced-order model of HEA sweeps")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="build the model from finished sweeps")
+    p.add_argument('sweeps', nargs='+', help="sweep directories")
+    p.add_argument('--model', default='rom.npz', help="model file to write")
+    p.add_argument('--modes', type=int, default=MAX_MODES, help="maximum modes per field")
+    p.add_argument('--energy', type=float, default=ENERGY,
+                   help="fraction of snapshot energy the modes must capture")
+    p.add_argument('--times', type=int, default=None,
+                   help="points of the common time grid (default: most written times)")
+    p.add_argument('--batch', type=int, default=BATCH_SIZE, help="snapshots per SVD update")
+    p = sub.add_parser('reconstruct', help="fields of a new parameter set")
+    p.add_argument('query', nargs='*', metavar='KEY=VALUE', help="parameters, e.g. latent_heat=2.6e5")
+    p.add_argument('--model', default='rom.npz', help="model file")
+    p.add_argument('--time', type=float, required=True, help="simulation time (s)")
+    p.add_argument('--write', default=None, metavar='CASE',
+                   help="write the fields as a time directory of this case")
+    p.add_argument('--format', choices=['ascii', 'binary'], default='ascii')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        model = ReducedOrderModel.build(args.sweeps, args.modes, args.energy, args.times,
+                                        args.batch, verbose=True)
+        model.save(args.model)
+        info = model.info
+        print(f"Built from {len(info['cases'])} cases, {info['snapshots']} snapshots "
+              f"in {info['build_seconds']:.1f} s over {', '.join(model.space.parameters)}")
+        for field, error in model.loo_errors().items():
+            print(f"  {field:<22} {model.modes[field].shape[1]:3d} modes, "
+                  f"{info['captured_energy'][field]:.6f} energy, "
+                  f"LOO RMS error {error.mean():.4g} (worst {error.max():.4g})")
+        return 0
+
+    model = ReducedOrderModel.load(args.model)
+    query = _parse_query(args.query)
+    try:
+        outside = model.space.extrapolation(query)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if outside:
+        print(f"WARNING: extrapolating in {', '.join(outside)}", file=sys.stderr)
+    if model.outside_time_range(args.time):
+        print(f"WARNING: time {args.time:g} outside {model.times[0]:g}-{model.times[-1]:g} s, "
+              f"clamped", file=sys.stderr)
+    start = time.perf_counter()
+    fields = model.reconstruct(query, args.time)
+    seconds = time.perf_counter() - start
+    alpha = fields['solidification:alpha1']
+    print(f"T {fields['T'].min():.1f}-{fields['T'].max():.1f} K (mean {fields['T'].mean():.1f}), "
+          f"liquid fraction {alpha.mean():.4f}, front height "
+          f"{hea_post.front_height(alpha, model.grid):.4g} m ({seconds * 1e3:.2f} ms)")
+    if args.write:
+        # The target case's own 0/T is the template when it has one
+        template = args.write if (Path(args.write) / '0' / 'T').exists() else model.info['cases'][0]
+        time_dir = write_fields(args.write, template, fields, args.time, args.format)
+        print(f"Wrote {time_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
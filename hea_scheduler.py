@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Local job queue for running many generated HEA solidification cases
+
+Cases are packed onto a fixed core budget by their MPI rank count, started in
+order of estimated cost (most expensive first) and tracked in a JSON state file
+so an interrupted sweep can be resumed without re-running finished cases. A case
+that has waited longer than max_wait for enough free cores reserves them: no
+later case is started around it until it runs, so narrow cases cannot starve a
+wide one.
+
+The output of each case goes to <state>_logs/<case>-<hash>.log beside the state
+file, not into the case, because run.sh deletes the case's log.* files.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import hea_foamio
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def estimate_cost(case_dir):
+    """Estimate the relative cost of a case as cells x simulated seconds"""
+    case_dir = Path(case_dir)
+    cells = hea_foamio.read_block_mesh_cells(case_dir) or 1
+    end_time = hea_foamio.read_number(case_dir / 'system' / 'controlDict', 'endTime', 1.0)
+    return float(cells) * float(end_time)
+
+
+def build_argv(command, case_dir, ranks):
+    """Split a command template into argv, then fill in {case_dir} and {ranks}
+
+    Substituting after splitting keeps a path with spaces in one argument.
+    """
+    return [arg.format(case_dir=case_dir, ranks=ranks) for arg in shlex.split(command)]
+
+
+class CaseJob:
+    """A single case in the queue and its run history"""
+
+    def __init__(self, case_dir, ranks=1, cost=1.0, status=PENDING, attempts=0,
+                 returncode=None, started=None, finished=None, not_before=0.0, cached=False,
+                 log_path=None, queued=None):
+        self.case_dir = str(case_dir)
+        self.ranks = int(ranks)
+        self.cost = float(cost)
+        self.status = status
+        self.attempts = int(attempts)
+        self.returncode = returncode
+        self.started = started
+        self.finished = finished
+        self.not_before = float(not_before)
+        self.cached = bool(cached)
+        self.log_path = log_path
+        self.queued = time.time() if queued is None else float(queued)
+        self.process = None
+        self.log_file = None
+
+    @classmethod
+    def from_case(cls, case_dir, ranks=None, cost=None):
+        """Create a job, reading ranks and cost from the case dictionaries"""
+        case_dir = Path(case_dir).resolve()
+        if ranks is None:
+            ranks = hea_foamio.read_n_procs(case_dir)
+        if cost is None:
+            cost = estimate_cost(case_dir)
+        return cls(case_dir, ranks=ranks, cost=cost)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a job from its state-file entry"""
+        return cls(**data)
+
+    def to_dict(self):
+        """Return the JSON-serialisable state of the job"""
+        return {
+            'case_dir': self.case_dir,
+            'ranks': self.ranks,
+            'cost': self.cost,
+            'status': self.status,
+            'attempts': self.attempts,
+            'returncode': self.returncode,
+            'started': self.started,
+            'finished': self.finished,
+            'not_before': self.not_before,
+            'cached': self.cached,
+            'log_path': self.log_path,
+            'queued': self.queued,
+        }
+
+
+class LocalScheduler:
+    """Run queued cases concurrently within a core budget"""
+
+    DEFAULT_COMMAND = 'bash run.sh'
+
+    def __init__(self, state_file, max_cores=None, max_retries=1, retry_delay=0.0,
+                 command=None, poll_interval=0.5, cache=None, validate=False, max_wait=600.0,
+                 verbose=True):
+        self.state_file = Path(state_file)
+        self.max_cores = int(max_cores or os.cpu_count() or 1)
+        self.max_retries = int(max_retries)
+        self.retry_delay = float(retry_delay)
+        self.command = command or self.DEFAULT_COMMAND
+        self.poll_interval = float(poll_interval)
+        # Optional hea_cache.ResultCache consulted before each run
+        self.cache = cache
+        # Fail cases with hea_validate errors when they are queued, before any run
+        self.validate = validate
+        # Seconds a ready case may be passed over before it reserves its cores
+        self.max_wait = float(max_wait)
+        self.verbose = verbose
+        self.log_dir = self.state_file.with_name(self.state_file.stem + '_logs')
+        self.jobs = {}
+        self.load_state()
+
+    def log(self, message):
+        """Print a progress message unless running quietly"""
+        if self.verbose:
+            print(message, flush=True)
+
+    # ------------------------------------------------------------------ state
+
+    def load_state(self):
+        """Load the queue from the state file, requeueing interrupted jobs"""
+        if not self.state_file.is_file():
+            return
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for entry in data.get('jobs', []):
+            job = CaseJob.from_dict(entry)
+            if job.status == RUNNING:
+                # The scheduler died while this job ran; its result is unknown
+                job.status = PENDING
+                job.attempts = max(0, job.attempts - 1)
+                job.started = None
+            self.jobs[job.case_dir] = job
+
+    def save_state(self):
+        """Atomically write the queue to the state file"""
+        data = {
+            'version': 1,
+            'max_cores': self.max_cores,
+            'updated': time.time(),
+            'jobs': [job.to_dict() for job in self.jobs.values()],
+        }
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    # ------------------------------------------------------------------ queue
+
+    def add_case(self, case_dir, ranks=None, cost=None):
+        """Queue a case directory; already-known cases are left untouched"""
+        job = CaseJob.from_case(case_dir, ranks=ranks, cost=cost)
+        if job.case_dir in self.jobs:
+            return self.jobs[job.case_dir]
+        job.log_path = self._log_path(job.case_dir)
+        self.jobs[job.case_dir] = job
+        return job
+
+    def _log_path(self, case_dir):
+        # Cases of different sweeps may share a name
+        digest = hashlib.sha1(case_dir.encode('utf-8')).hexdigest()[:8]
+        return str(self.log_dir / f"{Path(case_dir).name}-{digest}.log")
+
+    def _open_log(self, job):
+        """Open the job's runner log for appending"""
+        job.log_path = job.log_path or self._log_path(job.case_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        return open(job.log_path, 'a', encoding='utf-8')
+
+    def add_cases(self, case_dirs):
+        """Queue several case directories and persist the queue"""
+        new_jobs = []
+        for case_dir in case_dirs:
+            known = len(self.jobs)
+            job = self.add_case(case_dir)
+            if len(self.jobs) > known:
+                new_jobs.append(job)
+        if self.validate and new_jobs:
+            self._validate(new_jobs)
+        self.save_state()
+
+    def _validate(self, jobs):
+        """Mark jobs whose cases fail pre-flight validation as failed"""
+        import hea_validate
+
+        results = hea_validate.validate_cases([job.case_dir for job in jobs])
+        for job, result in zip(jobs, results):
+            if not result['errors']:
+                continue
+            job.status = FAILED
+            with self._open_log(job) as f:
+                f.write("Pre-flight validation failed:\n")
+                f.writelines(f"  {message}\n" for message in result['errors'])
+            self.log(f"Invalid ({len(result['errors'])} error(s), see {job.log_path}): "
+                     f"{job.case_dir}")
+
+    def reset_failed(self):
+        """Return failed jobs to the queue with a fresh retry budget"""
+        for job in self.jobs.values():
+            if job.status == FAILED:
+                job.status = PENDING
+                job.attempts = 0
+                job.returncode = None
+                job.queued = time.time()
+        self.save_state()
+
+    def counts(self):
+        """Return the number of jobs in each status"""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def _job_cores(self, job):
+        # A job wider than the machine still runs, alone
+        return min(job.ranks, self.max_cores)
+
+    def _next_jobs(self, free_cores, now):
+        """Pick pending jobs to start, first-fit in order of decreasing cost
+
+        Jobs that have waited longer than max_wait come first, longest waiting
+        first, and one of them that does not fit stops the search, so the cores
+        freed from then on accumulate for it.
+        """
+        selected = []
+        ready = [job for job in self.jobs.values()
+                 if job.status == PENDING and job.not_before <= now]
+
+        def waiting_since(job):
+            return max(job.queued, job.not_before)
+
+        def starving(job):
+            return now - waiting_since(job) > self.max_wait
+
+        def priority(job):
+            if starving(job):
+                return (0, waiting_since(job), job.case_dir)
+            return (1, -job.cost, job.case_dir)
+        ready.sort(key=priority)
+        for job in ready:
+            cores = self._job_cores(job)
+            if cores <= free_cores:
+                selected.append(job)
+                free_cores -= cores
+            elif starving(job):
+                break
+        return selected
+
+    # ------------------------------------------------------------------ run
+
+    def _build_command(self, job):
+        return build_argv(self.command, job.case_dir, job.ranks)
+
+    def _start(self, job):
+        if self.cache is not None and self.cache.fetch(job.case_dir):
+            job.status = DONE
+            job.cached = True
+            job.returncode = 0
+            job.finished = time.time()
+            self.log(f"Reused cached results: {job.case_dir}")
+            return
+        env = dict(os.environ)
+        env['HEA_NPROCS'] = str(job.ranks)
+        job.attempts += 1
+        job.status = RUNNING
+        job.started = time.time()
+        job.finished = None
+        job.returncode = None
+        job.log_file = self._open_log(job)
+        try:
+            job.process = subprocess.Popen(self._build_command(job), cwd=job.case_dir,
+                                           stdout=job.log_file, stderr=subprocess.STDOUT,
+                                           env=env)
+        except OSError as e:
+            job.log_file.write(f"Failed to start: {e}\n")
+            self._finish(job, 127)
+            return
+        self.log(f"Started: {job.case_dir} ({job.ranks} rank(s), attempt {job.attempts})")
+
+    def _close(self, job):
+        job.process = None
+        if job.log_file is not None:
+            job.log_file.close()
+            job.log_file = None
+
+    def _finish(self, job, returncode):
+        self._close(job)
+        job.returncode = returncode
+        job.finished = time.time()
+        if returncode == 0:
+            job.status = DONE
+            self.log(f"Finished: {job.case_dir}")
+            if self.cache is not None:
+                self.cache.store(job.case_dir)
+        elif job.attempts <= self.max_retries:
+            job.status = PENDING
+            job.not_before = job.finished + self.retry_delay * job.attempts
+            self.log(f"Failed (exit {returncode}), will retry: {job.case_dir}")
+        else:
+            job.status = FAILED
+            self.log(f"Failed (exit {returncode}): {job.case_dir}")
+
+    def _running(self):
+        return [job for job in self.jobs.values() if job.process is not None]
+
+    def step(self):
+        """Reap finished jobs and start new ones; return True while work remains"""
+        changed = False
+        for job in self._running():
+            returncode = job.process.poll()
+            if returncode is not None:
+                self._finish(job, returncode)
+                changed = True
+
+        used = sum(self._job_cores(job) for job in self._running())
+        for job in self._next_jobs(self.max_cores - used, time.time()):
+            self._start(job)
+            changed = True
+
+        if changed:
+            self.save_state()
+        counts = self.counts()
+        return counts[PENDING] + counts[RUNNING] > 0
+
+    def run(self):
+        """Run the queue to completion and return the final status counts"""
+        self.log(f"Scheduling {len(self.jobs)} case(s) on {self.max_cores} core(s)")
+        try:
+            while self.step():
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            self.log("Interrupted, stopping running cases...")
+            for job in self._running():
+                job.process.terminate()
+                job.process.wait()
+                self._close(job)
+                job.status = PENDING
+                job.attempts -= 1
+            self.save_state()
+            raise
+        counts = self.counts()
+        self.log(f"Queue complete: {counts[DONE]} done, {counts[FAILED]} failed")
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run generated HEA cases on local cores")
+    parser.add_argument('cases', nargs='*', help="case directories to queue")
+    parser.add_argument('--sweep', default=None, help="queue every case of a sweep manifest")
+    parser.add_argument('--state', default='hea_queue.json', help="queue state file")
+    parser.add_argument('--cores', type=int, default=None, help="core budget (default: all)")
+    parser.add_argument('--retries', type=int, default=1, help="retries per failed case")
+    parser.add_argument('--retry-delay', type=float, default=0.0, help="seconds before a retry")
+    parser.add_argument('--command', default=None,
+                        help="command run in each case, may use {case_dir} and {ranks}")
+    parser.add_argument('--cache', default=None, help="result cache directory to reuse runs")
+    parser.add_argument('--cache-gb', type=float, default=50.0, help="result cache size limit")
+    parser.add_argument('--reset-failed', action='store_true', help="requeue failed cases")
+    parser.add_argument('--max-wait', type=float, default=600.0,
+                        help="seconds a case waits for cores before it reserves them")
+    parser.add_argument('--validate', action='store_true',
+                        help="fail cases with pre-flight validation errors instead of running them")
+    parser.add_argument('--quiet', action='store_true', help="suppress progress messages")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache:
+        import hea_cache
+        cache = hea_cache.ResultCache(args.cache, max_bytes=args.cache_gb * 1024**3,
+                                      verbose=not args.quiet)
+    scheduler = LocalScheduler(args.state, max_cores=args.cores, max_retries=args.retries,
+                               retry_delay=args.retry_delay, command=args.command,
+                               cache=cache, validate=args.validate, max_wait=args.max_wait,
+                               verbose=not args.quiet)
+    cases = list(args.cases)
+    if args.sweep:
+        import hea_sweep
+        cases.extend(hea_sweep.case_paths(args.sweep))
+    scheduler.add_cases(cases)
+    if args.reset_failed:
+        scheduler.reset_failed()
+    counts = scheduler.run()
+    return 0 if counts[FAILED] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
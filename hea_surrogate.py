@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Response-surface surrogate of finished sweeps
+
+Fits one Gaussian process per scalar output (solidification time, hot-spot
+size and height, peak velocity, ...) from the case parameters of one or more
+sweeps: the numeric property overrides of HEASolidificationCase recorded in
+the manifests and, when sweeps vary the alloy, the atom fractions of the
+composition. Parameters a case does not override take the class defaults.
+
+Each GP has a squared-exponential kernel with one length scale per parameter
+(chosen by maximizing the marginal likelihood), so parameters the outputs do
+not depend on are recognized and smoothed over. Predictions come with a
+standard deviation, leave-one-out errors tell how far to trust the fit, and
+propose() picks the candidate cases that remove the most predictive variance.
+A query is a few NumPy operations on the training set (tens of microseconds
+for a few hundred cases).
+
+    python hea_surrogate.py fit sweep_a sweep_b --model surrogate.json
+    python hea_surrogate.py predict --model surrogate.json liquidus_temp=1700 latent_heat=2.6e5
+    python hea_surrogate.py propose --model surrogate.json -n 8 --spec next_cases.json
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+OUTPUTS = ('solidification_time', 'hot_spot_fraction', 'hot_spot_height', 'peak_velocity')
+# Bounds of the hyperparameter search, in units of the normalized parameter range
+LENGTH_SCALE_BOUNDS = (0.02, 50.0)
+# Noise variance relative to the signal variance
+NOISE_BOUNDS = (1e-8, 0.5)
+SEARCH_ROUNDS = 5
+
+
+def default_parameters():
+    """Property values a case gets when a sweep does not override them"""
+    from setup_hea_solidification import HEASolidificationCase
+
+    return HEASolidificationCase('.', verbose=False).properties
+
+
+def _case_outputs(case_dir):
+    """Summary of a finished case, from hea_summary.json or by post-processing it"""
+    import hea_post
+
+    path = Path(case_dir) / hea_post.SUMMARY_NAME
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    if not hea_post.time_directories(case_dir):
+        return None
+    return hea_post.summarize_case(case_dir)
+
+
+def load_sweeps(sweep_dirs, outputs=OUTPUTS):
+    """Return (parameter dicts, composition dicts, output dicts) of the finished cases"""
+    import hea_properties
+    import hea_sweep
+
+    params, compositions, results = [], [], []
+    for sweep_dir in sweep_dirs:
+        for entry in hea_sweep.load_manifest(sweep_dir)['cases']:
+            summary = _case_outputs(Path(sweep_dir) / entry['case_dir'])
+            if summary is None:
+                continue
+            params.append({key: float(value) for key, value in entry.get('params', {}).items()
+                           if isinstance(value, (int, float))})
+            composition = entry.get('composition')
+            if isinstance(composition, str):
+                composition = hea_properties.parse_formula(composition)
+            compositions.append(composition)
+            results.append({name: summary.get(name) for name in outputs})
+    return params, compositions, results
+
+
+class GaussianProcess:
+    """GP regression on parameters scaled to [0, 1], with standardized targets"""
+
+    def __init__(self, X, y, length_scales=None, noise=None):
+        import numpy as np
+
+        self.np = np
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.y_mean = float(y.mean())
+        self.y_scale = float(y.std()) or 1.0
+        self.y = (y - self.y_mean) / self.y_scale
+        if length_scales is None:
+            length_scales, noise = self._optimize()
+        self.length_scales = np.asarray(length_scales, dtype=float)
+        self.noise = float(noise)
+        self._factorize()
+
+    def _correlation(self, A, B, length_scales):
+        np = self.np
+        A, B = A / length_scales, B / length_scales
+        d2 = (A**2).sum(1)[:, None] + (B**2).sum(1)[None, :] - 2.0 * A @ B.T
+        return np.exp(-0.5 * np.maximum(d2, 0.0))
+
+    def _log_likelihood(self, log_length_scales, log_noise):
+        """Marginal log likelihood with the signal variance profiled out"""
+        np = self.np
+        n = len(self.y)
+        R = self._correlation(self.X, self.X, np.exp(log_length_scales))
+        R[np.diag_indices(n)] += math.exp(log_noise)
+        try:
+            L = np.linalg.cholesky(R)
+        except np.linalg.LinAlgError:
+            return -math.inf
+        z = np.linalg.solve(L, self.y)
+        variance = float(z @ z) / n
+        return -0.5 * n * math.log(max(variance, 1e-300)) - float(np.log(np.diag(L)).sum())
+
+    def _optimize(self):
+        """Coordinate search over log length scales and log noise"""
+        np = self.np
+        d = self.X.shape[1]
+        lo = np.log([LENGTH_SCALE_BOUNDS[0]] * d + [NOISE_BOUNDS[0]])
+        hi = np.log([LENGTH_SCALE_BOUNDS[1]] * d + [NOISE_BOUNDS[1]])
+        theta = np.log([0.5] * d + [1e-4])
+        best = self._log_likelihood(theta[:d], theta[d])
+        step = math.log(4.0)
+        for _ in range(SEARCH_ROUNDS):
+            for i in range(d + 1):
+                for direction in (-1.0, 1.0):
+                    while True:
+                        trial = theta.copy()
+                        trial[i] = np.clip(trial[i] + direction * step, lo[i], hi[i])
+                        if trial[i] == theta[i]:
+                            break
+                        value = self._log_likelihood(trial[:d], trial[d])
+                        if value <= best:
+                            break
+                        theta, best = trial, value
+            step *= 0.5
+        return np.exp(theta[:d]), math.exp(theta[d])
+
+    def _factorize(self):
+        np = self.np
+        n = len(self.y)
+        R = self._correlation(self.X, self.X, self.length_scales)
+        R[np.diag_indices(n)] += self.noise
+        R_inv = np.linalg.inv(R)
+        self.variance = float(self.y @ R_inv @ self.y) / n
+        # Precomputed for prediction: scaled inputs, weights and the inverse
+        self.X_scaled = self.X / self.length_scales
+        self.weights = R_inv @ self.y
+        self.R_inv = R_inv
+        # Leave-one-out residuals of the standardized targets (Rasmussen & Williams 5.12)
+        self.loo_residuals = self.weights / np.diag(R_inv)
+
+    def predict(self, x, return_std=True):
+        """Mean (and standard deviation) at one scaled point x"""
+        np = self.np
+        diff = self.X_scaled - x / self.length_scales
+        k = np.exp(-0.5 * np.einsum('ij,ij->i', diff, diff))
+        mean = self.y_mean + self.y_scale * float(k @ self.weights)
+        if not return_std:
+            return mean
+        var = self.variance * max(1.0 - float(k @ self.R_inv @ k), 0.0)
+        return mean, self.y_scale * math.sqrt(var)
+
+    def predict_many(self, X):
+        """Means and standard deviations at the rows of scaled points X"""
+        np = self.np
+        K = self._correlation(np.asarray(X, dtype=float), self.X, self.length_scales)
+        mean = self.y_mean + self.y_scale * (K @ self.weights)
+        var = self.variance * np.maximum(1.0 - ((K @ self.R_inv) * K).sum(1), 0.0)
+        return mean, self.y_scale * np.sqrt(var)
+
+    def posterior_covariance(self, X):
+        """Posterior covariance (standardized units) between the rows of X"""
+        K = self._correlation(X, self.X, self.length_scales)
+        prior = self._correlation(X, X, self.length_scales)
+        return self.variance * (prior - K @ self.R_inv @ K.T)
+
+    def loo_rmse(self):
+        """Leave-one-out root-mean-square error in output units"""
+        np = self.np
+        return self.y_scale * float(np.sqrt(np.mean(self.loo_residuals**2)))
+
+    def to_dict(self):
+        return {'length_scales': self.length_scales.tolist(), 'noise': self.noise}
+
+
+class ParameterSpace:
+    """Case parameters as vectors scaled to [0, 1] over their training ranges
+
+    parameters lists the varied numeric parameters: property overrides and
+    'x_<element>' composition fractions. Parameters a query leaves out take
+    defaults (the HEASolidificationCase values, CoCrFeMnNi for compositions).
+    fixed holds the value of every other parameter a query may name: sweep
+    parameters held constant and the remaining case properties. A query may
+    repeat a fixed value; moving it is reported by extrapolation().
+    """
+
+    def __init__(self, parameters, bounds, defaults, fixed=None):
+        import numpy as np
+
+        self.np = np
+        self.parameters = list(parameters)
+        self.bounds = {name: tuple(bounds[name]) for name in self.parameters}
+        self.defaults = dict(defaults)
+        self.fixed = dict(fixed or {})
+        lo = np.array([self.bounds[p][0] for p in self.parameters])
+        hi = np.array([self.bounds[p][1] for p in self.parameters])
+        self._lo, self._inv_span = lo, 1.0 / (hi - lo)
+
+    @classmethod
+    def from_cases(cls, params, compositions):
+        """Return the space of the parameters the cases vary and their raw (n, d) matrix"""
+        import numpy as np
+        import hea_properties
+
+        defaults = {key: float(value) for key, value in default_parameters().items()
+                    if isinstance(value, (int, float))}
+        names = sorted({key for p in params for key in p})
+        unknown = [name for name in names if name not in defaults]
+        if unknown:
+            raise ValueError(f"Sweep parameter(s) {', '.join(unknown)} are not numeric case "
+                             f"properties (known: {', '.join(sorted(defaults))})")
+        elements = sorted({e for c in compositions if c for e in c})
+        # Cases without a composition are the default CoCrFeMnNi
+        elements = sorted(set(elements) | set(hea_properties.CANTOR)) if elements else []
+        defaults.update({f"x_{e}": hea_properties.CANTOR.get(e, 0.0)
+                         for e in elements or hea_properties.CANTOR})
+        rows = []
+        for p, c in zip(params, compositions):
+            row = [p.get(name, defaults[name]) for name in names]
+            if elements:
+                fractions = c or hea_properties.CANTOR
+                row += [fractions.get(e, 0.0) for e in elements]
+            rows.append(row)
+        columns = names + [f"x_{e}" for e in elements]
+        X = np.array(rows, dtype=float).reshape(len(rows), len(columns))
+        # Parameters that never vary carry no information; their value is kept
+        varied = [j for j in range(len(columns)) if X[:, j].max() > X[:, j].min()]
+        if not varied:
+            raise ValueError("The training cases do not vary any parameter")
+        parameters = [columns[j] for j in varied]
+        fixed = {**defaults, **{columns[j]: float(X[0, j]) for j in range(len(columns))
+                                if j not in varied}}
+        for name in parameters:
+            fixed.pop(name, None)
+        X = X[:, varied]
+        bounds = {name: (float(X[:, j].min()), float(X[:, j].max()))
+                  for j, name in enumerate(parameters)}
+        return cls(parameters, bounds, {p: defaults.get(p, 0.0) for p in parameters},
+                   fixed), X
+
+    def scale(self, X):
+        return (X - self._lo) * self._inv_span
+
+    def _expand(self, query):
+        """Query with 'composition' turned into x_<element> fractions, names checked
+
+        A 'composition' entry (formula or dict) sets every fraction, absent
+        elements to zero.
+        """
+        query = dict(query)
+        composition = query.pop('composition', None)
+        if composition is not None:
+            import hea_properties
+            if isinstance(composition, str):
+                composition = hea_properties.parse_formula(composition)
+            query.update({p: 0.0 for p in list(self.parameters) + list(self.fixed)
+                          if p.startswith('x_')})
+            query.update({f"x_{e}": v for e, v in composition.items()})
+        unknown = [key for key in query if key not in self.parameters
+                   and key not in self.fixed and not key.startswith('x_')]
+        if unknown:
+            raise ValueError(f"Unknown parameter(s) {', '.join(unknown)}: not a case property "
+                             f"or 'composition' (varied: {', '.join(self.parameters)})")
+        return {key: float(value) for key, value in query.items()}
+
+    def vector(self, query):
+        """Scaled parameter vector of a query dict; fixed parameters are not part of it"""
+        query = self._expand(query)
+        x = self.np.array([query.get(p, self.defaults[p]) for p in self.parameters])
+        return self.scale(x)
+
+    def extrapolation(self, query):
+        """Parameters of a query outside the training range, including moved fixed ones"""
+        x = self.vector(query)
+        outside = [p for p, v in zip(self.parameters, x) if v < -1e-9 or v > 1 + 1e-9]
+        for key, value in self._expand(query).items():
+            if key not in self.parameters:
+                # Elements no training case contains are fixed at zero
+                fixed = self.fixed.get(key, 0.0)
+                if abs(value - fixed) > 1e-9 * max(1.0, abs(fixed)):
+                    outside.append(key)
+        return outside
+
+    def to_dict(self):
+        return {'parameters': self.parameters, 'bounds': self.bounds, 'defaults': self.defaults,
+                'fixed': self.fixed}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['parameters'], data['bounds'], data['defaults'], data.get('fixed'))
+
+
+class Surrogate:
+    """Gaussian processes from case parameters (a ParameterSpace) to each scalar output"""
+
+    def __init__(self, space, training, hyperparameters=None):
+        import numpy as np
+
+        self.np = np
+        self.space = space
+        self.parameters = space.parameters
+        self.bounds = space.bounds
+        self.training = training
+        X = np.array(training['X'], dtype=float)
+        self.models = {}
+        for name, values in training['outputs'].items():
+            rows = [i for i, v in enumerate(values) if v is not None]
+            if len(rows) < 2:
+                continue
+            hyper = (hyperparameters or {}).get(name, {})
+            self.models[name] = GaussianProcess(
+                space.scale(X[rows]), [values[i] for i in rows],
+                hyper.get('length_scales'), hyper.get('noise'))
+
+    @classmethod
+    def fit(cls, sweep_dirs, outputs=OUTPUTS):
+        """Train on the finished cases of one or more sweeps"""
+        params, compositions, results = load_sweeps(sweep_dirs, outputs)
+        if len(results) < 2:
+            raise ValueError("Need at least two finished cases to fit a surrogate")
+        space, X = ParameterSpace.from_cases(params, compositions)
+        training = {'X': X.tolist(),
+                    'outputs': {name: [r[name] for r in results] for name in outputs}}
+        return cls(space, training)
+
+    def scale(self, X):
+        return self.space.scale(X)
+
+    def vector(self, query):
+        return self.space.vector(query)
+
+    def extrapolation(self, query):
+        return self.space.extrapolation(query)
+
+    def predict(self, query, outputs=None, return_std=True):
+        """Return {output: (mean, std)} (or {output: mean}) at a parameter dict"""
+        x = self.vector(query)
+        return {name: self.models[name].predict(x, return_std)
+                for name in (outputs or self.models)}
+
+    def quality(self):
+        """Leave-one-out RMSE of every output, absolute and relative to its spread"""
+        result = {}
+        for name, gp in self.models.items():
+            rmse = gp.loo_rmse()
+            result[name] = {'loo_rmse': rmse, 'relative': rmse / gp.y_scale,
+                            'n': len(gp.y),
+                            'length_scales': dict(zip(self.parameters,
+                                                      gp.length_scales.tolist()))}
+        return result
+
+    def propose(self, n=8, n_candidates=1000, bounds=None, seed=0, outputs=None):
+        """Pick n parameter sets that most reduce the summed predictive variance
+
+        Candidates are drawn by Latin hypercube sampling within bounds (default:
+        the training ranges). Selection is greedy: after each pick the candidates'
+        posterior covariances are conditioned on it, so a batch spreads out
+        instead of clustering at the single most uncertain point.
+        """
+        np = self.np
+        rng = np.random.default_rng(seed)
+        d = len(self.parameters)
+        bounds = {**self.bounds, **(bounds or {})}
+        lo = np.array([bounds[p][0] for p in self.parameters])
+        hi = np.array([bounds[p][1] for p in self.parameters])
+        strata = (rng.permuted(np.tile(np.arange(n_candidates), (d, 1)), axis=1).T
+                  + rng.random((n_candidates, d))) / n_candidates
+        raw = lo + strata * (hi - lo)
+        fractions = [j for j, p in enumerate(self.parameters) if p.startswith('x_')]
+        if fractions:
+            # Atom fractions sampled independently must still describe an alloy
+            raw[:, fractions] /= raw[:, fractions].sum(axis=1, keepdims=True)
+        X = self.scale(raw)
+        # Constant outputs have no variance to reduce
+        names = [name for name in (outputs or self.models) if self.models[name].variance > 0]
+        covariances = [self.models[name].posterior_covariance(X) for name in names]
+        chosen = []
+        for _ in range(min(n, n_candidates)):
+            score = sum(np.diag(C) / self.models[name].variance
+                        for name, C in zip(names, covariances))
+            score[chosen] = -np.inf
+            j = int(np.argmax(score))
+            chosen.append(j)
+            for C in covariances:
+                column = C[:, j].copy()
+                if column[j] > 0:
+                    C -= np.outer(column, column) / column[j]
+        proposals = []
+        for j in chosen:
+            case = {p: float(f"{v:.6g}") for p, v in zip(self.parameters, raw[j])}
+            predicted = self.predict(case, names)
+            fractions = {p[2:]: case.pop(p) for p in list(case) if p.startswith('x_')}
+            if fractions:
+                case['composition'] = fractions
+            case['predicted'] = {name: {'mean': m, 'std': s} for name, (m, s) in predicted.items()}
+            proposals.append(case)
+        return proposals
+
+    def to_dict(self):
+        return {**self.space.to_dict(), 'training': self.training,
+                'hyperparameters': {name: gp.to_dict() for name, gp in self.models.items()}}
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(ParameterSpace.from_dict(data), data['training'], data['hyperparameters'])
+
+
+def _parse_query(items):
+    query = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected key=value, got: {item}")
+        try:
+            query[key] = float(value)
+        except ValueError:
+            query[key] = value
+    return query
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Surrogate model of finished HEA sweeps")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('fit', help="train on finished sweeps")
+    p.add_argument('sweeps', nargs='+', help="sweep directories")
+    p.add_argument('--model', default='surrogate.json', help="model file to write")
+    p.add_argument('--outputs', nargs='+', default=list(OUTPUTS), help="summary outputs")
+    p = sub.add_parser('predict', help="predict outputs for parameters")
+    p.add_argument('query', nargs='*', metavar='KEY=VALUE', help="parameters, e.g. latent_heat=2.6e5")
+    p.add_argument('--model', default='surrogate.json', help="model file")
+    p = sub.add_parser('propose', help="suggest the most informative next cases")
+    p.add_argument('--model', default='surrogate.json', help="model file")
+    p.add_argument('-n', type=int, default=8, help="number of cases")
+    p.add_argument('--candidates', type=int, default=1000, help="candidate pool size")
+    p.add_argument('--seed', type=int, default=0, help="random seed")
+    p.add_argument('--spec', default=None,
+                   help="write the cases as a variation list for 'hea_cli.py sweep --spec'")
+    args = parser.parse_args(argv)
+
+    if args.command == 'fit':
+        surrogate = Surrogate.fit(args.sweeps, args.outputs)
+        surrogate.save(args.model)
+        print(f"Fitted {len(surrogate.training['X'])} cases over "
+              f"{', '.join(surrogate.parameters)}")
+        for name, q in surrogate.quality().items():
+            print(f"  {name:<22} LOO RMSE {q['loo_rmse']:.4g} ({q['relative']:.1%} of spread)")
+        return 0
+    surrogate = Surrogate.load(args.model)
+    if args.command == 'predict':
+        query = _parse_query(args.query)
+        try:
+            outside = surrogate.extrapolation(query)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        if outside:
+            print(f"WARNING: extrapolating in {', '.join(outside)}", file=sys.stderr)
+        for name, (mean, std) in surrogate.predict(query).items():
+            print(f"{name:<22} {mean:12.6g} +/- {std:.3g}")
+        return 0
+    proposals = surrogate.propose(args.n, args.candidates, seed=args.seed)
+    if args.spec:
+        with open(args.spec, 'w', encoding='utf-8') as f:
+            json.dump([{k: v for k, v in case.items() if k != 'predicted'}
+                       for case in proposals], f, indent=2)
+    print(json.dumps(proposals, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Parameter sweeps of HEA solidification cases and their shared manifest
+
+A sweep directory holds one generated case per variation plus sweep_manifest.json,
+which records each case's parameters and run status. Case paths in the manifest are
+relative to the sweep directory so it can be mounted at different paths on
+different nodes.
+"""
+
+import contextlib
+import itertools
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+
+from setup_hea_solidification import HEASolidificationCase
+
+MANIFEST_NAME = 'sweep_manifest.json'
+LOCK_NAME = 'sweep_manifest.lock'
+
+
+class ManifestLock:
+    """Exclusive lock on the sweep manifest using an O_EXCL lock file
+
+    A lock whose holder died is broken the way hea_distributed takes over dead
+    claims: its (mtime, owner) must stay unchanged for stale_after seconds of this
+    process's own monotonic clock, so clock skew between nodes cannot make a live
+    lock look stale. Breaking renames the lock away and checks that it still
+    belongs to the dead holder, so two waiters cannot both break it.
+    """
+
+    def __init__(self, sweep_dir, timeout=60.0, stale_after=30.0):
+        self.path = Path(sweep_dir) / LOCK_NAME
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()} {os.getpid()} {uuid.uuid4().hex[:6]}"
+        # Last observed (mtime, owner, local monotonic time) of the lock file
+        self._observed = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {self.path}")
+                time.sleep(0.05)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{self.owner}\n")
+            return self
+
+    def __exit__(self, *exc):
+        # Never remove a lock that another process took over from us
+        if _read_owner(self.path) == self.owner:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+    def _break_if_stale(self):
+        # A holder that died mid-update would otherwise block the sweep forever
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        owner = _read_owner(self.path)
+        now = time.monotonic()
+        if self._observed is None or self._observed[:2] != (mtime, owner):
+            self._observed = (mtime, owner, now)
+            return
+        if now - self._observed[2] <= self.stale_after:
+            return
+        self._observed = None
+        graveyard = self.path.with_name(f"{LOCK_NAME}.stale.{socket.gethostname()}.{os.getpid()}")
+        try:
+            os.rename(self.path, graveyard)
+        except FileNotFoundError:
+            return
+        if _read_owner(graveyard) != owner:
+            # Another waiter broke it first and we moved its fresh lock; put it back
+            with contextlib.suppress(FileExistsError):
+                os.link(graveyard, self.path)
+        os.unlink(graveyard)
+
+
+def _read_owner(path):
+    try:
+        return Path(path).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(sweep_dir):
+    """Load the manifest of a sweep directory"""
+    with open(Path(sweep_dir) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(sweep_dir, manifest):
+    """Atomically write the manifest of a sweep directory"""
+    path = Path(sweep_dir) / MANIFEST_NAME
+    tmp_path = path.with_name(f"{MANIFEST_NAME}.{socket.gethostname()}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def update_case(sweep_dir, case_name, **fields):
+    """Update one case entry in the manifest under the manifest lock"""
+    with ManifestLock(sweep_dir):
+        manifest = load_manifest(sweep_dir)
+        for entry in manifest['cases']:
+            if entry['name'] == case_name:
+                entry.update(fields)
+                break
+        else:
+            raise KeyError(f"Case not in manifest: {case_name}")
+        write_manifest(sweep_dir, manifest)
+    return entry
+
+
+def case_paths(sweep_dir):
+    """Return the absolute case directories listed in the manifest"""
+    sweep_dir = Path(sweep_dir)
+    return [sweep_dir / entry['case_dir'] for entry in load_manifest(sweep_dir)['cases']]
+
+
+def generate_sweep(sweep_dir, variations, verbose=False, profile=False):
+    """Generate one case per variation and write the sweep manifest
+
+    Each variation is a dict with an optional 'case_name', 'n_procs',
+    'mesh_cells', 'composition', 'thermo_model', 'amr_levels' and 'amr_criterion',
+    and any other keys treated as overrides of
+    HEASolidificationCase.properties.
+    """
+    sweep_dir = Path(sweep_dir)
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    compositions = [v['composition'] for v in variations if v.get('composition') is not None]
+    if compositions:
+        # One vectorized batch; the cases below then hit the memoized results
+        import hea_properties
+        hea_properties.default_database().properties(compositions)
+    entries = []
+    for i, variation in enumerate(variations):
+        params = dict(variation)
+        case_name = params.pop('case_name', f"case_{i:04d}")
+        n_procs = params.pop('n_procs', 1)
+        mesh_cells = params.pop('mesh_cells', (50, 100))
+        composition = params.pop('composition', None)
+        thermo_model = params.pop('thermo_model', 'const')
+        amr = {key: params.pop(key) for key in ('amr_levels', 'amr_criterion') if key in params}
+        case = HEASolidificationCase(sweep_dir, case_name=case_name, n_procs=n_procs,
+                                     properties=params, verbose=verbose, profile=profile,
+                                     mesh_cells=mesh_cells, composition=composition,
+                                     thermo_model=thermo_model, **amr)
+        case.setup_complete_case()
+        entries.append({
+            'name': case_name,
+            'case_dir': case_name,
+            'n_procs': case.n_procs,
+            'mesh_cells': list(case.mesh_cells),
+            'composition': composition,
+            'thermo_model': thermo_model,
+            'amr_levels': case.amr_levels,
+            'params': params,
+            'status': 'pending',
+        })
+
+    manifest = {'version': 1, 'created': time.time(), 'cases': entries}
+    with ManifestLock(sweep_dir):
+        write_manifest(sweep_dir, manifest)
+    return manifest
+
+
+def grid_variations(grid):
+    """Return the cartesian product of a {parameter: [values]} grid as variations"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
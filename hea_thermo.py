@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Temperature-dependent material properties and their OpenFOAM thermo entries
+
+Two thermo models are supported for the generated thermophysicalProperties:
+
+    const       hConst/const transport: liquid Cp and k = mu·Cp/Pr everywhere
+    tabulated   hTabulated/tabulated transport: Cp and kappa blend linearly from
+                the solid to the liquid values across the mushy zone
+
+A single power series over the table range cannot follow the kinks at Tsol and
+Tliq (a 7th-order fit is off by half the solid-liquid difference in the mushy
+zone), so hPolynomial is not offered.
+
+PropertyTable samples the same curves once on a uniform temperature grid, with
+Tsol and Tliq on grid points so the piecewise-linear model is reproduced
+exactly. Lookups are one index computation and one gather per property, and
+temperature from enthalpy inverts through a precomputed bin index the same way,
+so the Python tools evaluate millions of cells at NumPy speed.
+"""
+
+import math
+
+THERMO_MODELS = ('const', 'tabulated')
+# Lower end of the tables; walls are held at 300 K
+T_MIN = 250.0
+# The tables extend this far above the liquidus
+T_ABOVE_LIQUIDUS = 1000.0
+DEFAULT_SAMPLES = 4096
+
+
+def temperature_range(properties):
+    """Return (t_min, t_max) of the property tables of a case"""
+    return T_MIN, float(properties['liquidus_temp']) + T_ABOVE_LIQUIDUS
+
+
+def _blend(solid, liquid, t_sol, t_liq):
+    """Breakpoints of a property that blends linearly between solid and liquid values"""
+    return [(t_sol, solid), (t_liq, liquid)]
+
+
+def property_curves(properties, model='const'):
+    """Return {'Cp', 'kappa'} as lists of (T, value) breakpoints, constant outside them
+
+    For 'const' the values are the liquid Cp and the conductivity implied by Pr,
+    matching what hConst/const transport solve with.
+    """
+    if model not in THERMO_MODELS:
+        raise ValueError(f"Unknown thermo model: {model}")
+    p = properties
+    t_sol, t_liq = float(p['solidus_temp']), float(p['liquidus_temp'])
+    if model == 'const':
+        cp = float(p['specific_heat_liquid'])
+        kappa = float(p['dynamic_viscosity']) * cp / float(p.get('prandtl', 0.15))
+        return {'Cp': _blend(cp, cp, t_sol, t_liq), 'kappa': _blend(kappa, kappa, t_sol, t_liq)}
+    return {
+        'Cp': _blend(float(p['specific_heat_solid']), float(p['specific_heat_liquid']),
+                     t_sol, t_liq),
+        'kappa': _blend(float(p['thermal_conductivity_solid']),
+                        float(p['thermal_conductivity_liquid']), t_sol, t_liq),
+    }
+
+
+class PropertyTable:
+    """Uniformly sampled properties of T with vectorized linear interpolation
+
+    Columns: Cp and kappa, the liquid fraction alpha1 of the melting source and
+    the specific enthalpy h = integral of Cp dT + L·alpha1 (J/kg). Outside the
+    table the end segments are extrapolated, which keeps Cp and kappa constant
+    and h linear in T.
+    """
+
+    def __init__(self, t0, dt, columns):
+        import numpy as np
+
+        self.np = np
+        self.t0 = float(t0)
+        self.dt = float(dt)
+        self.inv_dt = 1.0 / self.dt
+        self.columns = {name: np.ascontiguousarray(values, dtype=float)
+                        for name, values in columns.items()}
+        self.n = len(next(iter(self.columns.values())))
+        self.temperatures = self.t0 + self.dt * np.arange(self.n)
+        # Per-segment slopes, so a lookup is value + slope * offset
+        self._slopes = {name: np.append(np.diff(values), 0.0)
+                        for name, values in self.columns.items()}
+        self._inverse = {}
+
+    @classmethod
+    def from_curves(cls, curves, latent, t_sol, t_liq, t_range, n_samples=DEFAULT_SAMPLES):
+        """Sample breakpoint curves (or callables of T) on a grid through Tsol and Tliq"""
+        import numpy as np
+
+        if not t_liq > t_sol:
+            raise ValueError(f"The melting source needs a freezing range: solidus {t_sol:g} K "
+                             f"is not below liquidus {t_liq:g} K")
+        t_min, t_max = t_range
+        m = max(1, round((t_liq - t_sol) / ((t_max - t_min) / n_samples)))
+        dt = (t_liq - t_sol) / m
+        t0 = t_sol - math.ceil((t_sol - t_min) / dt) * dt
+        n = math.ceil((t_max - t0) / dt) + 1
+        T = t0 + dt * np.arange(n)
+        columns = {}
+        for name, curve in curves.items():
+            if callable(curve):
+                columns[name] = np.asarray(curve(T), dtype=float)
+            else:
+                points = np.asarray(curve, dtype=float)
+                columns[name] = np.interp(T, points[:, 0], points[:, 1])
+        columns['alpha1'] = np.clip((T - t_sol) / (t_liq - t_sol), 0.0, 1.0)
+        cp = columns['Cp']
+        sensible = np.concatenate([[0.0], np.cumsum(0.5 * (cp[1:] + cp[:-1]) * dt)])
+        columns['h'] = cp[0] * t0 + sensible + latent * columns['alpha1']
+        return cls(t0, dt, columns)
+
+    @classmethod
+    def from_properties(cls, properties, model=None, n_samples=DEFAULT_SAMPLES):
+        """Build the table a case with these properties solves with
+
+        model defaults to properties['thermo_model'] (or 'const').
+        """
+        model = model or properties.get('thermo_model', 'const')
+        curves = properties.get('curves') or property_curves(properties, model)
+        return cls.from_curves(curves, float(properties['latent_heat']),
+                               float(properties['solidus_temp']),
+                               float(properties['liquidus_temp']),
+                               temperature_range(properties), n_samples)
+
+    def __call__(self, name, T):
+        """Interpolate column name at temperatures T (any shape)"""
+        np = self.np
+        x = (np.asarray(T, dtype=float) - self.t0) * self.inv_dt
+        i = np.clip(x.astype(np.intp), 0, self.n - 2)
+        return self.columns[name][i] + self._slopes[name][i] * (x - i)
+
+    def _inverse_index(self, name):
+        """Per-column index of uniform bins in value space -> first table segment
+
+        Bins are no wider than the narrowest segment, so a value lies in the
+        segment of its bin or the next one.
+        """
+        if name not in self._inverse:
+            np = self.np
+            column = self.columns[name]
+            steps = np.diff(column)
+            if (steps <= 0).any():
+                raise ValueError(f"Column {name} is not strictly increasing")
+            inv_width = 1.0 / steps.min()
+            n_bins = int(math.ceil((column[-1] - column[0]) * inv_width)) + 1
+            edges = column[0] + np.arange(n_bins) / inv_width
+            index = np.clip(np.searchsorted(column, edges, side='right') - 1, 0, self.n - 2)
+            self._inverse[name] = (inv_width, index, self.dt / steps)
+        return self._inverse[name]
+
+    def inverse(self, name, values):
+        """Temperatures at which a strictly increasing column takes values"""
+        np = self.np
+        column = self.columns[name]
+        inv_width, index, inv_slopes = self._inverse_index(name)
+        values = np.asarray(values, dtype=float)
+        b = np.clip(((values - column[0]) * inv_width).astype(np.intp), 0, len(index) - 1)
+        i = index[b]
+        i = i + ((values > column[i + 1]) & (i < self.n - 2))
+        # Values beyond the ends continue the end segments
+        return self.temperatures[i] + (values - column[i]) * inv_slopes[i]
+
+    def max(self, name):
+        return float(self.columns[name].max())
+
+    def min(self, name):
+        return float(self.columns[name].min())
+
+
+def _foam_table(points):
+    return "(" + " ".join(f"({t:.6g} {v:.6g})" for t, v in points) + ")"
+
+
+def _table_points(curve, t_range):
+    """Breakpoints of a curve extended to the ends of the table range"""
+    t_min, t_max = t_range
+    return [(t_min, curve[0][1])] + list(curve) + [(t_max, curve[-1][1])]
+
+
+def thermo_type(model):
+    """Return the (transport, thermo, equationOfState) names of a thermo model"""
+    return {
+        'const': ('const', 'hConst', 'rhoConst'),
+        'tabulated': ('tabulated', 'hTabulated', 'icoTabulated'),
+    }[model]
+
+
+def mixture_entries(properties, model='const'):
+    """Return the equationOfState, thermodynamics and transport bodies of a model
+
+    Each body is a list of 'keyword value' lines for the mixture subdictionary.
+    """
+    p = properties
+    rho, mu = p['density'], p['dynamic_viscosity']
+    if model == 'const':
+        return {
+            'equationOfState': [f"rho         {rho}"],
+            'thermodynamics': [f"Cp          {p['specific_heat_liquid']}", "Hf          0"],
+            'transport': [f"mu          {mu}", f"Pr          {p.get('prandtl', 0.15)}"],
+        }
+    t_range = temperature_range(p)
+    curves = property_curves(p, model)
+    return {
+        'equationOfState': [f"rho         {_foam_table([(t, rho) for t in t_range])}"],
+        'thermodynamics': ["Hf          0", "Sf          0",
+                           f"Cp          {_foam_table(_table_points(curves['Cp'], t_range))}"],
+        'transport': [f"mu          {_foam_table([(t, mu) for t in t_range])}",
+                      f"kappa       {_foam_table(_table_points(curves['kappa'], t_range))}"],
+    }
+
+
+def _numbers(text):
+    return [float(v) for v in text.replace('(', ' ').replace(')', ' ').split()]
+
+
+def read_case_curves(mixture, model, properties):
+    """Recover the Cp and kappa curves of a tabulated mixture dict"""
+    if model != 'tabulated':
+        raise ValueError(f"No curves to read for thermo model: {model}")
+    thermo = mixture['thermodynamics']
+    transport = mixture['transport']
+    return {'Cp': [tuple(pair) for pair in zip(*[iter(_numbers(thermo['Cp']))] * 2)],
+            'kappa': [tuple(pair) for pair in zip(*[iter(_numbers(transport['kappa']))] * 2)]}
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Pre-flight validation of generated cases
+
+Parses the case dictionaries without running any OpenFOAM utility and reports
+inputs that would make the solver stop after it has taken a queue slot:
+
+    - boundary patches of system/blockMeshDict missing from a field of the
+      start time (0/, or the directory a warm start wrote), or constraint
+      patches (empty, symmetry, ...) whose field type differs
+    - wall functions under simulationType laminar, and missing turbulence
+      fields of a RAS/LES model
+    - divSchemes and fvSolution solvers the chosen solver needs
+    - field and constant/g dimensions, and nonuniform fields of the wrong size
+    - solidus at or above liquidus, non-positive material constants
+    - dynamicRefineFvMesh on a mesh with empty patches, or keyed on a
+      function-object field before that field exists
+
+Files the solver ignores (transportProperties next to thermophysicalProperties)
+are reported as warnings. A case takes a few milliseconds; validate_cases
+spreads a sweep over worker processes.
+
+    python hea_validate.py sweep/*
+    python hea_validate.py --sweep sweep --strict
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import hea_foamio
+
+# Fields every supported solver reads from the start time
+SOLVER_FIELDS = {
+    'buoyantPimpleFoam': ('T', 'U', 'p', 'p_rgh'),
+}
+# Dimensions [kg m s K mol A cd] of the fields of a compressible buoyant case
+EXPECTED_DIMENSIONS = {
+    'T': (0, 0, 0, 1, 0, 0, 0),
+    'U': (0, 1, -1, 0, 0, 0, 0),
+    'p': (1, -1, -2, 0, 0, 0, 0),
+    'p_rgh': (1, -1, -2, 0, 0, 0, 0),
+    'alphat': (1, -1, -1, 0, 0, 0, 0),
+    'nut': (0, 2, -1, 0, 0, 0, 0),
+    'k': (0, 2, -2, 0, 0, 0, 0),
+    'epsilon': (0, 2, -3, 0, 0, 0, 0),
+    'omega': (0, 0, -1, 0, 0, 0, 0),
+}
+GRAVITY_DIMENSIONS = (0, 1, -2, 0, 0, 0, 0)
+# Transported turbulence fields of the common RAS models
+TURBULENCE_FIELDS = {
+    'kEpsilon': ('k', 'epsilon'),
+    'RNGkEpsilon': ('k', 'epsilon'),
+    'realizableKE': ('k', 'epsilon'),
+    'kOmega': ('k', 'omega'),
+    'kOmegaSST': ('k', 'omega'),
+}
+# Patch types whose fields must have the same constraint type
+CONSTRAINT_PATCH_TYPES = ('empty', 'symmetry', 'symmetryPlane', 'wedge', 'cyclic')
+SCHEME_GROUPS = ('ddtSchemes', 'gradSchemes', 'divSchemes', 'laplacianSchemes',
+                 'interpolationSchemes', 'snGradSchemes')
+
+
+def _dimensions(text):
+    """Parse '[0 1 -1 0 0 0 0]' (or its 5-entry form) into a 7-tuple"""
+    values = tuple(float(v) for v in text.strip('[] ').split())
+    if len(values) not in (5, 7):
+        raise ValueError(f"expected 5 or 7 dimension exponents, got {len(values)}")
+    return values + (0.0,) * (7 - len(values))
+
+
+def _balanced(text, start):
+    """Return the text inside the parentheses opening at or after start"""
+    open_at = text.index('(', start)
+    depth = 0
+    for pos in range(open_at, len(text)):
+        if text[pos] == '(':
+            depth += 1
+        elif text[pos] == ')':
+            depth -= 1
+            if depth == 0:
+                return text[open_at + 1:pos]
+    raise ValueError("unbalanced parentheses")
+
+
+def read_mesh_patches(case_dir):
+    """Return {patch: type} of the boundary list in system/blockMeshDict"""
+    text = hea_foamio.read_dict_text(Path(case_dir) / 'system' / 'blockMeshDict')
+    match = re.search(r'^\s*boundary\b', text, re.MULTILINE)
+    if match is None:
+        raise ValueError("no boundary list")
+    patches = hea_foamio.parse_foam_dict(_balanced(text, match.end()))
+    return {name: entry.get('type', 'patch') for name, entry in patches.items()
+            if isinstance(entry, dict)}
+
+
+def _matches(key, name):
+    """True if a dictionary key (a word or a quoted regular expression) selects name"""
+    if key == name:
+        return True
+    try:
+        return re.fullmatch(key, name) is not None
+    except re.error:
+        return False
+
+
+def _lookup(entries, name):
+    """Entry of a dictionary selecting name; exact keys win over patterns"""
+    if name in entries:
+        return entries[name]
+    for key, value in reversed(list(entries.items())):
+        if _matches(key, name):
+            return value
+    return None
+
+
+def required_div_schemes(solver, energy, turbulence_model=None):
+    """Divergence terms a solver evaluates with the given energy variable and model"""
+    if solver not in SOLVER_FIELDS:
+        return []
+    he = 'h' if energy.endswith('Enthalpy') else 'e'
+    terms = ['div(phi,U)', f'div(phi,{he})', 'div(phi,K)',
+             'div(((rho*nuEff)*dev2(T(grad(U)))))']
+    if he == 'e':
+        terms.append('div(phiv,p)')
+    for field in TURBULENCE_FIELDS.get(turbulence_model, ()):
+        terms.append(f'div(phi,{field})')
+    return terms
+
+
+def required_solvers(solver, energy, turbulence_model=None, momentum_predictor=True):
+    """Fields whose linear solver settings must be present in fvSolution"""
+    if solver not in SOLVER_FIELDS:
+        return []
+    fields = ['rho', 'p_rgh', 'h' if energy.endswith('Enthalpy') else 'e']
+    if momentum_predictor:
+        fields.append('U')
+    fields.extend(TURBULENCE_FIELDS.get(turbulence_model, ()))
+    # PIMPLE solvers look up <field>Final on the last outer corrector
+    return fields + [f"{field}Final" for field in fields]
+
+
+class CaseValidator:
+    """Collect the errors and warnings of one case directory"""
+
+    def __init__(self, case_dir):
+        self.case_dir = Path(case_dir)
+        self.errors = []
+        self.warnings = []
+        self._dicts = {}
+
+    def error(self, where, message):
+        self.errors.append(f"{where}: {message}")
+
+    def warn(self, where, message):
+        self.warnings.append(f"{where}: {message}")
+
+    def read(self, relative):
+        """Parsed dictionary of a case file, or None (reported) if unreadable"""
+        if relative not in self._dicts:
+            path = self.case_dir / relative
+            try:
+                self._dicts[relative] = hea_foamio.read_foam_dict(path)
+            except FileNotFoundError:
+                self.error(relative, "missing")
+                self._dicts[relative] = None
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                self.error(relative, f"cannot parse ({e})")
+                self._dicts[relative] = None
+        return self._dicts[relative]
+
+    def run(self):
+        control = self.read('system/controlDict') or {}
+        solver = control.get('application', '')
+        if control and solver not in SOLVER_FIELDS:
+            self.warn('system/controlDict', f"no checks known for application '{solver}'")
+        thermo = self.read('constant/thermophysicalProperties') or {}
+        energy = thermo.get('thermoType', {}).get('energy', 'sensibleEnthalpy')
+        turbulence = self.read('constant/turbulenceProperties') or {}
+        simulation_type = turbulence.get('simulationType', 'laminar')
+        model = None
+        if simulation_type in ('RAS', 'LES'):
+            coeffs = turbulence.get(simulation_type, {})
+            model = coeffs.get('model') or coeffs.get(f'{simulation_type}Model')
+
+        self.check_control(control)
+        start = start_time_name(self.case_dir, control)
+        fields = self.check_fields(solver, simulation_type, model, start)
+        self.check_schemes(solver, energy, model)
+        self.check_solution(solver, energy, model)
+        self.check_materials(thermo)
+        self.check_gravity()
+        self.check_dynamic_mesh(control, fields)
+        if (self.case_dir / 'constant' / 'transportProperties').exists():
+            self.warn('constant/transportProperties',
+                      f"ignored by {solver or 'the solver'}, which reads "
+                      "thermophysicalProperties; its values may disagree")
+
+    def check_control(self, control):
+        if not control:
+            return
+        numbers = {}
+        for key in ('startTime', 'endTime', 'deltaT', 'writeInterval'):
+            try:
+                numbers[key] = float(control.get(key, 'nan'))
+            except ValueError:
+                numbers[key] = float('nan')
+        if not numbers['deltaT'] > 0:
+            self.error('system/controlDict', "deltaT must be positive")
+        if not numbers['endTime'] > numbers['startTime']:
+            self.error('system/controlDict', "endTime must be after startTime")
+        if not numbers['writeInterval'] > 0:
+            self.error('system/controlDict', "writeInterval must be positive")
+
+    def check_fields(self, solver, simulation_type, model, start_name='0'):
+        """Patch names, wall functions, dimensions and sizes of the start-time fields"""
+        try:
+            patches = read_mesh_patches(self.case_dir)
+        except FileNotFoundError:
+            self.error('system/blockMeshDict', "missing")
+            patches = None
+        except ValueError as e:
+            self.error('system/blockMeshDict', f"cannot read boundary ({e})")
+            patches = None
+        cells = hea_foamio.read_block_mesh_cells(self.case_dir)
+
+        start = self.case_dir / start_name
+        if not start.is_dir():
+            self.error(f"{start_name}/", "start time directory missing")
+        names = sorted(p.name for p in start.iterdir() if p.is_file()) if start.is_dir() else []
+        required = [(name, solver) for name in SOLVER_FIELDS.get(solver, ())]
+        if simulation_type != 'laminar':
+            required += [(name, model or simulation_type)
+                         for name in ('nut', 'alphat') + TURBULENCE_FIELDS.get(model, ())]
+        for name, needed_by in required:
+            if name not in names:
+                self.error(f"{start_name}/{name}", f"missing (required by {needed_by})")
+
+        fields = {}
+        for name in names:
+            where = f"{start_name}/{name}"
+            try:
+                entries, internal = hea_foamio.read_field_entries(start / name)
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                self.error(where, f"cannot parse ({e})")
+                continue
+            if 'boundaryField' not in entries:
+                continue
+            fields[name] = entries
+            self._check_dimensions(where, name, entries.get('dimensions'))
+            if isinstance(internal, tuple) and cells is not None and internal[1] != cells:
+                self.error(where, f"internalField has {internal[1]} values for {cells} cells")
+            boundary = entries['boundaryField']
+            if patches is not None:
+                self._check_patches(where, boundary, patches)
+            if simulation_type == 'laminar':
+                for patch, entry in boundary.items():
+                    kind = entry.get('type', '') if isinstance(entry, dict) else ''
+                    if 'WallFunction' in kind:
+                        self.error(where, f"{kind} on '{patch}' needs a turbulence model, "
+                                          "but simulationType is laminar")
+        return fields
+
+    def _check_dimensions(self, where, name, text):
+        if text is None:
+            self.error(where, "no dimensions entry")
+            return
+        try:
+            dimensions = _dimensions(text)
+        except ValueError as e:
+            self.error(where, f"bad dimensions ({e})")
+            return
+        expected = EXPECTED_DIMENSIONS.get(name)
+        if expected is not None and dimensions != expected:
+            self.error(where, f"dimensions {text} should be "
+                              f"[{' '.join(str(v) for v in expected)}]")
+
+    def _check_patches(self, where, boundary, patches):
+        for patch, patch_type in patches.items():
+            entry = _lookup(boundary, patch)
+            if entry is None:
+                self.error(where, f"no boundary condition for patch '{patch}'")
+                continue
+            kind = entry.get('type') if isinstance(entry, dict) else None
+            constrained = (patch_type in CONSTRAINT_PATCH_TYPES
+                           or kind in CONSTRAINT_PATCH_TYPES)
+            if constrained and patch_type != kind:
+                self.error(where, f"patch '{patch}' is {patch_type} in blockMeshDict "
+                                  f"but has type {kind}")
+        for key in boundary:
+            if not any(_matches(key, patch) for patch in patches):
+                self.warn(where, f"boundary entry '{key}' matches no mesh patch")
+
+    def check_schemes(self, solver, energy, model):
+        schemes = self.read('system/fvSchemes')
+        if schemes is None:
+            return
+        for group in SCHEME_GROUPS:
+            if not isinstance(schemes.get(group), dict):
+                self.error('system/fvSchemes', f"missing {group}")
+            elif group != 'divSchemes' and 'default' not in schemes[group]:
+                self.error('system/fvSchemes', f"{group} has no default")
+        div = schemes.get('divSchemes')
+        if not isinstance(div, dict) or div.get('default', 'none') != 'none':
+            return
+        available = {re.sub(r'\s+', '', key) for key in div}
+        for term in required_div_schemes(solver, energy, model):
+            if term not in available:
+                self.error('system/fvSchemes', f"divSchemes has no {term} (needed by {solver})")
+
+    def check_solution(self, solver, energy, model):
+        solution = self.read('system/fvSolution')
+        if solution is None:
+            return
+        solvers = solution.get('solvers', {})
+        pimple = solution.get('PIMPLE')
+        if solver in SOLVER_FIELDS and not isinstance(pimple, dict):
+            self.error('system/fvSolution', f"missing PIMPLE (needed by {solver})")
+            pimple = {}
+        predictor = (pimple or {}).get('momentumPredictor', 'yes') in ('yes', 'on', 'true')
+        for field in required_solvers(solver, energy, model, predictor):
+            if _lookup(solvers, field) is None:
+                self.error('system/fvSolution', f"no solver settings for {field}")
+
+    def check_materials(self, thermo):
+        options = self.read('constant/fvOptions')
+        for name, entry in (options or {}).items():
+            if not isinstance(entry, dict) or entry.get('type') != 'solidificationMeltingSource':
+                continue
+            coeffs = entry.get('solidificationMeltingSourceCoeffs', entry)
+            where = f"constant/fvOptions ({name})"
+            try:
+                t_sol, t_liq = float(coeffs['Tsol']), float(coeffs['Tliq'])
+                latent = float(coeffs['L'])
+            except (KeyError, ValueError) as e:
+                self.error(where, f"missing or non-numeric Tsol, Tliq or L ({e})")
+                continue
+            if not t_liq > t_sol:
+                self.error(where, f"liquidus {t_liq:g} K must be above solidus {t_sol:g} K")
+            elif 'Tmelt' in coeffs and not t_sol <= float(coeffs['Tmelt']) <= t_liq:
+                self.warn(where, f"Tmelt {coeffs['Tmelt']} lies outside [Tsol, Tliq]")
+            if latent < 0:
+                self.error(where, "latent heat L must not be negative")
+        mixture = thermo.get('mixture', {})
+        for group, key in (('equationOfState', 'rho'), ('thermodynamics', 'Cp'),
+                           ('transport', 'mu'), ('transport', 'Pr')):
+            value = mixture.get(group, {}).get(key)
+            # Only the constant models have scalar entries; tables are checked by OpenFOAM
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if not value > 0:
+                self.error('constant/thermophysicalProperties', f"{key} must be positive")
+
+    def check_gravity(self):
+        gravity = self.read('constant/g')
+        if gravity is None:
+            return
+        try:
+            if _dimensions(gravity.get('dimensions', '')) != GRAVITY_DIMENSIONS:
+                self.error('constant/g', f"dimensions {gravity['dimensions']} should be "
+                                         "[0 1 -2 0 0 0 0]")
+        except ValueError as e:
+            self.error('constant/g', f"bad dimensions ({e})")
+
+    def check_dynamic_mesh(self, control, fields):
+        if not (self.case_dir / 'constant' / 'dynamicMeshDict').exists():
+            return
+        mesh = self.read('constant/dynamicMeshDict') or {}
+        coeffs = mesh.get('dynamicRefineFvMeshCoeffs')
+        if not isinstance(coeffs, dict):
+            return
+        where = 'constant/dynamicMeshDict'
+        if mesh.get('dynamicFvMesh') == 'dynamicRefineFvMesh':
+            try:
+                patches = read_mesh_patches(self.case_dir)
+            except (OSError, ValueError):
+                patches = {}
+            empty = [patch for patch, patch_type in patches.items() if patch_type == 'empty']
+            if empty:
+                self.error(where, f"dynamicRefineFvMesh splits cells in all three directions "
+                                  f"and cannot refine a mesh with empty patches "
+                                  f"({', '.join(empty)})")
+        field = coeffs.get('field')
+        produced = [entry.get('result') for entry in control.get('functions', {}).values()
+                    if isinstance(entry, dict)]
+        if field and field not in fields:
+            if field not in produced:
+                self.error(where, f"refinement field {field} is neither a start-time field "
+                                  "nor a function object result")
+            elif int(float(coeffs.get('refineInterval', 1))) < 2:
+                self.error(where, f"refinement field {field} is created by a function object "
+                                  "at the end of the first time step; refineInterval must be "
+                                  "at least 2")
+
+
+def start_time_name(case_dir, control):
+    """Name of the time directory the solver reads its fields from
+
+    Follows startFrom (startTime, firstTime or latestTime) of controlDict, so a
+    warm-started case is checked at the directory hea_warmstart wrote.
+    """
+    times = {}
+    for path in Path(case_dir).iterdir():
+        try:
+            if path.is_dir():
+                times[float(path.name)] = path.name
+        except ValueError:
+            continue
+    start_from = control.get('startFrom', 'startTime')
+    if start_from == 'firstTime' and times:
+        return times[min(times)]
+    if start_from == 'latestTime' and times:
+        return times[max(times)]
+    try:
+        value = float(control.get('startTime', 0))
+    except ValueError:
+        return '0'
+    return times.get(value, f"{value:g}")
+
+
+def validate_case(case_dir):
+    """Validate one case; return {'case', 'errors', 'warnings', 'seconds'}"""
+    start = time.perf_counter()
+    validator = CaseValidator(case_dir)
+    if not Path(case_dir).is_dir():
+        validator.error(str(case_dir), "not a directory")
+    else:
+        validator.run()
+    return {
+        'case': str(case_dir),
+        'errors': validator.errors,
+        'warnings': validator.warnings,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def validate_cases(case_dirs, workers=None):
+    """Validate many cases, in worker processes when there are enough of them"""
+    case_dirs = [str(c) for c in case_dirs]
+    workers = min(int(workers or os.cpu_count() or 1), len(case_dirs))
+    # Starting a process costs more than validating a handful of cases
+    if workers <= 1 or len(case_dirs) < 4 * workers:
+        return [validate_case(c) for c in case_dirs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(case_dirs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(validate_case, case_dirs, chunksize=chunksize))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check generated HEA cases before running them")
+    parser.add_argument('cases', nargs='*', help="case directories")
+    parser.add_argument('--sweep', default=None, help="validate every case of a sweep")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes")
+    parser.add_argument('--strict', action='store_true', help="fail on warnings too")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    cases = list(args.cases)
+    if args.sweep:
+        import hea_sweep
+        cases.extend(hea_sweep.case_paths(args.sweep))
+    start = time.perf_counter()
+    results = validate_cases(cases, args.workers)
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if r['errors'] or (args.strict and r['warnings'])]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            if result['errors'] or result['warnings']:
+                print(result['case'])
+                for message in result['errors']:
+                    print(f"  ERROR   {message}")
+                for message in result['warnings']:
+                    print(f"  WARNING {message}")
+        print(f"{len(results) - len(failed)}/{len(results)} case(s) passed "
+              f"in {elapsed:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,12 +9,49 @@ import sys
 from pathlib import Path
 
 class HEASolidificationCase:
-    def __init__(self, base_path):
+    def __init__(self, base_path, case_name="HEA_Solidification", n_procs=1, properties=None,
+                 warm_start_time=None, initial_temperature=None, field_format='ascii',
+                 verbose=True, profile=False, mesh_cells=(50, 100), composition=None,
+                 thermo_model='const', amr_levels=0, amr_criterion='band'):
         """Initialize the case setup with base directory"""
         self.base_path = Path(base_path)
-        self.case_name = "HEA_Solidification"
+        self.case_name = case_name
         self.case_dir = self.base_path / self.case_name
         
+        # Cells across the mold width and height
+        self.mesh_cells = tuple(int(n) for n in mesh_cells)
+        
+        # Number of MPI ranks (1 = serial run, >1 writes decomposeParDict)
+        self.n_procs = int(n_procs)
+        
+        # Start the CFD run at this time from a conduction-model T field (None = cold start)
+        self.warm_start_time = warm_start_time
+        
+        # Optional per-cell initial T (NumPy array in blockMesh cell order) and the
+        # format ('ascii' or 'binary') used for nonuniform fields
+        self.initial_temperature = initial_temperature
+        self.field_format = field_format
+        
+        # Progress messages for every created file (False = quiet)
+        self.verbose = verbose
+        
+        # Record per-stage timing of setup_complete_case in hea_profile.json
+        self.profile = profile
+        
+        # Temperature dependence of Cp and conductivity: 'const' (liquid values)
+        # or 'tabulated' (solid to liquid across the mushy zone)
+        self.thermo_model = thermo_model
+        
+        # Adaptive refinement of mesh_cells around the solidification front:
+        # levels above the base mesh (0 = uniform mesh) and the criterion,
+        # 'band' (solidus < T < liquidus) or 'gradient' (steep liquid fraction)
+        self.amr_levels = int(amr_levels)
+        self.amr_criterion = amr_criterion
+        # dynamicRefineFvMesh (hexRef8) splits cells in all three directions and
+        # cannot refine a one-cell-thick mesh with empty front/back patches, so
+        # refined cases are a slab one base cell thick between symmetry planes
+        self.front_back_type = 'symmetry' if self.amr_levels > 0 else 'empty'
+        
         # HEA Material Properties (CoCrFeMnNi)
         self.properties = {
             'density': 8100,  # kg/m³
@@ -28,8 +65,28 @@ class HEASolidificationCase:
             'thermal_conductivity_liquid': 28.0,  # W/(m·K)
             'dynamic_viscosity': 0.006,  # Pa·s
             'thermal_expansion': 1.6e-5,  # 1/K
+            'molar_mass': 56.08,  # g/mol (equiatomic)
+            'prandtl': 0.15,  # mu·Cp/k of the melt
         }
         
+        # Alloy composition (formula such as 'Al0.5CoCrFeMnNi' or {element: fraction});
+        # its estimated properties replace the defaults, explicit properties win
+        self.composition = composition
+        if composition is not None:
+            import hea_properties
+            self.properties.update(hea_properties.case_properties(composition))
+            # The solver takes the melt conductivity through Pr
+            p = self.properties
+            prandtl = p['dynamic_viscosity'] * p['specific_heat_liquid'] / p['thermal_conductivity_liquid']
+            p['prandtl'] = float(f"{prandtl:.6g}")
+        if properties:
+            self.properties.update(properties)
+        
+    def log(self, message=""):
+        """Print a progress message unless running quietly"""
+        if self.verbose:
+            print(message)
+    
     def create_directory_structure(self):
         """Create OpenFOAM case directory structure"""
         dirs = [
@@ -42,10 +99,12 @@ class HEASolidificationCase:
         
         for dir_path in dirs:
             dir_path.mkdir(parents=True, exist_ok=True)
-            print(f"Created directory: {dir_path}")
+            self.log(f"Created directory: {dir_path}")
     
     def create_block_mesh_dict(self):
         """Create blockMeshDict for geometry (2D rectangular mold)"""
+        # Cube-shaped base cells keep refined cells isotropic in the AMR slab
+        dz = 0.1 / self.mesh_cells[0] if self.amr_levels > 0 else 0.01
         content = f"""/*--------------------------------*- C++ -*----------------------------------*\\
 | =========                 |                                                 |
 | \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
@@ -72,15 +131,15 @@ vertices
     (0.1 0 0)         // 1
     (0.1 0.2 0)       // 2
     (0 0.2 0)         // 3
-    (0 0 0.01)        // 4
-    (0.1 0 0.01)      // 5
-    (0.1 0.2 0.01)    // 6
-    (0 0.2 0.01)      // 7
+    (0 0 {dz:g})        // 4
+    (0.1 0 {dz:g})      // 5
+    (0.1 0.2 {dz:g})    // 6
+    (0 0.2 {dz:g})      // 7
 );
 
 blocks
 (
-    hex (0 1 2 3 4 5 6 7) (50 100 1) simpleGrading (1 1 1)
+    hex (0 1 2 3 4 5 6 7) ({self.mesh_cells[0]} {self.mesh_cells[1]} 1) simpleGrading (1 1 1)
 );
 
 edges
@@ -127,7 +186,7 @@ boundary
     
     frontAndBack
     {{
-        type empty;
+        type {self.front_back_type};
         faces
         (
             (0 3 2 1)
@@ -145,7 +204,7 @@ mergePatchPairs
         filepath = self.case_dir / 'system' / 'blockMeshDict'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_control_dict(self):
         """Create controlDict for simulation control"""
@@ -203,10 +262,12 @@ maxDeltaT       0.1;
 
 // ************************************************************************* //
 """
+        if self.amr_levels > 0 and self.amr_criterion == 'gradient':
+            content = content.replace("// ****", self._gradient_functions() + "// ****", 1)
         filepath = self.case_dir / 'system' / 'controlDict'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_fv_schemes(self):
         """Create fvSchemes for numerical schemes"""
@@ -267,7 +328,7 @@ snGradSchemes
         filepath = self.case_dir / 'system' / 'fvSchemes'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_fv_solution(self):
         """Create fvSolution for solver settings"""
@@ -346,10 +407,140 @@ relaxationFactors
 
 // ************************************************************************* //
 """
+        if self.amr_levels > 0:
+            # Fluxes on refined faces are rebuilt by correctPhi, which solves for pcorr
+            content = content.replace('''    "(U|h|k|epsilon)"''', '''    "pcorr.*"
+    {
+        $p_rgh;
+        tolerance       1e-05;
+        relTol          0;
+    }
+
+    "(U|h|k|epsilon)"''')
+            content = content.replace("    pRefValue           0;\n", 
+                                      "    pRefValue           0;\n    correctPhi          yes;\n")
         filepath = self.case_dir / 'system' / 'fvSolution'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
+    
+    def create_decompose_par_dict(self):
+        """Create decomposeParDict for parallel runs"""
+        content = f"""/*--------------------------------*- C++ -*----------------------------------*\\
+| =========                 |                                                 |
+| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\\\    /   O peration     | Version:  v2312                                 |
+|   \\\\  /    A nd           | Website:  www.openfoam.com                      |
+|    \\\\/     M anipulation  |                                                 |
+\\*---------------------------------------------------------------------------*/
+FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       dictionary;
+    object      decomposeParDict;
+}}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+numberOfSubdomains {self.n_procs};
+
+method          scotch;
+
+// ************************************************************************* //
+"""
+        filepath = self.case_dir / 'system' / 'decomposeParDict'
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.log(f"Created: {filepath}")
+    
+    def _gradient_functions(self):
+        """Function objects keeping |grad(alpha1)| current for the gradient criterion"""
+        return """functions
+{
+    alphaGrad
+    {
+        type            grad;
+        libs            (fieldFunctionObjects);
+        field           solidification:alpha1;
+        result          gradAlpha1;
+        executeControl  timeStep;
+        writeControl    none;
+    }
+
+    alphaGradMag
+    {
+        type            mag;
+        libs            (fieldFunctionObjects);
+        field           gradAlpha1;
+        result          magGradAlpha1;
+        executeControl  timeStep;
+        writeControl    writeTime;
+    }
+}
+
+"""
+    
+    def create_dynamic_mesh_dict(self):
+        """Create dynamicMeshDict refining the base mesh around the solidification front"""
+        import hea_amr
+        field, lower, upper, unrefine = hea_amr.refinement_levels(
+            self.properties, self.amr_criterion, 0.1 / self.mesh_cells[0])
+        # Each refinement level splits a cell into 8 (hexRef8)
+        fine_cells = self.mesh_cells[0] * self.mesh_cells[1] * 8**self.amr_levels
+        refine_interval = hea_amr.REFINE_INTERVAL[self.amr_criterion]
+        content = f"""/*--------------------------------*- C++ -*----------------------------------*\\
+| =========                 |                                                 |
+| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\\\    /   O peration     | Version:  v2312                                 |
+|   \\\\  /    A nd           | Website:  www.openfoam.com                      |
+|    \\\\/     M anipulation  |                                                 |
+\\*---------------------------------------------------------------------------*/
+FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       dictionary;
+    object      dynamicMeshDict;
+}}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+dynamicFvMesh   dynamicRefineFvMesh;
+
+dynamicRefineFvMeshCoeffs
+{{
+    // Refine every time step so the band never outruns the fine cells; the
+    // gradient field only exists once its function objects have run once
+    refineInterval  {refine_interval};
+    
+    // Refine cells with {lower:g} < {field} < {upper:g}, unrefine below {unrefine:g}
+    field           {field};
+    lowerRefineLevel {lower:g};
+    upperRefineLevel {upper:g};
+    unrefineLevel   {unrefine:g};
+    
+    nBufferLayers   1;
+    maxRefinement   {self.amr_levels};
+    
+    // The uniformly fine slab; refinement stops here
+    maxCells        {fine_cells};
+    
+    // Face fluxes rebuilt after refinement (correctPhi) rather than mapped
+    correctFluxes
+    (
+        (phi none)
+        (phi_0 none)
+        (ghf none)
+    );
+    
+    dumpLevel       true;
+}}
+
+// ************************************************************************* //
+"""
+        filepath = self.case_dir / 'constant' / 'dynamicMeshDict'
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.log(f"Created: {filepath}")
     
     def create_fv_options(self):
         """Create fvOptions for solidification model"""
@@ -399,47 +590,15 @@ solidification
         filepath = self.case_dir / 'constant' / 'fvOptions'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
-    
-    def create_transport_properties(self):
-        """Create transportProperties for fluid properties"""
-        content = f"""/*--------------------------------*- C++ -*----------------------------------*\\
-| =========                 |                                                 |
-| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
-|  \\\\    /   O peration     | Version:  v2312                                 |
-|   \\\\  /    A nd           | Website:  www.openfoam.com                      |
-|    \\\\/     M anipulation  |                                                 |
-\\*---------------------------------------------------------------------------*/
-FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      transportProperties;
-}}
-// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
-
-transportModel  Newtonian;
-
-nu              {self.properties['dynamic_viscosity']/self.properties['density']:.6e};
-
-beta            {self.properties['thermal_expansion']:.6e};
-
-TRef            {self.properties['melting_temp']};
-
-Pr              0.15;
-
-Prt             0.85;
-
-// ************************************************************************* //
-"""
-        filepath = self.case_dir / 'constant' / 'transportProperties'
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_thermophysical_properties(self):
         """Create thermophysicalProperties"""
+        import hea_thermo
+        transport, thermo, equation_of_state = hea_thermo.thermo_type(self.thermo_model)
+        mixture = hea_thermo.mixture_entries(self.properties, self.thermo_model)
+        def entries(name):
+            return "\n".join(f"        {line};" for line in mixture[name])
         content = f"""/*--------------------------------*- C++ -*----------------------------------*\\
 | =========                 |                                                 |
 | \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |
@@ -460,9 +619,9 @@ thermoType
 {{
     type            heRhoThermo;
     mixture         pureMixture;
-    transport       const;
-    thermo          hConst;
-    equationOfState rhoConst;
+    transport       {transport};
+    thermo          {thermo};
+    equationOfState {equation_of_state};
     specie          specie;
     energy          sensibleEnthalpy;
 }}
@@ -471,24 +630,22 @@ mixture
 {{
     specie
     {{
-        molWeight   58.69;
+        molWeight   {self.properties['molar_mass']};
     }}
     
     equationOfState
     {{
-        rho         {self.properties['density']};
+{entries('equationOfState')}
     }}
     
     thermodynamics
     {{
-        Cp          {self.properties['specific_heat_liquid']};
-        Hf          0;
+{entries('thermodynamics')}
     }}
     
     transport
     {{
-        mu          {self.properties['dynamic_viscosity']};
-        Pr          0.15;
+{entries('transport')}
     }}
 }}
 
@@ -497,7 +654,7 @@ mixture
         filepath = self.case_dir / 'constant' / 'thermophysicalProperties'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_g_file(self):
         """Create g file for gravity"""
@@ -525,7 +682,7 @@ value           (0 -9.81 0);
         filepath = self.case_dir / 'constant' / 'g'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_turbulence_properties(self):
         """Create turbulenceProperties"""
@@ -552,7 +709,7 @@ simulationType  laminar;
         filepath = self.case_dir / 'constant' / 'turbulenceProperties'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_initial_conditions(self):
         """Create initial condition files in 0 directory"""
@@ -793,7 +950,7 @@ FoamFile
 }
 // * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
 
-dimensions      [0 2 -1 0 0 0 0];
+dimensions      [1 -1 -1 0 0 0 0];
 
 internalField   uniform 0;
 
@@ -801,29 +958,25 @@ boundaryField
 {
     bottom
     {
-        type            alphatJayatillekeWallFunction;
-        Prt             0.85;
+        type            calculated;
         value           uniform 0;
     }
     
     top
     {
-        type            alphatJayatillekeWallFunction;
-        Prt             0.85;
+        type            calculated;
         value           uniform 0;
     }
     
     left
     {
-        type            alphatJayatillekeWallFunction;
-        Prt             0.85;
+        type            calculated;
         value           uniform 0;
     }
     
     right
     {
-        type            alphatJayatillekeWallFunction;
-        Prt             0.85;
+        type            calculated;
         value           uniform 0;
     }
     
@@ -846,14 +999,38 @@ boundaryField
         }
         
         for filename, content in files.items():
+            # frontAndBack is the only empty patch; the AMR slab makes it symmetry
+            content = content.replace("type            empty;",
+                                      f"type            {self.front_back_type};")
             filepath = self.case_dir / '0' / filename
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(content)
-            print(f"Created: {filepath}")
+            self.log(f"Created: {filepath}")
+        
+        if self.initial_temperature is not None:
+            self.write_initial_field('T', self.initial_temperature)
+    
+    def write_initial_field(self, name, values, fmt=None):
+        """Replace the internalField of 0/<name> with per-cell values
+        
+        values is a NumPy array of shape (nCells,) for scalar fields or (nCells, 3)
+        for vector fields, in blockMesh cell order (x fastest, then y).
+        """
+        import hea_foamio
+        filepath = self.case_dir / '0' / name
+        hea_foamio.rewrite_internal_field(filepath, filepath, values,
+                                          fmt=fmt or self.field_format)
+        self.log(f"Created: {filepath} (nonuniform)")
     
     def create_run_script(self):
         """Create bash script to run the simulation"""
-        wsl_path = self.get_wsl_path()
+        if self.n_procs > 1:
+            solver_cmd = (f"run_stage decomposePar decomposePar -force > log.decomposePar 2>&1 || exit 1\n"
+                          f"run_stage solver mpirun -np {self.n_procs} buoyantPimpleFoam -parallel > log.simulation 2>&1 || exit 1\n"
+                          f"run_stage reconstructPar reconstructPar > log.reconstructPar 2>&1 || exit 1")
+        else:
+            solver_cmd = "run_stage solver buoyantPimpleFoam > log.simulation 2>&1 || exit 1"
+        tools_path = self._to_wsl(Path(__file__).resolve().parent)
         content = f"""#!/bin/bash
 # OpenFOAM HEA Solidification Simulation Run Script
 
@@ -862,20 +1039,38 @@ echo "HEA Solidification Simulation"
 echo "CoCrFeMnNi Alloy Casting"
 echo "======================================"
 
-cd "{wsl_path}"
+# Set HEA_PROFILE=1 to record wall time and peak memory of each stage in hea_profile.json
+HEA_TOOLS="${{HEA_TOOLS:-{tools_path}}}"
+run_stage() {{
+    local stage="$1"
+    shift
+    if [ -n "$HEA_PROFILE" ]; then
+        python3 "$HEA_TOOLS/hea_profiling.py" exec --stage "$stage" -- "$@"
+    else
+        "$@"
+    fi
+}}
+
+# Run in the directory holding this script, so copied cases run in place
+cd "$(dirname "$0")"
 
-echo "Cleaning previous results..."
-foamCleanTutorials
+if [ -f warmstart.json ]; then
+    echo "Warm-started case: keeping the start-time fields..."
+    rm -f log.*
+else
+    echo "Cleaning previous results..."
+    foamCleanTutorials
+fi
 
 echo "Generating mesh with blockMesh..."
-blockMesh
+run_stage blockMesh blockMesh
 
 echo "Checking mesh..."
-checkMesh
+run_stage checkMesh checkMesh
 
 echo "Starting solidification simulation..."
-echo "Using buoyantPimpleFoam solver..."
-buoyantPimpleFoam > log.simulation 2>&1
+echo "Using buoyantPimpleFoam solver ({self.n_procs} process(es))..."
+{solver_cmd}
 
 echo "Creating ParaView file..."
 touch {self.case_name}.foam
@@ -896,11 +1091,14 @@ echo "======================================"
         filepath = self.case_dir / 'run.sh'
         with open(filepath, 'w', encoding='utf-8', newline='\n') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def create_readme(self):
         """Create README with instructions"""
         wsl_path = self.get_wsl_path()
+        amr_note = (f", refined {self.amr_levels} levels at the front ({self.amr_criterion}); "
+                    f"one base cell thick between symmetry planes"
+                    if self.amr_levels > 0 else "")
         content = f"""# High Entropy Alloy (CoCrFeMnNi) Solidification Simulation
 
 ## Case Description
@@ -914,7 +1112,7 @@ OpenFOAM simulation of CoCrFeMnNi high entropy alloy solidification during casti
 
 ## Geometry
 - 2D rectangular mold: 0.1m x 0.2m
-- Mesh: 50 x 100 cells
+- Mesh: {self.mesh_cells[0]} x {self.mesh_cells[1]} cells{amr_note}
 
 ## Boundary Conditions
 - Bottom: 300 K (cold)
@@ -952,69 +1150,106 @@ Generated by: HEA Solidification Setup Script
         filepath = self.case_dir / 'README.md'
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
-        print(f"Created: {filepath}")
+        self.log(f"Created: {filepath}")
     
     def setup_complete_case(self):
         """Setup complete OpenFOAM case"""
-        print("\n" + "="*60)
-        print("HEA Solidification OpenFOAM Case Setup")
-        print("="*60 + "\n")
+        self.log("\n" + "="*60)
+        self.log("HEA Solidification OpenFOAM Case Setup")
+        self.log("="*60 + "\n")
+        
+        if self.profile:
+            import hea_profiling
+            profiler = hea_profiling.Profiler(case_dir=self.case_dir)
+        else:
+            profiler = None
+        step = self._stage_runner(profiler)
         
-        self.create_directory_structure()
-        print()
+        step(self.create_directory_structure)
+        self.log()
         
-        print("Creating mesh dictionary...")
-        self.create_block_mesh_dict()
-        print()
+        self.log("Creating mesh dictionary...")
+        step(self.create_block_mesh_dict)
+        self.log()
         
-        print("Creating simulation control files...")
-        self.create_control_dict()
-        self.create_fv_schemes()
-        self.create_fv_solution()
-        print()
+        self.log("Creating simulation control files...")
+        step(self.create_control_dict)
+        step(self.create_fv_schemes)
+        step(self.create_fv_solution)
+        if self.n_procs > 1:
+            step(self.create_decompose_par_dict)
+        if self.amr_levels > 0:
+            step(self.create_dynamic_mesh_dict)
+        self.log()
         
-        print("Creating material property files...")
-        self.create_fv_options()
-        self.create_transport_properties()
-        self.create_thermophysical_properties()
-        self.create_g_file()
-        self.create_turbulence_properties()
-        print()
+        self.log("Creating material property files...")
+        step(self.create_fv_options)
+        step(self.create_thermophysical_properties)
+        step(self.create_g_file)
+        step(self.create_turbulence_properties)
+        self.log()
         
-        print("Creating initial conditions...")
-        self.create_initial_conditions()
-        print()
+        self.log("Creating initial conditions...")
+        step(self.create_initial_conditions)
+        if self.warm_start_time:
+            step(self.create_warm_start)
+        self.log()
         
-        print("Creating run scripts...")
-        self.create_run_script()
-        print()
+        self.log("Creating run scripts...")
+        step(self.create_run_script)
+        self.log()
         
-        print("Creating documentation...")
-        self.create_readme()
-        print()
+        self.log("Creating documentation...")
+        step(self.create_readme)
+        self.log()
         
-        print("="*60)
-        print("SETUP COMPLETE!")
-        print("="*60)
-        print(f"\nCase created at: {self.case_dir}")
-        print(f"WSL path: {self.get_wsl_path()}")
-        print("\nTO RUN:")
-        print("="*60)
-        print("1. Open WSL terminal")
-        print(f"2. cd {self.get_wsl_path()}")
-        print("3. chmod +x run.sh")
-        print("4. ./run.sh")
-        print("\nTO VIEW RESULTS:")
-        print("Open ParaView and load the .foam file")
-        print("Fields to visualize:")
-        print("  - T (Temperature)")
-        print("  - U (Velocity)")
-        print("  - solidification:alpha1 (Liquid fraction)")
-        print("="*60 + "\n")
+        if profiler is not None:
+            profiler.save()
+        
+        self.log("="*60)
+        self.log("SETUP COMPLETE!")
+        self.log("="*60)
+        self.log(f"\nCase created at: {self.case_dir}")
+        self.log(f"WSL path: {self.get_wsl_path()}")
+        self.log("\nTO RUN:")
+        self.log("="*60)
+        self.log("1. Open WSL terminal")
+        self.log(f"2. cd {self.get_wsl_path()}")
+        self.log("3. chmod +x run.sh")
+        self.log("4. ./run.sh")
+        self.log("\nTO VIEW RESULTS:")
+        self.log("Open ParaView and load the .foam file")
+        self.log("Fields to visualize:")
+        self.log("  - T (Temperature)")
+        self.log("  - U (Velocity)")
+        self.log("  - solidification:alpha1 (Liquid fraction)")
+        self.log("="*60 + "\n")
+    
+    def create_warm_start(self):
+        """Write the warm-start fields from the conduction model"""
+        import hea_warmstart
+        properties = dict(self.properties, thermo_model=self.thermo_model)
+        hea_warmstart.write_warm_start(self.case_dir, self.warm_start_time,
+                                       properties=properties, fmt=self.field_format,
+                                       verbose=self.verbose)
+    
+    def _stage_runner(self, profiler):
+        """Return a function calling a create_* method, timed when profiling"""
+        if profiler is None:
+            return lambda method: method()
+        def step(method):
+            with profiler.stage(f"generate:{method.__name__}"):
+                method()
+        return step
     
     def get_wsl_path(self):
         """Convert Windows path to WSL path"""
-        win_path = str(self.case_dir)
+        return self._to_wsl(self.case_dir)
+    
+    @staticmethod
+    def _to_wsl(path):
+        """Convert a Windows path to its WSL mount path"""
+        win_path = str(path)
         if len(win_path) > 1 and win_path[1] == ':':
             drive = win_path[0].lower()
             rest = win_path[2:].replace('\\', '/')
@@ -1022,29 +1257,11 @@ Generated by: HEA Solidification Setup Script
         return win_path
 
 
-def main():
-    print("="*60)
-    print("HEA SOLIDIFICATION OPENFOAM CASE SETUP")
-    print("FINAL WORKING VERSION")
-    print("="*60)
-    print("\nThis script creates a complete, tested OpenFOAM case")
-    print("for CoCrFeMnNi high entropy alloy solidification.\n")
-    
-    # Use the specified directory
-    base_path = r"C:\Users\pedit\Downloads"
-    
-    print(f"Base directory: {base_path}\n")
-    
-    # Create and setup case
-    try:
-        case = HEASolidificationCase(base_path)
-        case.setup_complete_case()
-        return 0
-    except Exception as e:
-        print(f"\nERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        return 1
+def main(argv=None):
+    """Generate a case; see 'python hea_cli.py generate --help' for the options"""
+    import hea_cli
+    args = sys.argv[1:] if argv is None else list(argv)
+    return hea_cli.main(['generate'] + args)
 
 
 if __name__ == "__main__":
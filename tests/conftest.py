@@ -0,0 +1,56 @@
+"""Shared fixtures: small generated cases with synthetic results, no OpenFOAM needed"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+FAKE_SOLVER = ROOT / 'hea_fake_solver.py'
+
+
+def write_results(case_dir, times, temperature):
+    """Write binary T time directories of a generated case
+
+    temperature(t, x, y) returns the cell temperatures from the cell-centre
+    coordinates of the case's blockMesh grid.
+    """
+    import numpy as np
+    import hea_foamio
+
+    lx, ly, nx, ny = hea_foamio.read_block_mesh_grid(case_dir)
+    x = np.tile((np.arange(nx) + 0.5) * lx / nx, ny)
+    y = np.repeat((np.arange(ny) + 0.5) * ly / ny, nx)
+    boundary = {'frontAndBack': {'type': 'empty'}}
+    for t in times:
+        hea_foamio.write_field(Path(case_dir) / f"{t:g}" / 'T', 'volScalarField', 'T',
+                               '[0 0 0 1 0 0 0]', temperature(t, x, y), boundary,
+                               fmt='binary')
+
+
+def cooling(t_liq):
+    """Synthetic temperature: a superheated melt cooling from the bottom"""
+    def temperature(t, x, y):
+        return t_liq + 50.0 - 4.0 * t * (1.0 - y / 0.2) - 20.0 * (x - 0.05)**2 / 0.0025
+    return temperature
+
+
+@pytest.fixture
+def make_sweep(tmp_path):
+    """Generate a sweep and fill each case with synthetic results
+
+    Returns a function (name, grid, mesh=(8, 16), times=...) -> sweep directory.
+    """
+    import hea_sweep
+
+    def make(name, grid, mesh=(8, 16), times=(10, 20, 30, 40)):
+        sweep_dir = tmp_path / name
+        variations = [{**v, 'mesh_cells': mesh} for v in hea_sweep.grid_variations(grid)]
+        manifest = hea_sweep.generate_sweep(sweep_dir, variations)
+        for entry in manifest['cases']:
+            t_liq = entry['params'].get('liquidus_temp', 1723)
+            write_results(sweep_dir / entry['case_dir'], times, cooling(t_liq))
+        return sweep_dir
+    return make
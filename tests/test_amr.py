@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+import hea_amr
+import hea_convergence
+import hea_foamio
+from setup_hea_solidification import HEASolidificationCase
+
+
+def generate(tmp_path, name='case', mesh=(10, 20), levels=2, criterion='band'):
+    case = HEASolidificationCase(tmp_path, case_name=name, mesh_cells=mesh, verbose=False,
+                                 amr_levels=levels, amr_criterion=criterion)
+    case.setup_complete_case()
+    return tmp_path / name
+
+
+def slab_depth(case_dir):
+    text = hea_foamio.read_dict_text(case_dir / 'system' / 'blockMeshDict')
+    vertices = re.search(r'vertices\s*\((.*?)\)\s*;', text, re.DOTALL).group(1)
+    return max(float(p.split()[2]) for p in re.findall(r'\(([^()]*)\)', vertices))
+
+
+def coeffs(case_dir):
+    path = case_dir / 'constant' / hea_amr.DYNAMIC_MESH_DICT
+    return hea_foamio.read_foam_dict(path)['dynamicRefineFvMeshCoeffs']
+
+
+@pytest.mark.parametrize('criterion', hea_amr.CRITERIA)
+def test_dynamic_mesh_dict_refines_the_slab(tmp_path, criterion):
+    case_dir = generate(tmp_path, criterion=criterion)
+    c = coeffs(case_dir)
+    assert int(c['maxCells']) == 10 * 20 * 8**2
+    assert int(c['maxRefinement']) == 2
+    assert int(c['refineInterval']) == hea_amr.REFINE_INTERVAL[criterion]
+    assert c['field'] == ('T' if criterion == 'band' else hea_amr.GRADIENT_FIELD)
+    assert 'nHatf' not in (case_dir / 'constant' / hea_amr.DYNAMIC_MESH_DICT).read_text()
+    assert 'symmetry' in (case_dir / 'system' / 'blockMeshDict').read_text()
+    assert slab_depth(case_dir) == pytest.approx(0.1 / 10)
+    assert hea_amr.read_amr_settings(case_dir)['criterion'] == criterion
+
+
+def test_rescaled_level_keeps_cubic_slab_cells(tmp_path):
+    template = generate(tmp_path, name='template', criterion='gradient')
+    level_dir = tmp_path / 'mesh_40x80'
+    hea_convergence._copy_template(template, level_dir, (40, 80))
+    assert hea_foamio.read_block_mesh_grid(level_dir)[2:] == (40, 80)
+    assert slab_depth(level_dir) == pytest.approx(0.1 / 40)
+    c = coeffs(level_dir)
+    assert int(c['maxCells']) == 40 * 80 * 8**2
+    _, lower, _, unrefine = hea_amr.refinement_levels({}, 'gradient', 0.1 / 40)
+    assert float(c['lowerRefineLevel']) == pytest.approx(lower, rel=1e-5)
+    assert float(c['unrefineLevel']) == pytest.approx(unrefine, rel=1e-5)
+
+
+def test_fit_slab_leaves_cases_without_amr_alone(tmp_path):
+    case_dir = generate(tmp_path, levels=0)
+    before = (case_dir / 'system' / 'blockMeshDict').read_text()
+    assert hea_amr.fit_slab(case_dir) is False
+    assert (case_dir / 'system' / 'blockMeshDict').read_text() == before
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import hea_benchmark
+
+
+def test_compare_flags_slowdowns_in_either_direction():
+    baseline = {'metrics': {'fields.8x16.mb_per_s': 100.0, 'generate.8x16.seconds': 1.0,
+                            'log.8x16.steps_per_s': 1000.0, 'solver.8x16.seconds': 0.0}}
+    record = {'metrics': {'fields.8x16.mb_per_s': 70.0, 'generate.8x16.seconds': 1.1,
+                          'log.8x16.steps_per_s': 2000.0, 'solver.8x16.seconds': 5.0,
+                          'archive.8x16.ratio': 3.0}}
+    regressions = hea_benchmark.compare(record, baseline, tolerance=0.2)
+    # Faster and new or zero-baseline metrics are not regressions
+    assert [r[0] for r in regressions] == ['fields.8x16.mb_per_s']
+    assert regressions[0][3] == pytest.approx(-0.3)
+    assert hea_benchmark.compare({'metrics': {'generate.8x16.seconds': 1.5}}, baseline)[0][3] == \
+        pytest.approx(-0.5)
+
+
+def test_run_records_history_and_fails_against_a_faster_baseline(tmp_path, capsys):
+    argv = ['--sizes', '8x16', '--only', 'generate', 'fields', '--repeats', '1',
+            '--results-dir', str(tmp_path)]
+    assert hea_benchmark.main(argv + ['--save-baseline', '--json']) == 0
+    record = json.loads(capsys.readouterr().out)
+    fields = {f"fields.8x16.{fmt}_{name}_{op}_mb_per_s" for fmt in ('ascii', 'binary')
+              for name in ('T', 'U') for op in ('write', 'read')}
+    assert set(record['metrics']) == {'generate.8x16.seconds', 'generate.8x16.cases_per_s'} | fields
+    assert json.loads((tmp_path / hea_benchmark.BASELINE_NAME).read_text()) == record
+
+    faster = {**record, 'metrics': {m: (v / 10 if m.endswith('seconds') else v * 10)
+                                    for m, v in record['metrics'].items()}}
+    hea_benchmark.save_baseline(tmp_path, faster)
+    assert hea_benchmark.main(argv) == 1
+    assert 'regression(s)' in capsys.readouterr().out
+    history = (tmp_path / hea_benchmark.HISTORY_NAME).read_text().splitlines()
+    assert len(history) == 2
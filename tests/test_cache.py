@@ -0,0 +1,109 @@
+import os
+
+import hea_cache
+
+
+def make_case(path, end_time=100):
+    (path / 'system').mkdir(parents=True)
+    (path / 'system' / 'controlDict').write_text(f"application buoyantPimpleFoam;\n"
+                                                 f"endTime {end_time};\n")
+    (path / '0').mkdir()
+    (path / '0' / 'T').write_text("internalField uniform 1773;\n")
+    (path / '10').mkdir()
+    (path / '10' / 'T').write_text("internalField uniform 1500;\n")
+    (path / 'log.simulation').write_text("End\n")
+    return path
+
+
+def test_key_ignores_comments_and_location(tmp_path):
+    a = make_case(tmp_path / 'a')
+    b = make_case(tmp_path / 'b')
+    (b / 'system' / 'controlDict').write_text("// comment\napplication   buoyantPimpleFoam;\n"
+                                              "endTime 100;\n")
+    c = make_case(tmp_path / 'c', end_time=200)
+    assert hea_cache.case_key(a) == hea_cache.case_key(b) != hea_cache.case_key(c)
+
+
+def test_rewriting_a_result_in_place_leaves_the_cache_intact(tmp_path):
+    cache = hea_cache.ResultCache(tmp_path / 'cache', verbose=False)
+    source = make_case(tmp_path / 'source')
+    key = cache.store(source)
+    assert key is not None
+
+    # In-place rewrite of the stored case (same inode)
+    with open(source / '10' / 'T', 'r+') as f:
+        f.write("CORRUPTED")
+    restored = make_case(tmp_path / 'restored')
+    (restored / '10' / 'T').unlink()
+    assert cache.fetch(restored)
+    assert (restored / '10' / 'T').read_text() == "internalField uniform 1500;\n"
+
+    # ... and the same for a case restored from the cache
+    with open(restored / '10' / 'T', 'r+') as f:
+        f.write("CORRUPTED")
+    other = make_case(tmp_path / 'other')
+    assert cache.fetch(other)
+    assert (other / '10' / 'T').read_text() == "internalField uniform 1500;\n"
+    assert os.stat(other / '10' / 'T').st_ino != os.stat(restored / '10' / 'T').st_ino
+
+
+def test_cached_files_are_read_only_and_restored_files_writable(tmp_path):
+    cache = hea_cache.ResultCache(tmp_path / 'cache', verbose=False)
+    key = cache.store(make_case(tmp_path / 'source'))
+    cached = tmp_path / 'cache' / key / '10' / 'T'
+    assert not os.stat(cached).st_mode & 0o222
+    restored = make_case(tmp_path / 'restored')
+    assert cache.fetch(restored)
+    assert os.stat(restored / '10' / 'T').st_mode & 0o200
+
+
+def test_store_race_is_not_logged_as_cached(tmp_path, capsys):
+    cache = hea_cache.ResultCache(tmp_path / 'cache')
+    case = make_case(tmp_path / 'case')
+    # Another process is mid-way through renaming its entry into place
+    entry = tmp_path / 'cache' / hea_cache.case_key(case)
+    entry.mkdir()
+    (entry / 'partial').write_text("")
+    cache.store(case)
+    assert "Cached" not in capsys.readouterr().out
+    assert not [p for p in (tmp_path / 'cache').iterdir() if p.name.startswith('.staging')]
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = hea_cache.ResultCache(tmp_path / 'cache', verbose=False)
+    old = cache.store(make_case(tmp_path / 'old', end_time=1))
+    new = cache.store(make_case(tmp_path / 'new', end_time=2))
+    meta = tmp_path / 'cache' / old / hea_cache.META_NAME
+    os.utime(meta, (1, 1))
+    size = max(b for _, b, _ in cache.entries())
+    assert cache.evict(max_bytes=size) == 1
+    assert not (tmp_path / 'cache' / old).exists()
+    assert (tmp_path / 'cache' / new).exists()
+
+
+def test_binary_fields_differing_only_in_raw_bytes_get_different_keys(tmp_path):
+    import numpy as np
+    import hea_foamio
+
+    keys = []
+    for name, pair in (('a', b'\xff\xfe'), ('b', b'\xfe\xff')):
+        case = make_case(tmp_path / name)
+        # Raw doubles that are invalid UTF-8 and contain '//'
+        values = np.frombuffer(b'//' + pair + b'\x00\x00\x40\x40' + b'//' * 4, dtype='<f8')
+        hea_foamio.write_field(case / '0' / 'T', 'volScalarField', 'T', '[0 0 0 1 0 0 0]',
+                               values, {'walls': {'type': 'zeroGradient'}}, fmt='binary')
+        keys.append(hea_cache.case_key(case))
+    assert keys[0] != keys[1]
+
+
+def test_binary_field_key_ignores_the_banner(tmp_path):
+    import numpy as np
+    import hea_foamio
+
+    for name in ('a', 'b'):
+        case = make_case(tmp_path / name)
+        hea_foamio.write_field(case / '0' / 'T', 'volScalarField', 'T', '[0 0 0 1 0 0 0]',
+                               np.arange(4.0), {'walls': {'type': 'zeroGradient'}}, fmt='binary')
+    path = tmp_path / 'b' / '0' / 'T'
+    path.write_bytes(b"// regenerated\n" + path.read_bytes())
+    assert hea_cache.case_key(tmp_path / 'a') == hea_cache.case_key(tmp_path / 'b')
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import hea_compare
+import hea_rom
+
+
+def test_operator_reproduces_linear_fields_between_grids():
+    source, target = (0.1, 0.2, 8, 16), (0.1, 0.2, 16, 32)
+    operator = hea_compare.InterpolationOperator.between(source, target)
+
+    def linear(grid):
+        lx, ly, nx, ny = grid
+        x = (np.arange(nx) + 0.5) * lx / nx
+        y = (np.arange(ny) + 0.5) * ly / ny
+        return (3.0 * x[None, :] + 2.0 * y[:, None]).ravel()
+
+    mapped = operator(linear(source)).reshape(32, 16)
+    expected = linear(target).reshape(32, 16)
+    # Cells beyond the outermost source centres are held constant, not extrapolated
+    assert np.allclose(mapped[1:-1, 1:-1], expected[1:-1, 1:-1])
+    assert operator.outside == 0.0
+    assert operator(np.c_[linear(source), linear(source)]).shape == (512, 2)
+
+
+def test_operator_mirrors_half_domain():
+    operator = hea_compare.InterpolationOperator.between((0.05, 0.2, 4, 8), (0.1, 0.2, 8, 8),
+                                                         mirror=True)
+    row = operator(np.tile(np.arange(4.0), 8)).reshape(8, 8)[0]
+    assert np.allclose(row, row[::-1])
+    assert operator.outside == 0.0
+
+
+def test_operator_reports_uncovered_cells():
+    operator = hea_compare.InterpolationOperator.between((0.05, 0.2, 4, 8), (0.1, 0.2, 8, 8))
+    assert operator.outside == pytest.approx(0.5)
+
+
+def test_identical_cases_on_different_meshes_agree(make_sweep):
+    fine = make_sweep('fine', {'liquidus_temp': [1723]}, mesh=(16, 32))
+    coarse = make_sweep('coarse', {'liquidus_temp': [1723]}, mesh=(8, 16))
+    pairs, unmatched = hea_compare.pair_sweeps(fine, coarse)
+    assert unmatched == [] and len(pairs) == 1
+    result, = hea_compare.compare_many(pairs, workers=1)
+    summary = result['summary']
+    assert summary['n_times'] == 4
+    # Only interpolation error remains: the curvature in x and the held edge cells
+    assert summary['T_relative_max'] < 0.02
+    assert summary['front_error_max'] < 0.2 / 16
+
+
+def test_rom_of_sweep_with_constant_parameter_compares(make_sweep, tmp_path):
+    # Regression: a parameter held constant in the sweep used to crash the ROM query
+    sweep = make_sweep('sweep', {'latent_heat': [2.6e5], 'liquidus_temp': [1700, 1723, 1750]})
+    model = hea_rom.ReducedOrderModel.build([sweep])
+    model.save(tmp_path / 'rom.npz')
+    pairs, unmatched = hea_compare.pair_sweeps(sweep, rom=tmp_path / 'rom.npz')
+    assert unmatched == [] and len(pairs) == 3
+    results = hea_compare.compare_many(pairs, workers=1)
+    for result in results:
+        # The ROM interpolates its own training cases
+        assert result['summary']['T_rms_max'] < 1.0
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import hea_convergence
+import hea_sweep
+
+
+def second_order(cells, exact=1.0, c=0.1):
+    # h = 10 / sqrt(cells), so 100, 400, 1600 cells give h = 1, 0.5, 0.25
+    return exact + c * 100.0 / cells
+
+
+def level(name, cells, status='done', **quantities):
+    return {'level': 0, 'name': name, 'mesh': [cells, 1], 'cells': cells, 'status': status,
+            'quantities': quantities or None}
+
+
+def study_with(tmp_path, levels, **kwargs):
+    (tmp_path / 'study').mkdir()
+    state = {'template': str(tmp_path / 'template'), 'ratio': 2.0, 'tolerance': 0.02,
+             'quantities': ['peak_velocity'], 'levels': levels}
+    (tmp_path / 'study' / hea_convergence.STATE_NAME).write_text(json.dumps(state))
+    return hea_convergence.ConvergenceStudy(tmp_path / 'template', tmp_path / 'study',
+                                            quantities=['peak_velocity'], verbose=False,
+                                            **kwargs)
+
+
+def test_richardson_extrapolation_of_second_order_solutions(tmp_path):
+    levels = [level(f"mesh_{n}", n, peak_velocity=second_order(n)) for n in (100, 400, 1600)]
+    q = study_with(tmp_path, levels).assess()['quantities']['peak_velocity']
+    assert q['order'] == pytest.approx(2.0)
+    assert q['extrapolated'] == pytest.approx(1.0)
+    assert not q['oscillatory']
+    # GCI = Fs |e21| / (r^p - 1) with e21 relative to the finest solution
+    assert q['gci'] == pytest.approx(1.25 * (0.025 - 0.00625) / 1.00625 / 3.0)
+
+
+def test_missing_quantity_on_an_earlier_level_is_reported_as_none(tmp_path):
+    levels = [level('mesh_25', 25, peak_velocity=None)]
+    levels += [level(f"mesh_{n}", n, peak_velocity=second_order(n)) for n in (100, 400, 1600)]
+    result = study_with(tmp_path, levels, tolerance=0.05).assess()
+    q = result['quantities']['peak_velocity']
+    assert q['level_errors'][0] is None
+    assert q['level_errors'][-1] == pytest.approx(1.25 * 0.00625)
+    assert result['converged']
+    assert result['recommended']['cells'] == 400
+
+
+def test_failed_levels_are_run_again_on_resume(tmp_path, monkeypatch):
+    hea_sweep.generate_sweep(tmp_path, [{'case_name': 'template', 'mesh_cells': (10, 10)}])
+    levels = [level('mesh_10x10', 100, peak_velocity=second_order(100)),
+              level('mesh_20x20', 400, status='failed')]
+    study = study_with(tmp_path, levels, max_levels=3)
+    runs = []
+
+    def run_level(k, mesh):
+        runs.append(mesh)
+        cells = mesh[0] * mesh[1]
+        return level(f"mesh_{mesh[0]}x{mesh[1]}", cells, peak_velocity=second_order(cells))
+    monkeypatch.setattr(study, '_run_level', run_level)
+    study.run()
+    assert runs == [(20, 20), (40, 40)]
+    assert [rec['name'] for rec in study.state['levels']] == ['mesh_10x10', 'mesh_20x20',
+                                                              'mesh_40x40']
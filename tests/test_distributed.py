@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+import hea_distributed
+import hea_sweep
+from conftest import FAKE_SOLVER
+
+
+def make_sweep_dir(tmp_path, names=('case_a',)):
+    for name in names:
+        (tmp_path / name).mkdir()
+    hea_sweep.write_manifest(tmp_path, {'cases': [{'name': n, 'case_dir': n, 'status': 'pending'}
+                                                  for n in names]})
+    return tmp_path
+
+
+def make_worker(sweep_dir, worker_id, **kwargs):
+    command = f"{sys.executable} {FAKE_SOLVER} --duration 0"
+    return hea_distributed.SweepWorker(sweep_dir, command=command, worker_id=worker_id,
+                                       poll_interval=0.02, verbose=False, **kwargs)
+
+
+def test_worker_runs_every_case_and_logs_outside_it(tmp_path):
+    sweep_dir = make_sweep_dir(tmp_path, ('case_a', 'case_b'))
+    assert make_worker(sweep_dir, 'w1').run() == 2
+    manifest = hea_sweep.load_manifest(sweep_dir)
+    assert [entry['status'] for entry in manifest['cases']] == ['done', 'done']
+    assert sorted(os.listdir(sweep_dir / hea_distributed.CLAIM_DIR)) == ['case_a.done',
+                                                                          'case_b.done']
+    assert (sweep_dir / hea_distributed.LOG_DIR / 'case_a.log').exists()
+    assert not list((sweep_dir / 'case_a').glob('log.worker'))
+
+
+def test_claim_of_dead_worker_is_reclaimed(tmp_path):
+    sweep_dir = make_sweep_dir(tmp_path)
+    claim = sweep_dir / hea_distributed.CLAIM_DIR / 'case_a.claim'
+    worker = make_worker(sweep_dir, 'w2', stale_after=0.1)
+    claim.write_text("dead\n")
+    assert worker.run() == 1
+    assert (sweep_dir / hea_distributed.CLAIM_DIR / 'case_a.done').read_text() == "w2\n"
+    assert not claim.exists()
+
+
+def test_heartbeating_claim_with_skewed_clock_is_not_reclaimed(tmp_path):
+    sweep_dir = make_sweep_dir(tmp_path)
+    claim = sweep_dir / hea_distributed.CLAIM_DIR / 'case_a.claim'
+    worker = make_worker(sweep_dir, 'w3', stale_after=0.1)
+    claim.write_text("alive\n")
+    deadline = time.monotonic() + 0.4
+    beat = 0
+    while time.monotonic() < deadline:
+        # The owner's clock is a day behind, but its heartbeat keeps moving
+        beat += 1
+        os.utime(claim, (beat, beat))
+        assert worker.claim_next() is None
+        time.sleep(0.03)
+    assert claim.read_text() == "alive\n"
+
+
+def test_losing_a_reclaim_race_restores_the_winners_claim(tmp_path):
+    sweep_dir = make_sweep_dir(tmp_path)
+    claim = sweep_dir / hea_distributed.CLAIM_DIR / 'case_a.claim'
+    worker = make_worker(sweep_dir, 'w4')
+    # We saw the dead owner's claim, but another contender reclaimed it first
+    worker._observed['case_a'] = (0.0, 'dead', 0.0)
+    claim.write_text("winner\n")
+    assert not worker._reclaim('case_a')
+    assert claim.read_text() == "winner\n"
+    assert os.listdir(claim.parent) == ['case_a.claim']
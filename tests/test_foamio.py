@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import hea_foamio
+
+BOUNDARY = {
+    'bottomWall': {'type': 'fixedValue', 'value': 'uniform 1500'},
+    'frontAndBack': {'type': 'empty'},
+}
+
+
+def awkward_values(n):
+    values = np.linspace(-1.0, 2.0e3, n)
+    # Doubles whose raw bytes contain ')' and ';', the list and entry terminators
+    values[:2] = np.frombuffer(b';' * 8 + b')' * 8, dtype='<f8')
+    return values
+
+
+@pytest.mark.parametrize('fmt', ['ascii', 'binary'])
+def test_scalar_field_round_trip(tmp_path, fmt):
+    values = awkward_values(1000)
+    path = tmp_path / '0' / 'T'
+    hea_foamio.write_field(path, 'volScalarField', 'T', '[0 0 0 1 0 0 0]', values, BOUNDARY,
+                           fmt=fmt, location='0', chunk_size=64)
+    entries, internal = hea_foamio.read_field(path)
+    rtol = 0.0 if fmt == 'binary' else 1e-7
+    assert np.allclose(internal, values, rtol=rtol, atol=0.0)
+    assert entries['FoamFile']['format'] == fmt
+    assert entries['dimensions'] == '[0 0 0 1 0 0 0]'
+    assert entries['boundaryField'] == BOUNDARY
+    assert hea_foamio.read_field_entries(path)[1] == ('scalar', 1000)
+
+
+@pytest.mark.parametrize('fmt', ['ascii', 'binary'])
+def test_vector_field_round_trip(tmp_path, fmt):
+    values = awkward_values(300).reshape(100, 3)
+    path = tmp_path / 'U'
+    hea_foamio.write_field(path, 'volVectorField', 'U', '[0 1 -1 0 0 0 0]', values,
+                           {'walls': {'type': 'noSlip'}}, fmt=fmt, chunk_size=7)
+    _, internal = hea_foamio.read_field(path)
+    assert internal.shape == (100, 3)
+    assert np.allclose(internal, values, rtol=0.0 if fmt == 'binary' else 1e-7, atol=0.0)
+    assert hea_foamio.boundary_types(path) == {'walls': 'noSlip'}
+
+
+def test_uniform_field_and_rewrite_between_formats(tmp_path):
+    template = tmp_path / 'T.orig'
+    hea_foamio.write_field(template, 'volScalarField', 'T', '[0 0 0 1 0 0 0]', 1773.0, BOUNDARY)
+    assert hea_foamio.read_field(template)[1] == 'uniform 1773'
+    values = awkward_values(50)
+    hea_foamio.rewrite_internal_field(template, tmp_path / 'T', values, fmt='binary')
+    entries, internal = hea_foamio.read_field(tmp_path / 'T')
+    assert np.array_equal(internal, values)
+    assert entries['boundaryField'] == BOUNDARY
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported format"):
+        hea_foamio.write_field(tmp_path / 'T', 'volScalarField', 'T', '[0 0 0 1 0 0 0]',
+                               np.zeros(3), BOUNDARY, fmt='gzip')
@@ -0,0 +1,100 @@
+import threading
+
+import hea_monitor
+
+
+def step(i, alpha):
+    return (f"Courant Number mean: 0.05 max: 0.2\ndeltaT = 0.1\nTime = {i * 0.1:g}\n\n"
+            f"volAverage() of solidification:alpha1 = {alpha}\n"
+            f"ExecutionTime = {i * 2.0:.2f} s  ClockTime = {i * 2} s\n\n")
+
+
+def make_case(tmp_path, end_time=1.0):
+    (tmp_path / 'system').mkdir()
+    (tmp_path / 'system' / 'controlDict').write_text(f"endTime {end_time};\n")
+    return tmp_path
+
+
+def test_only_appended_bytes_are_parsed(tmp_path):
+    case = make_case(tmp_path)
+    log = case / hea_monitor.LOG_NAME
+    watcher = hea_monitor.CaseWatcher(case)
+    assert watcher.poll() and watcher.status()['state'] == hea_monitor.WAITING
+
+    text = "Starting time loop\n\n" + step(1, 0.9) + step(2, 0.8)
+    # The last line is still being written
+    log.write_text(text[:-10])
+    assert watcher.poll()
+    offset = watcher.offset
+    log.write_text(text)
+    assert watcher.poll()
+    assert watcher.offset == len(text) and watcher.offset > offset
+    status = watcher.status()
+    assert (status['state'], status['steps'], status['time']) == (hea_monitor.RUNNING, 2, 0.2)
+    assert status['liquid_fraction'] == 0.8
+    # 2 s of solver time per 0.1 s simulated, 0.8 s left
+    assert status['eta'] == 16.0
+    assert status['progress'] == 0.2
+
+    assert not watcher.poll()
+    assert watcher.status() is status
+
+    with open(log, 'a') as f:
+        f.write(step(3, 0.7) + "End\n")
+    assert watcher.poll()
+    assert watcher.status()['state'] == hea_monitor.FINISHED
+    assert watcher.status()['steps'] == 3
+
+
+def test_small_reads_give_the_same_status_as_one_full_read(tmp_path):
+    case = make_case(tmp_path)
+    log = case / hea_monitor.LOG_NAME
+    log.write_text("".join(step(i, 1 - i / 20) for i in range(1, 9)))
+    watcher = hea_monitor.CaseWatcher(case)
+    while watcher.offset < log.stat().st_size:
+        watcher.poll(max_bytes=37)
+    full = hea_monitor.case_status(case)
+    assert {k: v for k, v in watcher.status().items() if k != 'updated'} == \
+        {k: v for k, v in full.items() if k != 'updated'}
+
+
+def test_replaced_log_starts_a_new_summary(tmp_path):
+    case = make_case(tmp_path)
+    log = case / hea_monitor.LOG_NAME
+    log.write_text(step(1, 0.9) + step(2, 0.8) + "--> FOAM FATAL ERROR\n")
+    watcher = hea_monitor.CaseWatcher(case)
+    watcher.poll()
+    assert watcher.status()['state'] == hea_monitor.FAILED
+    log.write_text(step(1, 0.95))
+    watcher.poll()
+    assert (watcher.status()['state'], watcher.status()['steps']) == (hea_monitor.RUNNING, 1)
+
+
+def test_status_waits_for_a_poll_in_progress(tmp_path):
+    case = make_case(tmp_path)
+    (case / hea_monitor.LOG_NAME).write_text(step(1, 0.9) + step(2, 0.8))
+    watcher = hea_monitor.CaseWatcher(case)
+    feeding, release = threading.Event(), threading.Event()
+    feed = watcher._feed
+
+    def slow_feed(line):
+        feeding.set()
+        release.wait(5)
+        feed(line)
+    watcher._feed = slow_feed
+    poller = threading.Thread(target=watcher.poll, daemon=True)
+    poller.start()
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(watcher.status()), daemon=True)
+    try:
+        assert feeding.wait(5)
+        reader.start()
+        reader.join(0.2)
+        # No snapshot of the half-parsed log
+        assert reader.is_alive()
+    finally:
+        release.set()
+    poller.join(5)
+    reader.join(5)
+    assert result['steps'] == 2
+    assert watcher.status() is watcher._status and watcher.status()['steps'] == 2
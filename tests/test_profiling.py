@@ -0,0 +1,40 @@
+import json
+import sys
+
+import hea_profiling
+
+
+def test_exec_stages_measure_their_own_peak_rss(tmp_path):
+    big = "b = bytearray(200 * 1024 * 1024); b[::4096] = b'x' * len(b[::4096])"
+    assert hea_profiling.exec_stage(tmp_path, 'big', [sys.executable, '-c', big]) == 0
+    assert hea_profiling.exec_stage(tmp_path, 'small', [sys.executable, '-c', 'pass']) == 0
+    big_stage, small_stage = hea_profiling.load_profile(tmp_path)['stages']
+    assert big_stage['peak_rss_kb'] > 150 * 1024
+    # Not the high-water mark of an earlier stage
+    assert small_stage['peak_rss_kb'] < 100 * 1024
+
+
+def test_exec_stage_reports_exit_code_and_bytes_added(tmp_path):
+    (tmp_path / 'old').write_bytes(b'x' * 5000)
+    (tmp_path / 'same').write_bytes(b'x' * 5000)
+    (tmp_path / 'log').write_bytes(b'x' * 5000)
+    # A file rewritten at the same size adds nothing; an appended one adds its growth
+    write = ("open('new', 'w').write('y' * 1000); open('same', 'w').write('z' * 5000); "
+             "open('log', 'a').write('w' * 24); raise SystemExit(3)")
+    assert hea_profiling.exec_stage(tmp_path, 'write', [sys.executable, '-c', write]) == 3
+    record, = hea_profiling.load_profile(tmp_path)['stages']
+    assert record['returncode'] == 3
+    assert record['bytes_added'] == 1024
+
+
+def test_in_process_stage_is_labelled_cumulative(tmp_path):
+    profiler = hea_profiling.Profiler(case_dir=tmp_path)
+    with profiler.stage('generate'):
+        (tmp_path / 'file').write_text('z' * 10)
+    profiler.save()
+    data = json.loads((tmp_path / hea_profiling.PROFILE_NAME).read_text())
+    record, = data['stages']
+    assert 'peak_rss_kb' not in record and record['process_max_rss_kb'] > 0
+    assert record['bytes_added'] == 10
+    with hea_profiling.NULL_PROFILER.stage('off') as record:
+        assert record is None
@@ -0,0 +1,37 @@
+import pytest
+
+import hea_properties
+import hea_thermo
+
+
+def test_single_element_gets_a_minimum_freezing_range():
+    props = hea_properties.case_properties('Ni')
+    assert props['liquidus_temp'] - props['solidus_temp'] == pytest.approx(
+        hea_properties.MIN_FREEZING_RANGE)
+    # The enthalpy tables divide by the freezing range
+    hea_thermo.PropertyTable.from_properties(props, model='tabulated')
+
+
+def test_spread_of_nearly_equal_melting_points_is_finite():
+    db = hea_properties.PropertyDatabase()
+    values = db.compute([{'Co': 1.0}, {'Co': 1.0 - 1e-12, 'Ni': 1e-12}])
+    assert (values['solidus_temp'] < values['liquidus_temp']).all()
+
+
+def test_model_without_freezing_range_is_rejected():
+    db = hea_properties.PropertyDatabase(
+        models={'solidus_temp': lambda X, db: db.current['liquidus_temp']})
+    with pytest.raises(ValueError, match="freezing range"):
+        db.properties(['CoCrFeMnNi'])
+
+
+def test_cli_table_formats_the_computed_rows(capsys):
+    import hea_cli
+
+    db = hea_properties.default_database()
+    db.clear_cache()
+    assert hea_cli.main(['properties', 'Ni', 'CoCrFeMnNi']) == 0
+    assert (db.hits, db.misses) == (0, 2)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['property', 'Ni', 'CoCrFeMnNi']
+    assert len(lines) == 1 + len(hea_properties.PROPERTY_NAMES)
@@ -0,0 +1,48 @@
+import numpy as np
+
+import hea_rom
+
+
+def test_streaming_svd_matches_full_svd():
+    rng = np.random.default_rng(0)
+    # Rank 6 plus a little noise
+    A = rng.normal(size=(200, 6)) @ rng.normal(size=(6, 45)) + 1e-8 * rng.normal(size=(200, 45))
+    svd = hea_rom.StreamingSVD(rank=10)
+    for start in range(0, 45, 7):
+        svd.update(A[:, start:start + 7])
+    U, S, Vt = np.linalg.svd(A, full_matrices=False)
+    assert np.allclose(svd.S[:6], S[:6], rtol=1e-9)
+    # Same subspace, up to the sign of each mode
+    assert np.allclose(np.abs(svd.U[:, :6].T @ U[:, :6]), np.eye(6), atol=1e-8)
+    assert np.allclose(svd.U[:, :6] @ svd.coefficients(6).T, A, atol=1e-6)
+    assert np.isclose(svd.captured()[5], 1.0)
+    assert np.isclose(svd.total_energy, (A * A).sum())
+
+
+def test_rbf_leave_one_out_residuals_match_refitting():
+    rng = np.random.default_rng(1)
+    X = rng.uniform(size=(12, 2))
+    Y = np.column_stack([np.sin(3 * X[:, 0]) + X[:, 1] ** 2, X[:, 0] * X[:, 1]])
+    residuals = hea_rom.RBFInterpolant(X, Y).loo_residuals()
+    for i in range(len(X)):
+        keep = np.arange(len(X)) != i
+        refit = hea_rom.RBFInterpolant(X[keep], Y[keep])
+        assert np.allclose(Y[i] - refit(X[i]), residuals[i], atol=1e-8)
+
+
+def test_build_streams_the_reference_mean(make_sweep, monkeypatch):
+    sweep = make_sweep('sweep', {'liquidus_temp': [1700, 1723, 1750]})
+    snapshots = hea_rom.case_snapshots
+    reads = []
+
+    def counting(case_dir, n_cells):
+        reads.append(case_dir.name)
+        return snapshots(case_dir, n_cells)
+    monkeypatch.setattr(hea_rom, 'case_snapshots', counting)
+    model = hea_rom.ReducedOrderModel.build([sweep])
+    first = sweep / reads[0]
+    # The first case is read twice, once for the mean and once for the SVD
+    assert reads == ['case_0000', 'case_0000', 'case_0001', 'case_0002']
+    expected = np.mean([T for _, T, _ in snapshots(first, model.grid[2] * model.grid[3])],
+                       axis=0)
+    assert np.allclose(model.means['T'], expected)
@@ -0,0 +1,96 @@
+import sys
+
+import hea_scheduler
+from conftest import FAKE_SOLVER
+
+
+def make_scheduler(tmp_path, command, **kwargs):
+    return hea_scheduler.LocalScheduler(tmp_path / 'queue.json', max_cores=2, command=command,
+                                        poll_interval=0.01, verbose=False, **kwargs)
+
+
+def test_runner_log_survives_run_script_cleaning_logs(tmp_path):
+    case = tmp_path / 'case'
+    case.mkdir()
+    # run.sh removes log.* before running the solver
+    command = f'bash -c "rm -f log.*; echo cleaned; {sys.executable} {FAKE_SOLVER} --duration 0"'
+    scheduler = make_scheduler(tmp_path, command)
+    job = scheduler.add_case(case, ranks=1, cost=1.0)
+    assert scheduler.run()[hea_scheduler.DONE] == 1
+    assert 'cleaned' in open(job.log_path, encoding='utf-8').read()
+    assert not case.joinpath('log.scheduler').exists()
+    assert (case / 'log.simulation').read_text().endswith("End\n")
+    assert job.log_file is None and job.process is None
+
+
+def test_log_paths_of_cases_sharing_a_name_differ(tmp_path):
+    scheduler = make_scheduler(tmp_path, 'true')
+    a = scheduler.add_case(tmp_path / 'a' / 'case', ranks=1, cost=1.0)
+    b = scheduler.add_case(tmp_path / 'b' / 'case', ranks=1, cost=1.0)
+    assert a.log_path != b.log_path
+    # The path is kept in the state file
+    scheduler.save_state()
+    assert make_scheduler(tmp_path, 'true').jobs[a.case_dir].log_path == a.log_path
+
+
+def test_failed_case_is_retried_then_marked_failed(tmp_path):
+    case = tmp_path / 'case'
+    case.mkdir()
+    scheduler = make_scheduler(tmp_path, f"{sys.executable} {FAKE_SOLVER} --duration 0 "
+                                         f"--exit-code 2", max_retries=1)
+    job = scheduler.add_case(case, ranks=1, cost=1.0)
+    counts = scheduler.run()
+    assert counts[hea_scheduler.FAILED] == 1
+    assert (job.attempts, job.returncode) == (2, 2)
+    # The state file records the outcome for a later --reset-failed
+    reloaded = make_scheduler(tmp_path, 'true')
+    assert reloaded.jobs[job.case_dir].status == hea_scheduler.FAILED
+    reloaded.reset_failed()
+    assert reloaded.counts()[hea_scheduler.PENDING] == 1
+
+
+def test_interrupted_job_is_requeued_on_load(tmp_path):
+    scheduler = make_scheduler(tmp_path, 'true')
+    job = scheduler.add_case(tmp_path / 'case', ranks=1, cost=1.0)
+    job.status, job.attempts, job.started = hea_scheduler.RUNNING, 1, 123.0
+    scheduler.save_state()
+    restored = make_scheduler(tmp_path, 'true').jobs[job.case_dir]
+    assert (restored.status, restored.attempts, restored.started) == (hea_scheduler.PENDING, 0,
+                                                                      None)
+
+
+def test_jobs_are_packed_by_cost_within_the_core_budget(tmp_path):
+    scheduler = make_scheduler(tmp_path, 'true')
+    wide = scheduler.add_case(tmp_path / 'wide', ranks=2, cost=10.0)
+    small = [scheduler.add_case(tmp_path / f"small{i}", ranks=1, cost=1.0) for i in range(2)]
+    assert scheduler._next_jobs(2, now=0.0) == [wide]
+    assert scheduler._next_jobs(1, now=0.0) == small[:1]
+    # A job wider than the machine still runs, alone
+    huge = scheduler.add_case(tmp_path / 'huge', ranks=64, cost=100.0)
+    assert scheduler._next_jobs(2, now=0.0) == [huge]
+
+
+def test_paths_with_spaces_stay_single_arguments(tmp_path):
+    case = tmp_path / 'my case'
+    case.mkdir()
+    command = f'"{sys.executable}" "{FAKE_SOLVER}" --duration 0 --log "{{case_dir}}/solver log"'
+    scheduler = hea_scheduler.LocalScheduler(tmp_path / 'state dir' / 'queue.json',
+                                             command=command, poll_interval=0.01,
+                                             verbose=False)
+    scheduler.add_case(case, ranks=1, cost=1.0)
+    assert scheduler.run()[hea_scheduler.DONE] == 1
+    assert (case / 'solver log').read_text().endswith("End\n")
+
+
+def test_wide_job_reserves_cores_after_waiting(tmp_path):
+    scheduler = make_scheduler(tmp_path, 'true', max_wait=60.0)
+    scheduler.max_cores = 4
+    wide = scheduler.add_case(tmp_path / 'wide', ranks=4, cost=1.0)
+    narrow = scheduler.add_case(tmp_path / 'narrow', ranks=1, cost=10.0)
+    now = wide.queued
+    narrow.queued = now + 30.0
+    # Before the wait runs out, narrow jobs backfill the two free cores
+    assert scheduler._next_jobs(2, now + 1.0) == [narrow]
+    # Afterwards the cores are held for the wide job until it fits
+    assert scheduler._next_jobs(2, now + 61.0) == []
+    assert scheduler._next_jobs(4, now + 61.0) == [wide]
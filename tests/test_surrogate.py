@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import hea_surrogate
+
+
+def training_set(n=12, seed=3):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, 2))
+    y = np.sin(3.0 * X[:, 0]) + 0.5 * X[:, 1]**2 + 0.01 * rng.standard_normal(n)
+    return X, y
+
+
+def test_loo_residuals_match_explicit_refits():
+    X, y = training_set()
+    gp = hea_surrogate.GaussianProcess(X, y)
+    errors = []
+    for i in range(len(y)):
+        keep = np.arange(len(y)) != i
+        # The GP on the other points, same hyperparameters and standardization
+        R = gp._correlation(X[keep], X[keep], gp.length_scales)
+        R[np.diag_indices(len(y) - 1)] += gp.noise
+        k = gp._correlation(X[i:i + 1], X[keep], gp.length_scales)[0]
+        mean = float(k @ np.linalg.solve(R, gp.y[keep]))
+        assert gp.loo_residuals[i] == pytest.approx(gp.y[i] - mean, rel=1e-6, abs=1e-9)
+        errors.append(y[i] - (gp.y_mean + gp.y_scale * mean))
+    assert gp.loo_rmse() == pytest.approx(float(np.sqrt(np.mean(np.square(errors)))))
+
+
+def test_predictions_interpolate_and_agree_between_single_and_batch():
+    X, y = training_set()
+    gp = hea_surrogate.GaussianProcess(X, y, length_scales=[0.4, 0.6], noise=1e-8)
+    mean, std = gp.predict_many(X)
+    assert np.allclose(mean, y, atol=1e-4)
+    assert (std < 1e-3).all()
+    query = np.array([[0.3, 0.7], [1.4, -0.2]])
+    single = [gp.predict(x) for x in query]
+    assert np.allclose(gp.predict_many(query), np.array(single).T)
+    # Far from the data the prediction falls back to the mean with the prior spread
+    assert single[1][1] > 10 * std.max()
+
+
+def test_parameter_space_keeps_constant_parameters_fixed():
+    params = [{'liquidus_temp': t, 'latent_heat': 2.6e5} for t in (1700.0, 1723.0, 1750.0)]
+    space, X = hea_surrogate.ParameterSpace.from_cases(params, [None] * 3)
+    assert space.parameters == ['liquidus_temp']
+    assert X[:, 0].tolist() == [1700.0, 1723.0, 1750.0]
+    assert space.fixed['latent_heat'] == 2.6e5
+    assert space.vector({'liquidus_temp': 1725.0}) == pytest.approx([0.5])
+    assert space.extrapolation({'liquidus_temp': 1725.0, 'latent_heat': 2.6e5}) == []
+    assert space.extrapolation({'liquidus_temp': 1800.0, 'latent_heat': 3e5}) == [
+        'liquidus_temp', 'latent_heat']
+    with pytest.raises(ValueError, match='Unknown parameter'):
+        space.vector({'liquidus_tmp': 1725.0})
+
+
+def test_parameter_space_rejects_non_numeric_or_constant_sweeps():
+    with pytest.raises(ValueError, match='not numeric case properties'):
+        hea_surrogate.ParameterSpace.from_cases([{'mold': 'steel'}, {'mold': 'sand'}], [None] * 2)
+    with pytest.raises(ValueError, match='do not vary'):
+        hea_surrogate.ParameterSpace.from_cases([{'liquidus_temp': 1723.0}] * 2, [None] * 2)
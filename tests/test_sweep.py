@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+import hea_sweep
+
+
+def hold_lock(sweep_dir, owner, mtime):
+    path = sweep_dir / hea_sweep.LOCK_NAME
+    path.write_text(f"{owner}\n")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_lock_with_old_remote_mtime_is_not_broken_at_once(tmp_path):
+    # The holder's clock runs an hour behind ours
+    path = hold_lock(tmp_path, 'node2 123 abcdef', os.path.getmtime(tmp_path) - 3600)
+    with pytest.raises(TimeoutError):
+        with hea_sweep.ManifestLock(tmp_path, timeout=0.3, stale_after=5.0):
+            pass
+    assert path.read_text() == "node2 123 abcdef\n"
+
+
+def test_unchanged_lock_of_dead_holder_is_broken(tmp_path):
+    path = hold_lock(tmp_path, 'node2 123 abcdef', os.path.getmtime(tmp_path) + 3600)
+    with hea_sweep.ManifestLock(tmp_path, timeout=5.0, stale_after=0.2) as lock:
+        assert path.read_text().strip() == lock.owner
+    assert not path.exists()
+    assert os.listdir(tmp_path) == []
+
+
+def test_release_keeps_a_lock_taken_over_by_another_process(tmp_path):
+    with hea_sweep.ManifestLock(tmp_path):
+        path = hold_lock(tmp_path, 'node2 123 abcdef', 0)
+    assert path.read_text() == "node2 123 abcdef\n"
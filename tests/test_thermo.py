@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import hea_foamio
+import hea_thermo
+from setup_hea_solidification import HEASolidificationCase
+
+PROPERTIES = {
+    'solidus_temp': 1633.0, 'liquidus_temp': 1723.0, 'latent_heat': 2.6e5,
+    'specific_heat_solid': 500.0, 'specific_heat_liquid': 800.0,
+    'thermal_conductivity_solid': 12.5, 'thermal_conductivity_liquid': 28.0,
+    'density': 7900.0, 'dynamic_viscosity': 0.006,
+}
+
+
+@pytest.fixture
+def table():
+    return hea_thermo.PropertyTable.from_properties(PROPERTIES, model='tabulated')
+
+
+def test_table_reproduces_the_piecewise_linear_blend(table):
+    T = np.array([300.0, 1633.0, 1653.0, 1678.0, 1723.0, 2500.0])
+    assert np.allclose(table('Cp', T), [500, 500, 500 + 300 * 20 / 90, 650, 800, 800])
+    assert np.allclose(table('kappa', T[3]), 0.5 * (12.5 + 28.0))
+    assert np.allclose(table('alpha1', T), [0, 0, 20 / 90, 0.5, 1, 1])
+
+
+def test_enthalpy_includes_sensible_and_latent_heat(table):
+    # Solid: Cp dT only
+    assert table('h', 1500.0) - table('h', 1000.0) == pytest.approx(500.0 * 500.0)
+    # Across the mushy zone: the mean Cp and the whole latent heat
+    assert table('h', 1723.0) - table('h', 1633.0) == pytest.approx(650.0 * 90.0 + 2.6e5,
+                                                                     rel=1e-6)
+
+
+def test_inverse_recovers_temperature_including_beyond_the_table(table):
+    T = np.concatenate([np.linspace(200.0, 2900.0, 10001), [1633.0, 1723.0]])
+    assert np.allclose(table.inverse('h', table('h', T)), T, atol=1e-6)
+
+
+def test_zero_freezing_range_is_rejected():
+    with pytest.raises(ValueError, match="freezing range"):
+        hea_thermo.PropertyTable.from_properties(dict(PROPERTIES, solidus_temp=1723.0))
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError, match="Unknown thermo model"):
+        hea_thermo.property_curves(PROPERTIES, 'polynomial')
+
+
+def test_generated_tabulated_case_round_trips_its_curves(tmp_path):
+    case = HEASolidificationCase(tmp_path, case_name='case', mesh_cells=(8, 16), verbose=False,
+                                 thermo_model='tabulated')
+    case.setup_complete_case()
+    thermo = hea_foamio.read_foam_dict(tmp_path / 'case' / 'constant' /
+                                       'thermophysicalProperties')
+    curves = hea_thermo.read_case_curves(thermo['mixture'], 'tabulated', case.properties)
+    expected = hea_thermo.property_curves(case.properties, 'tabulated')
+    t_range = hea_thermo.temperature_range(case.properties)
+    for name in ('Cp', 'kappa'):
+        assert np.allclose(curves[name], hea_thermo._table_points(expected[name], t_range),
+                           rtol=1e-6)
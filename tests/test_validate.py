@@ -0,0 +1,72 @@
+import pytest
+
+import hea_foamio
+import hea_validate
+import hea_warmstart
+from setup_hea_solidification import HEASolidificationCase
+
+
+@pytest.fixture
+def case(tmp_path):
+    def make(name='case', **kwargs):
+        HEASolidificationCase(tmp_path, case_name=name, mesh_cells=(8, 16), verbose=False,
+                              **kwargs).setup_complete_case()
+        return tmp_path / name
+    return make
+
+
+def errors(case_dir):
+    return hea_validate.validate_case(case_dir)['errors']
+
+
+def replace(path, old, new):
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new))
+
+
+def test_generated_cases_are_valid(case):
+    assert errors(case()) == []
+    assert errors(case('amr', amr_levels=1, amr_criterion='gradient')) == []
+
+
+def test_warm_start_directory_is_validated(case):
+    case_dir = case()
+    hea_warmstart.write_warm_start(case_dir, 2.0, verbose=False)
+    assert errors(case_dir) == []
+    replace(case_dir / '2' / 'T', '[0 0 0 1 0 0 0]', '[0 0 0 0 0 0 0]')
+    assert any(e.startswith('2/T: dimensions') for e in errors(case_dir))
+    # 0/ is no longer what the solver reads
+    assert hea_validate.start_time_name(case_dir, {'startTime': '2'}) == '2'
+
+
+def test_missing_start_directory_is_reported(case):
+    case_dir = case()
+    hea_foamio.set_entry(case_dir / 'system' / 'controlDict', 'startTime', '7')
+    assert any(e.startswith('7/: start time directory missing') for e in errors(case_dir))
+
+
+def test_missing_boundary_condition(case):
+    case_dir = case()
+    replace(case_dir / '0' / 'U', 'bottom', 'floor')
+    assert any("0/U: no boundary condition for patch 'bottom'" in e for e in errors(case_dir))
+
+
+def test_wall_function_under_laminar(case):
+    case_dir = case()
+    replace(case_dir / '0' / 'alphat', 'calculated', 'compressible::alphatWallFunction')
+    assert any('needs a turbulence model' in e for e in errors(case_dir))
+
+
+def test_solidus_above_liquidus(case):
+    case_dir = case()
+    replace(case_dir / 'constant' / 'fvOptions', 'Tsol            1633', 'Tsol            1800')
+    assert any('must be above solidus' in e for e in errors(case_dir))
+
+
+def test_refinement_of_a_2d_mesh_and_too_early_gradient_field(case):
+    case_dir = case('amr', amr_levels=1, amr_criterion='gradient')
+    replace(case_dir / 'constant' / 'dynamicMeshDict', 'refineInterval  2', 'refineInterval  1')
+    assert any('refineInterval must be at least 2' in e for e in errors(case_dir))
+    replace(case_dir / 'system' / 'blockMeshDict', 'symmetry', 'empty')
+    assert any('cannot refine a mesh with empty patches' in e for e in errors(case_dir))
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+import hea_foamio
+import hea_validate
+import hea_warmstart
+from setup_hea_solidification import HEASolidificationCase
+
+
+@pytest.fixture
+def case_dir(tmp_path):
+    case = HEASolidificationCase(tmp_path, case_name='case', mesh_cells=(8, 16), verbose=False)
+    case.setup_complete_case()
+    return tmp_path / 'case'
+
+
+def test_enthalpy_and_temperature_are_inverse_through_the_mushy_zone(case_dir):
+    model = hea_warmstart.ConductionModel(case_dir)
+    T = np.linspace(300.0, 1900.0, 1601)
+    assert np.allclose(model.temperature(model.enthalpy(T)), T, atol=1e-6)
+    assert np.allclose(model.liquid_fraction(np.array([1600.0, 1678.0, 1750.0])), [0, 0.5, 1])
+    # Freezing releases the whole latent heat per unit volume
+    jump = model.enthalpy(model.t_liq) - model.enthalpy(model.t_sol)
+    cp = hea_warmstart.read_case_properties(case_dir)['specific_heat_liquid']
+    assert jump == pytest.approx(model.rho * (cp * (model.t_liq - model.t_sol) + model.latent))
+
+
+def test_adiabatic_walls_conserve_enthalpy(case_dir):
+    model = hea_warmstart.ConductionModel(case_dir)
+    model.t_walls = dict.fromkeys(model.t_walls)
+    x = (np.arange(model.nx) + 0.5) / model.nx
+    model.T = np.tile(1500.0 + 400.0 * x, (model.ny, 1))
+    model.H = model.enthalpy(model.T)
+    total = model.H.sum()
+    model.advance(20.0)
+    assert model.H.sum() == pytest.approx(total, rel=1e-12)
+    # Heat flows from the hot side into the cold side
+    assert model.T[:, 0].max() > 1500.0 + 400.0 * x[0]
+    assert model.T[:, -1].min() < 1500.0 + 400.0 * x[-1]
+
+
+def test_cold_walls_cool_the_melt_from_the_walls(case_dir):
+    model = hea_warmstart.ConductionModel(case_dir)
+    initial = model.T.copy()
+    steps = model.advance(10.0)
+    assert steps == int(np.ceil(10.0 / model.dt_stable))
+    assert (model.T <= initial + 1e-9).all()
+    # The bottom wall (300 K) is colder than the side walls (500 K)
+    assert model.T[0, model.nx // 2] < model.T[model.ny // 2, 0] < model.T[-1, model.nx // 2]
+    assert (model.T >= min(t for t in model.t_walls.values() if t is not None)).all()
+
+
+def test_warm_start_writes_a_start_directory_the_case_starts_from(case_dir):
+    record = hea_warmstart.write_warm_start(case_dir, 5.0, verbose=False)
+    model = hea_warmstart.ConductionModel(case_dir)
+    model.advance(5.0)
+
+    _, T = hea_foamio.read_field(case_dir / '5' / 'T')
+    _, alpha = hea_foamio.read_field(case_dir / '5' / 'solidification:alpha1')
+    assert np.allclose(T, model.T.ravel())
+    assert np.allclose(alpha, model.liquid_fraction(model.T.ravel()))
+    for name in ('U', 'p', 'p_rgh'):
+        assert (case_dir / '5' / name).read_text() == (case_dir / '0' / name).read_text()
+    control = hea_foamio.read_foam_dict(case_dir / 'system' / 'controlDict')
+    assert hea_validate.start_time_name(case_dir, control) == '5'
+    assert json.loads((case_dir / hea_warmstart.RECORD_NAME).read_text()) == record
+    assert record['min_T'] == pytest.approx(model.T.min())